@@ -0,0 +1,254 @@
+"""Benchmarks the API commands against a local fake Travitia server.
+
+Drives Api.get, Api.merge, Api.iteminfo, Merch.merch and Merch.xmerch with a minimal stand-in
+for Discord, and reports p50/p99 latency and API requests per invocation. Latency is measured
+until the command returned and sent its first message. Menus are closed right away.
+
+Needs a running Redis for the ratelimiter, cache and circuit breaker, and the bot's config.py,
+which the cogs import. The database is not used, so no items are protected and no
+inventories are mirrored.
+
+Usage: python -m benchmarks.api_commands [--users 2000] [--runs 50] [--concurrency 5]
+"""
+
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+from types import SimpleNamespace
+
+import aioredis
+import discord
+from aiohttp import ClientSession
+
+from benchmarks.fake_travitia import Dataset, FakeTravitia
+from benchmarks.harness import NoDatabase
+from classes.travitia import TravitiaClient
+from cogs.api import Api
+from cogs.merch import Merch
+from utils.metrics import Metrics
+from utils.mirror import InventoryMirror
+from utils.reactions import ReactionDispatcher
+from utils.users import UserResolver
+
+# emojis a user closes menus with
+CLOSE = {"⏹", "\U0001f5d1"}
+message_ids = itertools.count(1)
+
+
+class FakeMessage:
+    def __init__(self, ctx, content=None, embed=None, file=None):
+        self.ctx = ctx
+        self.id = next(message_ids)
+        self.content = content
+        self.embed = embed
+
+    async def add_reaction(self, emoji):
+        if str(emoji) in CLOSE:
+            payload = SimpleNamespace(
+                message_id=self.id, user_id=self.ctx.author.id, emoji=emoji
+            )
+            # after the command started waiting for it
+            self.ctx.bot.loop.call_soon(self.ctx.bot.reactions.dispatch, payload)
+
+    async def remove_reaction(self, emoji, member):
+        pass
+
+    async def clear_reactions(self):
+        pass
+
+    async def edit(self, **kwargs):
+        pass
+
+    async def delete(self):
+        pass
+
+
+class FakeContext:
+    prefix = "< "
+    guild = None
+
+    def __init__(self, bot, user: int):
+        self.bot = bot
+        self.author = SimpleNamespace(id=user, name="benchmark")
+        self.me = SimpleNamespace(
+            id=0, permissions_in=lambda channel: SimpleNamespace(attach_files=True)
+        )
+        self.channel = None
+        self.responded = asyncio.Event()
+        self.messages = []
+
+    async def send(self, content=None, *, embed=None, file=None, **kwargs):
+        message = FakeMessage(self, content, embed, file)
+        self.messages.append(message)
+        self.responded.set()
+        return message
+
+    def typing(self):
+        return Typing()
+
+    async def confirm(self, *args, **kwargs) -> bool:
+        return True
+
+
+class Typing:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+class BenchmarkBot:
+    """Just enough of the bot for the API cogs."""
+
+    def __init__(self, loop, redis, session, config):
+        self.loop = loop
+        self.redis = redis
+        self.session = session
+        self.config = config
+        self.pool = NoDatabase()
+        self._connection = None
+        self.reactions = ReactionDispatcher(loop)
+        self.travitia = TravitiaClient(self)
+        self.resolver = UserResolver(self)
+        self.mirror = InventoryMirror(self)
+        self.metrics = Metrics(self)
+
+    def get_user(self, user_id: int):
+        return None
+
+    async def fetch_user(self, user_id: int) -> discord.User:
+        data = {
+            "id": user_id,
+            "username": "benchmark",
+            "discriminator": "0000",
+            "avatar": None,
+        }
+        return discord.User(state=None, data=data)
+
+
+async def invoke(bot, user: int, cog, command, *args, **kwargs) -> float:
+    ctx = FakeContext(bot, user)
+    start = time.perf_counter()
+    await command.callback(cog, ctx, *args, **kwargs)
+    await ctx.responded.wait()
+    return time.perf_counter() - start
+
+
+async def run(bot, server, name: str, scenario, runs: int, concurrency: int):
+    before = sum(server.requests.values())
+    queue = asyncio.Queue()
+    for i in range(runs):
+        queue.put_nowait(i)
+    timings = []
+
+    async def worker():
+        while not queue.empty():
+            timings.append(await scenario(queue.get_nowait()))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    requests = sum(server.requests.values()) - before
+
+    timings.sort()
+    print(
+        f"{name:<24} p50 {timings[len(timings) // 2] * 1000:>8.1f} ms"
+        f"  p99 {timings[int(len(timings) * 0.99)] * 1000:>8.1f} ms"
+        f"  mean {statistics.mean(timings) * 1000:>8.1f} ms"
+        f"  {requests / runs:>6.1f} requests/run  {runs / elapsed:>7.1f} runs/s"
+    )
+
+
+async def main(args):
+    dataset = Dataset(users=args.users, seed=args.seed)
+    server = FakeTravitia(
+        dataset, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate
+    )
+    base_url = await server.start()
+
+    config = SimpleNamespace(
+        api_token="benchmark",
+        api_ratelimit=(100000, 1),
+        api_cache_ttls={"allitems": 60} if args.cache else {},
+        api_page_size=args.page_size,
+        api_breaker={"min_requests": 10**9},
+    )
+    redis = await aioredis.create_pool(args.redis)
+    session = ClientSession()
+    bot = BenchmarkBot(asyncio.get_event_loop(), redis, session, config)
+    bot.travitia.base_url = base_url
+    api, merch = Api(bot), Merch(bot)
+    api.base_url = base_url
+
+    owners = {}
+    for item in dataset.allitems:
+        owners.setdefault(item["owner"], []).append(item)
+    users = sorted(owners, key=lambda u: len(owners[u]))
+    typical = users[len(users) // 2]
+    largest = users[-1]
+    print(
+        f"{len(dataset.allitems)} items, typical inventory {len(owners[typical])},"
+        f" largest {len(owners[largest])}"
+    )
+    mergeable = [
+        item
+        for item in owners[typical]
+        if item["damage"] + item["armor"] < 41 and item["id"] in dataset.inventory
+    ]
+
+    scenarios = {
+        "get (profile)": lambda i: invoke(
+            bot, typical, api, api.get, query=f"profile?user=eq.{users[i % len(users)]}"
+        ),
+        "get (large result)": lambda i: invoke(
+            bot, typical, api, api.get, query=f"allitems?owner=eq.{largest}"
+        ),
+        "merge": lambda i: invoke(
+            bot, typical, api, api.merge, mergeable[i % len(mergeable)]["id"]
+        ),
+        "iteminfo (50 items)": lambda i: invoke(
+            bot,
+            typical,
+            api,
+            api.iteminfo,
+            [item["id"] for item in dataset.allitems[i * 50 : i * 50 + 50]],
+        ),
+        "merch (typical)": lambda i: invoke(bot, typical, merch, merch.merch, typical),
+        "merch (largest, bounds)": lambda i: invoke(
+            bot, typical, merch, merch.merch, largest, 30, 5
+        ),
+        "xmerch (typical)": lambda i: invoke(
+            bot, typical, merch, merch.xmerch, args="--types Sword Axe --hand any"
+        ),
+        "xmerch (largest, file)": lambda i: invoke(
+            bot, largest, merch, merch.xmerch, args="-hi 20 --file"
+        ),
+    }
+    try:
+        for name, scenario in scenarios.items():
+            if not args.only or name.split()[0] in args.only:
+                await run(bot, server, name, scenario, args.runs, args.concurrency)
+    finally:
+        await session.close()
+        await server.stop()
+        redis.close()
+        await redis.wait_closed()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--redis", default="redis://localhost")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--cache", action="store_true", help="Cache allitems.")
+    parser.add_argument("--only", nargs="+", help="Commands to run, e.g. merch.")
+    asyncio.get_event_loop().run_until_complete(main(parser.parse_args()))
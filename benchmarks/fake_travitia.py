@@ -0,0 +1,427 @@
+"""A local stand-in for the Travitia API, serving seeded synthetic data.
+
+Supports the part of PostgREST the bot uses: column and embedded selects like
+`select=id,inventory(equipped)`, the eq, neq, gt, gte, lt, lte, like, in and is filters,
+filters on embedded resources, `or`/`and` groups, `order`, `limit` and `offset`.
+Latency, 429 and 5XX responses can be injected.
+
+Usage: python -m benchmarks.fake_travitia [--port 8080] [--users 2000] [--latency 0.05]
+"""
+
+import argparse
+import asyncio
+import fnmatch
+import random
+import time
+from collections import Counter
+from urllib.parse import parse_qsl
+
+from aiohttp import web
+
+TYPES = {
+    "Sword": "any",
+    "Shield": "left",
+    "Axe": "any",
+    "Wand": "right",
+    "Dagger": "any",
+    "Knife": "any",
+    "Spear": "right",
+    "Bow": "both",
+    "Hammer": "any",
+    "Scythe": "both",
+    "Howlet": "both",
+}
+RESERVED = {"select", "order", "limit", "offset", "or", "and"}
+
+
+class Dataset:
+    """Synthetic rows for the allitems, profile, guild, market and transactions endpoints.
+
+    Sizes follow the live API roughly: most users own a few dozen items, a few own thousands.
+    The same seed always produces the same data."""
+
+    def __init__(self, *, users: int = 2000, guilds: int = 200, seed: int = 0):
+        rng = random.Random(seed)
+        self.user_ids = [100000000000000000 + i for i in range(users)]
+        self.guild = [
+            {
+                "id": i,
+                "name": f"Guild {i}",
+                "memberlimit": 50,
+                "leader": rng.choice(self.user_ids),
+                "money": rng.randrange(10**7),
+                "wins": rng.randrange(1000),
+                "description": "A synthetic guild.",
+            }
+            for i in range(1, guilds + 1)
+        ]
+        self.profile = [
+            {
+                "user": user,
+                "name": f"Player {user % 100000}",
+                "money": rng.randrange(10**6),
+                "xp": rng.randrange(10**6),
+                "class": ["Warrior", "Mage", "Thief"][user % 3],
+                "race": ["Human", "Elf", "Dwarf", "Orc"][user % 4],
+                "guild": rng.randrange(guilds + 1),
+                "deaths": rng.randrange(500),
+                "completed": rng.randrange(500),
+            }
+            for user in self.user_ids
+        ]
+
+        self.allitems, self.inventory = [], {}
+        item_id = 0
+        for user in self.user_ids:
+            # heavy-tailed, like real inventories
+            for _ in range(min(int(rng.paretovariate(1.2) * 20), 5000)):
+                item_id += 1
+                type_ = rng.choice(list(TYPES))
+                hand = TYPES[type_]
+                stat = rng.randint(1, 82 if hand == "both" else 41)
+                self.allitems.append(
+                    {
+                        "id": item_id,
+                        "owner": user,
+                        "name": f"Synthetic {type_}",
+                        "value": rng.randrange(10, 10000),
+                        "type": type_,
+                        "damage": 0 if type_ == "Shield" else stat,
+                        "armor": stat if type_ == "Shield" else 0,
+                        "signature": "signed" if rng.random() < 0.02 else None,
+                        "original_type": None,
+                        "original_name": None,
+                        "hand": hand,
+                    }
+                )
+                self.inventory[item_id] = {
+                    "item": item_id,
+                    "equipped": rng.random() < 0.03,
+                }
+
+        listed = rng.sample(self.allitems, len(self.allitems) // 50)
+        self.market = [
+            {
+                "id": i,
+                "item": item["id"],
+                "price": rng.randrange(10, 10**6),
+                "published": "2020-01-01T00:00:00+00:00",
+            }
+            for i, item in enumerate(listed, 1)
+        ]
+        for item in listed:
+            # items on the market have no inventory entry
+            del self.inventory[item["id"]]
+        self.transactions = [
+            {
+                "id": i,
+                "from": rng.choice(self.user_ids),
+                "to": rng.choice(self.user_ids),
+                "subject": rng.choice(["money", "item", "merch", "shop"]),
+                "info": "synthetic",
+                "timestamp": "2020-01-01T00:00:00+00:00",
+            }
+            for i in range(1, users * 10 + 1)
+        ]
+        self.indexes = {}
+
+    def lookup(self, endpoint: str, column: str, arguments: list) -> list:
+        """The rows whose column equals one of the arguments of an eq or in filter, in order.
+
+        The index for a column is built the first time it is used."""
+        rows = getattr(self, endpoint)
+        index = self.indexes.get((endpoint, column))
+        if index is None:
+            index = self.indexes[endpoint, column] = {}
+            for position, row in enumerate(rows):
+                index.setdefault(row.get(column), []).append(position)
+        like = next((key for key in index if key is not None), None)
+        positions = set()
+        for argument in arguments:
+            positions.update(index.get(convert(unquote(argument), like), ()))
+        return [rows[position] for position in sorted(positions)]
+
+    def embedded(self, endpoint: str, resource: str, row: dict) -> list:
+        if endpoint == "allitems" and resource == "inventory":
+            entry = self.inventory.get(row["id"])
+            return [entry] if entry else []
+        raise ValueError(f"Unknown embedded resource {resource} on {endpoint}.")
+
+
+def split(text: str) -> list:
+    """Splits on top level commas, keeping parentheses and quoted values together."""
+    parts, depth, quoted, current = [], 0, False, ""
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append(current)
+            current = ""
+            continue
+        current += char
+    if current:
+        parts.append(current)
+    return parts
+
+
+def unquote(value: str) -> str:
+    if len(value) > 1 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    return value
+
+
+def convert(value: str, like):
+    if value == "null":
+        return None
+    if isinstance(like, bool):
+        return value == "true"
+    if isinstance(like, int):
+        return int(value)
+    if isinstance(like, float):
+        return float(value)
+    return value
+
+
+def compare(operator: str, column, argument: str) -> bool:
+    if operator == "is":
+        return column is {"null": None, "true": True, "false": False}[argument]
+    if operator in ("like", "ilike"):
+        pattern = argument.replace("%", "*")
+        if operator == "ilike":
+            return fnmatch.fnmatchcase(str(column).lower(), pattern.lower())
+        return fnmatch.fnmatchcase(str(column), pattern)
+    if column is None:
+        return False
+    argument = convert(unquote(argument), column)
+    return {
+        "eq": column == argument,
+        "neq": column != argument,
+        "gt": column > argument,
+        "gte": column >= argument,
+        "lt": column < argument,
+        "lte": column <= argument,
+    }[operator]
+
+
+def condition(column: str, expression: str):
+    """Returns a predicate on a row for a filter like `damage`, `gte.5`."""
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    operator, _, argument = expression.partition(".")
+
+    if operator == "in":
+        # parsed once per query instead of once per row, converted once per column type
+        values = [unquote(v) for v in split(argument[1:-1])]
+        converted = {}
+
+        def predicate(row: dict) -> bool:
+            value = row.get(column)
+            kind = type(value)
+            if kind not in converted:
+                converted[kind] = {convert(v, value) for v in values}
+            return (value in converted[kind]) != negate
+
+        return predicate
+
+    def predicate(row: dict) -> bool:
+        return compare(operator, row.get(column), argument) != negate
+
+    return predicate
+
+
+def logical(operator: str, body: str):
+    """Returns a predicate for an `or`/`and` group like `(armor.eq.0,and(...))`."""
+    predicates = []
+    for part in split(body[1:-1]):
+        if part.startswith(("or(", "and(")):
+            name, _, rest = part.partition("(")
+            predicates.append(logical(name, "(" + rest))
+        else:
+            column, _, expression = part.partition(".")
+            predicates.append(condition(column, expression))
+    if operator == "or":
+        return lambda row: any(p(row) for p in predicates)
+    return lambda row: all(p(row) for p in predicates)
+
+
+def parse_select(select: str):
+    """Returns the selected columns (None for all) and the embedded resources' columns."""
+    columns, embeds = [], {}
+    for part in split(select or "*"):
+        if "(" in part:
+            name, _, rest = part.partition("(")
+            embeds[name] = None if rest[:-1] == "*" else split(rest[:-1])
+        elif part == "*":
+            columns = None
+        elif columns is not None:
+            columns.append(part)
+    return columns, embeds
+
+
+def query(dataset: Dataset, endpoint: str, params: list) -> list:
+    rows = getattr(dataset, endpoint)
+    columns, embeds = parse_select(dict(params).get("select"))
+    filters, embed_filters = [], {}
+    order, limit, offset = [], None, 0
+    indexed, candidates = None, []
+
+    for key, value in params:
+        if key in ("or", "and"):
+            filters.append(logical(key, value))
+        elif key == "order":
+            order = [part.split(".") for part in value.split(",")]
+        elif key == "limit":
+            limit = int(value)
+        elif key == "offset":
+            offset = int(value)
+        elif key not in RESERVED:
+            resource, _, column = key.rpartition(".")
+            if resource:
+                # filters on embedded resources filter the embedded rows, not the parent
+                embed_filters.setdefault(resource, []).append(condition(column, value))
+            else:
+                filters.append(condition(column, value))
+                if value.startswith("eq."):
+                    indexed = indexed or (column, [value[3:]])
+                elif value.startswith("in."):
+                    candidates.append((column, split(value[4:-1])))
+
+    # eq filters are the most selective, in filters on few values come next
+    indexed = indexed or min(candidates, key=lambda c: len(c[1]), default=None)
+    if indexed is not None:
+        # like an index scan, so the server does not slow down the bot it runs next to
+        rows = dataset.lookup(endpoint, *indexed)
+    result = [row for row in rows if all(f(row) for f in filters)]
+    for column, *options in reversed(order):
+        present = [row for row in result if row.get(column) is not None]
+        missing = [row for row in result if row.get(column) is None]
+        present.sort(key=lambda row: row[column], reverse="desc" in options)
+        result = missing + present if "nullsfirst" in options else present + missing
+    result = result[offset : None if limit is None else offset + limit]
+
+    output = []
+    for row in result:
+        out = dict(row) if columns is None else {c: row.get(c) for c in columns}
+        for resource, embed_columns in embeds.items():
+            embedded = [
+                entry
+                for entry in dataset.embedded(endpoint, resource, row)
+                if all(f(entry) for f in embed_filters.get(resource, []))
+            ]
+            out[resource] = [
+                entry if embed_columns is None else {c: entry[c] for c in embed_columns}
+                for entry in embedded
+            ]
+        output.append(out)
+    return output
+
+
+class FakeTravitia:
+    """Serves a Dataset like the Travitia API would.
+
+    Every response is delayed by `latency` seconds, plus up to `jitter` seconds. `error_rate`
+    of the requests fail with a 503. With `ratelimit` set as (requests, seconds), requests
+    above it get a 429, like the live API. Requests are counted per endpoint and status.
+    """
+
+    endpoints = ("allitems", "profile", "guild", "market", "transactions")
+
+    def __init__(
+        self,
+        dataset: Dataset,
+        *,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        ratelimit: tuple = None,
+        seed: int = 0,
+    ):
+        self.dataset = dataset
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.ratelimit = ratelimit
+        self.random = random.Random(seed)
+        self.requests = Counter()
+        self.recent = {}
+        self.runner = None
+
+    def limited(self, token: str) -> bool:
+        if self.ratelimit is None:
+            return False
+        rate, per = self.ratelimit
+        now = time.monotonic()
+        recent = [t for t in self.recent.get(token, []) if t > now - per]
+        self.recent[token] = recent
+        if len(recent) >= rate:
+            return True
+        recent.append(now)
+        return False
+
+    async def handle(self, request: web.Request) -> web.Response:
+        endpoint = request.match_info["endpoint"]
+        delay = self.latency + self.random.random() * self.jitter
+        if delay:
+            await asyncio.sleep(delay)
+
+        if endpoint not in self.endpoints:
+            status, body = 404, {"message": f"Unknown endpoint {endpoint}."}
+        elif self.limited(request.headers.get("Authorization", "")):
+            status, body = 429, {"message": "Too many requests."}
+        elif self.random.random() < self.error_rate:
+            status, body = 503, {"message": "Injected error."}
+        else:
+            try:
+                params = parse_qsl(request.query_string, keep_blank_values=True)
+                status, body = 200, query(self.dataset, endpoint, params)
+            except (KeyError, ValueError, TypeError) as e:
+                status, body = 400, {"message": f"Bad query: {e!r}"}
+        self.requests[endpoint, status] += 1
+        return web.json_response(body, status=status)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/idle/{endpoint}", self.handle)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Starts serving and returns the base URL, e.g. `http://127.0.0.1:8080/idle/`."""
+        self.runner = web.AppRunner(self.app())
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}/idle/"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--ratelimit", type=int, nargs=2, metavar=("REQUESTS", "SECONDS")
+    )
+    args = parser.parse_args()
+
+    server = FakeTravitia(
+        Dataset(users=args.users, seed=args.seed),
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        ratelimit=tuple(args.ratelimit) if args.ratelimit else None,
+        seed=args.seed,
+    )
+    web.run_app(server.app(), host=args.host, port=args.port)
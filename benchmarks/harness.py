@@ -0,0 +1,464 @@
+"""An offline stand-in for Discord, to drive the bot's command layer without a gateway.
+
+Messages from simulated users go through the real Bot.on_message, Context, checks, cogs and
+menus. Everything the bot does on Discord, like sending and editing messages or adding
+reactions, is recorded instead and takes a simulated REST latency. Simulated users answer
+menus the bot opens with reactions: they confirm prompts, flip a few pages of paginators
+and close them.
+
+Only what the bot's cogs use is simulated. Commands work in a guild channel of their own per
+user, but the guild has no members, roles or emojis.
+"""
+
+import asyncio
+import datetime
+import itertools
+import random
+from collections import Counter
+from typing import Optional
+
+import discord
+
+from utils.reactions import ReactionDispatcher
+
+# emojis that close menus, in order of preference
+CLOSE = ("⏹", "\U0001f5d1")
+CONFIRM = "✅"
+NEXT = "➡️"
+
+
+class NoDatabase:
+    """Answers every query with nothing: no protected items and no mirrors.
+
+    Each query takes `latency` seconds."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    async def fetchval(self, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+        return None
+
+    async def fetchrow(self, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+        return None
+
+    async def fetch(self, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+        return []
+
+    async def execute(self, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+        return None
+
+    def acquire(self):
+        return Connection(self)
+
+
+class Connection:
+    def __init__(self, pool: NoDatabase):
+        self.pool = pool
+
+    def __getattr__(self, name):
+        return getattr(self.pool, name)
+
+    def transaction(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+class Interaction:
+    """A message a simulated user sent and what came of it. Times are in seconds."""
+
+    __slots__ = ("content", "command", "started", "response", "duration", "error")
+
+    def __init__(self, content: str, started: float):
+        self.content = content
+        self.command = None
+        self.started = started
+        # until the first message of the bot in reply arrived
+        self.response = None
+        # until Bot.on_message returned
+        self.duration = None
+        self.error = None
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+
+class HarnessState:
+    """What discord.py's Messageable.send and Typing need of a ConnectionState."""
+
+    allowed_mentions = None
+
+    def __init__(self, harness):
+        self.harness = harness
+        self.loop = harness.loop
+        self.http = HarnessHTTP(harness)
+
+    def create_message(self, *, channel, data):
+        # the HTTP client already returns messages
+        return data
+
+
+class HarnessHTTP:
+    """The REST routes discord.py calls for Messageable.send and typing."""
+
+    def __init__(self, harness):
+        self.harness = harness
+
+    async def send_message(self, channel_id: int, content, *, embed=None, **kwargs):
+        channel = self.harness.channels[channel_id]
+        await self.harness.rest(channel, "send_message")
+        return channel.receive(content=content, embeds=[embed] if embed else [])
+
+    async def send_files(
+        self, channel_id: int, *, files, content=None, embed=None, **kwargs
+    ):
+        channel = self.harness.channels[channel_id]
+        for file in files:
+            # uploading reads the whole file
+            file.fp.read()
+        await self.harness.rest(channel, "send_files")
+        return channel.receive(
+            content=content,
+            embeds=[embed] if embed else [],
+            attachments=[file.filename for file in files],
+        )
+
+    async def send_typing(self, channel_id: int):
+        await self.harness.rest(self.harness.channels.get(channel_id), "send_typing")
+
+
+class HarnessMember:
+    """The bot's own member in a harness guild, with every text permission."""
+
+    def __init__(self, user: discord.ClientUser):
+        self.user = user
+        self.guild_permissions = discord.Permissions.text()
+
+    def __getattr__(self, name):
+        return getattr(self.user, name)
+
+    def __str__(self):
+        return str(self.user)
+
+    def permissions_in(self, channel) -> discord.Permissions:
+        return self.guild_permissions
+
+
+class HarnessGuild:
+    def __init__(self, harness, guild_id: int):
+        self.id = guild_id
+        self.name = f"Harness {guild_id}"
+        self.me = HarnessMember(harness.bot.user)
+        self.shard_id = 0
+
+    def get_member(self, user_id: int):
+        return None
+
+
+class HarnessChannel:
+    def __init__(self, harness, channel_id: int, guild: HarnessGuild, user):
+        self.harness = harness
+        self._state = harness.state
+        self.id = channel_id
+        self.name = f"harness-{channel_id}"
+        self.guild = guild
+        self.user = user
+        self.messages = []
+        self.interaction = None
+        # REST calls in flight and reactions not yet added, see settle()
+        self.busy = 0
+        self.last_activity = harness.loop.time()
+
+    @property
+    def mention(self) -> str:
+        return f"<#{self.id}>"
+
+    def receive(self, **kwargs) -> "HarnessMessage":
+        """Records a message the bot sent to this channel."""
+        message = HarnessMessage(self, self.harness.bot.user, **kwargs)
+        self.harness.messages[message.id] = message
+        self.messages.append(message)
+        if self.interaction is not None and self.interaction.response is None:
+            self.interaction.response = (
+                self.harness.loop.time() - self.interaction.started
+            )
+        return message
+
+    async def settle(self, quiet: float):
+        """Waits until nothing happened in the channel for `quiet` seconds.
+
+        Menus keep running after their command returned, this waits for them to be closed.
+        Menus the simulated user left open do not count."""
+        while True:
+            await asyncio.sleep(quiet)
+            if not self.busy and self.harness.loop.time() - self.last_activity >= quiet:
+                break
+        waiting = self.harness.bot.reactions.waiters
+        for message in self.messages:
+            if message.id not in waiting:
+                self.harness.messages.pop(message.id, None)
+        self.messages = [m for m in self.messages if m.id in waiting]
+
+
+class HarnessMessage:
+    """A message in a harness channel. Its REST methods record the call and take the latency."""
+
+    def __init__(
+        self,
+        channel: HarnessChannel,
+        author,
+        *,
+        content: str = None,
+        embeds: list = (),
+        attachments: list = (),
+    ):
+        self.harness = channel.harness
+        self._state = channel._state
+        self.id = next(self.harness.ids)
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content or ""
+        self.embeds = list(embeds)
+        self.attachments = list(attachments)
+        self.mentions = []
+        self.role_mentions = []
+        self.channel_mentions = []
+        self.created_at = datetime.datetime.utcnow()
+        # emojis the bot reacted with
+        self.reactions = []
+        self.flips = 0
+        self.deleted = False
+
+    async def add_reaction(self, emoji):
+        await self.harness.rest(self.channel, "add_reaction")
+        self.reactions.append(str(emoji))
+
+    async def remove_reaction(self, emoji, member):
+        await self.harness.rest(self.channel, "remove_reaction")
+
+    async def clear_reactions(self):
+        await self.harness.rest(self.channel, "clear_reactions")
+        self.reactions.clear()
+
+    async def edit(self, *, content=None, embed=None, **kwargs):
+        if embed is not None:
+            self.embeds = [embed.to_dict()]
+        if content is not None:
+            self.content = content
+        await self.harness.rest(self.channel, "edit_message")
+
+    async def delete(self, *, delay: float = None):
+        if delay is not None:
+            # not waited for by anyone, so it does not keep the channel busy
+            self.harness.loop.call_later(delay, self._deleted)
+            return
+        await self.harness.rest(self.channel, "delete_message")
+        self._deleted()
+
+    def _deleted(self):
+        self.deleted = True
+        self.harness.messages.pop(self.id, None)
+
+
+class ObservedDispatcher(ReactionDispatcher):
+    """Tells simulated users when the bot waits for their reaction to a menu."""
+
+    def __init__(self, harness, **kwargs):
+        super().__init__(harness.loop, **kwargs)
+        self.harness = harness
+
+    def wait_for(self, message_id: int, **kwargs) -> asyncio.Future:
+        future = super().wait_for(message_id, **kwargs)
+        message = self.harness.messages.get(message_id)
+        if message is not None and message.channel.user is not None:
+            message.channel.user.on_menu(message)
+        return future
+
+
+class SimulatedUser:
+    """A user with a channel of their own. Sends commands one at a time.
+
+    On menus, they confirm if `confirm` is set, flip forward up to `flips` pages, then close
+    the menu. Reactions are added `reaction_delay` seconds after the menu is ready."""
+
+    def __init__(
+        self,
+        harness,
+        user_id: int,
+        *,
+        flips: int = 2,
+        confirm: bool = True,
+        reaction_delay: float = 0.5,
+    ):
+        self.harness = harness
+        self.user = discord.User(
+            state=harness.bot._connection,
+            data={
+                "id": user_id,
+                "username": f"user{user_id % 10000}",
+                "discriminator": f"{user_id % 10000:04}",
+                "avatar": None,
+            },
+        )
+        self.flips = flips
+        self.confirm = confirm
+        self.reaction_delay = reaction_delay
+        self.channel = harness.channel(self)
+
+    @property
+    def id(self) -> int:
+        return self.user.id
+
+    async def send(self, content: str, *, quiet: float = None) -> Interaction:
+        """Sends a message and waits until the bot is done with it and its menus."""
+        harness = self.harness
+        message = HarnessMessage(self.channel, self.user, content=content)
+        interaction = Interaction(content, harness.loop.time())
+        harness.interactions[message.id] = interaction
+        self.channel.interaction = interaction
+        try:
+            await harness.bot.on_message(message)
+        except Exception as e:
+            # CommandErrors are handled by the bot, this is everything else
+            interaction.error = e
+        interaction.duration = harness.loop.time() - interaction.started
+        await self.channel.settle(harness.latency * 2 if quiet is None else quiet)
+        self.channel.interaction = None
+        harness.interactions.pop(message.id, None)
+        return interaction
+
+    def choose(self, message: HarnessMessage) -> Optional[str]:
+        """The reaction to answer a menu with, None to leave it open."""
+        if self.confirm and CONFIRM in message.reactions:
+            return CONFIRM
+        if NEXT in message.reactions and message.flips < self.flips:
+            message.flips += 1
+            return NEXT
+        for emoji in CLOSE:
+            if emoji in message.reactions:
+                return emoji
+        return None
+
+    def on_menu(self, message: HarnessMessage):
+        emoji = self.choose(message)
+        if emoji is None:
+            return
+        self.channel.busy += 1
+        self.harness.loop.create_task(self._react(message, emoji))
+
+    async def _react(self, message: HarnessMessage, emoji: str):
+        try:
+            await asyncio.sleep(self.reaction_delay)
+            self.harness.react(message, emoji, self.id)
+        finally:
+            self.channel.busy -= 1
+            self.channel.last_activity = self.harness.loop.time()
+
+
+class Harness:
+    """Connects a bot to simulated users instead of Discord.
+
+    The bot must not be started. `install` replaces its reaction dispatcher and the parts of
+    its connection the cogs use; REST calls take `latency` plus up to `jitter` seconds.
+    """
+
+    def __init__(
+        self, bot, *, latency: float = 0.05, jitter: float = 0.0, seed: int = 0
+    ):
+        self.bot = bot
+        self.loop = bot.loop
+        self.latency = latency
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.ids = itertools.count(
+            discord.utils.time_snowflake(datetime.datetime.utcnow())
+        )
+        self.state = HarnessState(self)
+        self.channels = {}
+        self.messages = {}
+        self.interactions = {}
+        self.requests = Counter()
+        self.guild = None
+
+    def install(self, *, user_id: int = 1):
+        bot = self.bot
+        bot._connection.user = discord.ClientUser(
+            state=bot._connection,
+            data={
+                "id": user_id,
+                "username": "harness",
+                "discriminator": "0000",
+                "avatar": None,
+                "bot": True,
+            },
+        )
+        bot.reactions = ObservedDispatcher(self)
+        bot.fetch_user = self.fetch_user
+        bot.add_listener(self.on_command)
+        bot.add_listener(self.on_command_error)
+        self.guild = HarnessGuild(self, next(self.ids))
+
+    def channel(self, user: Optional[SimulatedUser] = None) -> HarnessChannel:
+        channel = HarnessChannel(self, next(self.ids), self.guild, user)
+        self.channels[channel.id] = channel
+        return channel
+
+    def user(self, user_id: int, **kwargs) -> SimulatedUser:
+        return SimulatedUser(self, user_id, **kwargs)
+
+    async def rest(self, channel: Optional[HarnessChannel], route: str):
+        self.requests[route] += 1
+        if channel is not None:
+            channel.busy += 1
+        try:
+            await asyncio.sleep(self.latency + self.random.uniform(0, self.jitter))
+        finally:
+            if channel is not None:
+                channel.busy -= 1
+                channel.last_activity = self.loop.time()
+
+    async def fetch_user(self, user_id: int) -> discord.User:
+        await self.rest(None, "fetch_user")
+        return discord.User(
+            state=self.bot._connection,
+            data={
+                "id": user_id,
+                "username": f"user{user_id % 10000}",
+                "discriminator": f"{user_id % 10000:04}",
+                "avatar": None,
+            },
+        )
+
+    def react(self, message: HarnessMessage, emoji: str, user_id: int):
+        """Injects a reaction event, as if the user reacted on Discord."""
+        payload = discord.RawReactionActionEvent(
+            {
+                "message_id": message.id,
+                "channel_id": message.channel.id,
+                "user_id": user_id,
+                "guild_id": message.guild.id,
+            },
+            discord.PartialEmoji(name=emoji),
+            "REACTION_ADD",
+        )
+        self.bot.dispatch("raw_reaction_add", payload)
+
+    async def on_command(self, ctx):
+        interaction = self.interactions.get(ctx.message.id)
+        if interaction is not None:
+            interaction.command = ctx.command.qualified_name
+
+    async def on_command_error(self, ctx, error):
+        interaction = self.interactions.get(ctx.message.id)
+        if interaction is not None:
+            interaction.error = error
@@ -0,0 +1,266 @@
+"""Load-tests the command layer with simulated users, without Discord or the live API.
+
+Runs the bot's cogs behind the offline Discord harness, against the fake Travitia server.
+`--users` simulated users send commands at the same time, each waiting for the answer and
+closing its menus before thinking about the next one. Every command first runs alone for
+`--duration` seconds, then all of them together in a realistic mix.
+
+Reported per command: invocations per second, latency until the first answer (p50, p95,
+p99 and max), failed invocations, event loop lag and memory growth per invocation. Memory
+is the process' RSS, or the Python heap with --tracemalloc, which is exact but slows
+everything down. Caches stay warm from one phase to the next.
+
+Cooldowns are removed, as the simulated users would be on cooldown most of the time.
+Needs a running Redis for the ratelimiter, cache and circuit breaker, and the bot's config.py.
+
+Usage: python -m benchmarks.load [--users 50] [--duration 15] [--only profile merch]
+"""
+
+import argparse
+import asyncio
+import gc
+import random
+import time
+import tracemalloc
+from collections import defaultdict
+from types import SimpleNamespace
+
+import aioredis
+import psutil
+from aiohttp import ClientSession
+from discord.ext import commands
+
+import config
+from benchmarks.fake_travitia import Dataset, FakeTravitia
+from benchmarks.harness import Harness, NoDatabase
+from classes.bot import Bot
+from classes.travitia import TravitiaClient
+from utils.metrics import Metrics
+from utils.mirror import InventoryMirror
+from utils.users import UserResolver
+
+COGS = ("cogs.api", "cogs.errors", "cogs.help", "cogs.merch", "cogs.misc")
+
+
+def command_mix(dataset: Dataset) -> dict:
+    """Maps command names to their weight in the mix and a function returning arguments."""
+    items = [item["id"] for item in dataset.allitems]
+    owned = defaultdict(list)
+    for item in dataset.allitems:
+        owned[item["owner"]].append(item["id"])
+    guilds = [guild["id"] for guild in dataset.guild]
+
+    return {
+        "profile": (20, lambda rng, user: "profile"),
+        "items": (8, lambda rng, user: "items"),
+        "get": (
+            8,
+            lambda rng, user: f"get profile?user=eq.{rng.choice(dataset.user_ids)}",
+        ),
+        "iteminfo": (
+            10,
+            lambda rng, user: "iteminfo "
+            + " ".join(str(rng.choice(items)) for _ in range(rng.randint(1, 5))),
+        ),
+        "merge": (5, lambda rng, user: f"merge {rng.choice(owned[user] or items)}"),
+        "merch": (10, lambda rng, user: "merch"),
+        "xmerch": (
+            10,
+            lambda rng, user: rng.choice(
+                [
+                    "xmerch --types Sword Axe --hand any",
+                    "xmerch -lo 10 -hi 30",
+                    "xmerch --file",
+                ]
+            ),
+        ),
+        "viewfav": (4, lambda rng, user: "viewfav"),
+        "guildmembers": (3, lambda rng, user: f"guildmembers {rng.choice(guilds)}"),
+        "help": (
+            12,
+            lambda rng, user: rng.choice(["help", "help merch", "help xmerch"]),
+        ),
+        "stats": (2, lambda rng, user: "stats"),
+        "uptime": (4, lambda rng, user: "uptime"),
+        "source": (4, lambda rng, user: "source"),
+    }
+
+
+def percentile(values: list, q: float) -> float:
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+def memory() -> int:
+    gc.collect()
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+    return psutil.Process().memory_info().rss
+
+
+class LagMonitor:
+    """Samples how late the event loop wakes up a sleeping task."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples = []
+
+    async def run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(time.perf_counter() - start - self.interval, 0))
+
+
+async def session(user, mix: dict, names: list, args, rng, deadline: float, results):
+    loop = asyncio.get_event_loop()
+    weights = [mix[name][0] for name in names]
+    while loop.time() < deadline:
+        name = rng.choices(names, weights)[0]
+        interaction = await user.send(
+            config.command_prefix + mix[name][1](rng, user.id)
+        )
+        results.append((name, interaction))
+        if args.think:
+            await asyncio.sleep(rng.expovariate(1 / args.think))
+
+
+def row(name: str, results: list, elapsed: float, lag: list = None, grown=None):
+    latencies = sorted(
+        i.response if i.response is not None else i.duration for i in results
+    )
+    failed = sum(i.failed for i in results)
+    line = (
+        f"{name:<14} {len(results):>6} {len(results) / elapsed:>8.1f}"
+        f" {percentile(latencies, 0.5) * 1000:>8.0f} {percentile(latencies, 0.95) * 1000:>8.0f}"
+        f" {percentile(latencies, 0.99) * 1000:>8.0f} {latencies[-1] * 1000:>8.0f} {failed:>6}"
+    )
+    if lag:
+        lag = sorted(lag)
+        line += f" {percentile(lag, 0.99) * 1000:>8.1f} {lag[-1] * 1000:>8.1f}"
+    else:
+        line += f" {'-':>8} {'-':>8}"
+    if grown is not None:
+        line += f" {grown / len(results) / 1024:>10.1f}"
+    else:
+        line += f" {'-':>10}"
+    print(line)
+
+
+async def phase(name: str, users: list, mix: dict, names: list, args, rng):
+    monitor = LagMonitor()
+    sampler = asyncio.ensure_future(monitor.run())
+    before = memory()
+    results = []
+    start = time.perf_counter()
+    deadline = asyncio.get_event_loop().time() + args.duration
+    await asyncio.gather(
+        *[session(user, mix, names, args, rng, deadline, results) for user in users]
+    )
+    elapsed = time.perf_counter() - start
+    sampler.cancel()
+    grown = memory() - before
+
+    if not results:
+        print(f"{name:<14} no invocations")
+        return
+    if len(names) == 1:
+        row(name, [i for _, i in results], elapsed, monitor.samples, grown)
+        return
+    for command in names:
+        own = [i for n, i in results if n == command]
+        if own:
+            row(f"  {command}", own, elapsed)
+    row(name, [i for _, i in results], elapsed, monitor.samples, grown)
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    dataset = Dataset(users=args.dataset_users, seed=args.seed)
+    server = FakeTravitia(dataset, latency=args.api_latency, jitter=args.api_latency)
+    base_url = await server.start()
+
+    bot = Bot(command_prefix=commands.when_mentioned_or(config.command_prefix))
+    bot.remove_command("help")
+    bot.cluster, bot.cluster_count = 0, 1
+    settings = {k: v for k, v in vars(config).items() if not k.startswith("_")}
+    settings.update(
+        api_token="benchmark",
+        api_ratelimit=(100000, 1),
+        api_breaker={"min_requests": 10**9},
+        bans=[],
+    )
+    bot.config = SimpleNamespace(**settings)
+    bot.pool = NoDatabase(args.db_latency)
+    bot.redis = await aioredis.create_pool(args.redis)
+    bot.session = ClientSession()
+    bot.travitia = TravitiaClient(bot)
+    bot.travitia.base_url = base_url
+    bot.resolver = UserResolver(bot)
+    bot.mirror = InventoryMirror(bot)
+    bot.started_at = bot.launch_time
+    bot.metrics = Metrics(bot)
+    bot.before_invoke(bot.metrics.before_invoke)
+    bot.after_invoke(bot.metrics.after_invoke)
+
+    harness = Harness(bot, latency=args.latency, jitter=args.jitter, seed=args.seed)
+    harness.install()
+    for cog in COGS:
+        bot.load_extension(cog)
+    bot.get_cog("Api").base_url = base_url
+    for command in bot.walk_commands():
+        command.checks = [
+            check for check in command.checks if check.__module__ != "utils.cooldowns"
+        ]
+
+    mix = command_mix(dataset)
+    names = [name for name in mix if not args.only or name in args.only]
+    users = [
+        harness.user(user_id, flips=args.flips, reaction_delay=args.reaction_delay)
+        for user_id in rng.sample(dataset.user_ids, args.users)
+    ]
+    print(
+        f"{args.users} users, {len(dataset.allitems)} items, REST latency"
+        f" {args.latency * 1000:.0f} ms, API latency {args.api_latency * 1000:.0f} ms"
+    )
+    print(
+        f"{'command':<14} {'runs':>6} {'runs/s':>8} {'p50 ms':>8} {'p95 ms':>8}"
+        f" {'p99 ms':>8} {'max ms':>8} {'failed':>6} {'lag p99':>8} {'lag max':>8}"
+        f" {'KiB/run':>10}"
+    )
+    try:
+        if not args.mix_only:
+            for name in names:
+                await phase(name, users, mix, [name], args, rng)
+        if len(names) > 1:
+            await phase("mix", users, mix, names, args, rng)
+    finally:
+        print("Discord REST calls:", dict(harness.requests))
+        await bot.session.close()
+        await server.stop()
+        bot.redis.close()
+        await bot.redis.wait_closed()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--redis", default="redis://localhost")
+    parser.add_argument("--users", type=int, default=50, help="Concurrent users.")
+    parser.add_argument("--duration", type=float, default=15, help="Seconds per phase.")
+    parser.add_argument("--think", type=float, default=1.0, help="Mean think time.")
+    parser.add_argument("--flips", type=int, default=2, help="Pages users flip.")
+    parser.add_argument("--reaction-delay", type=float, default=0.3)
+    parser.add_argument("--latency", type=float, default=0.05, help="Discord REST.")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--api-latency", type=float, default=0.05)
+    parser.add_argument("--db-latency", type=float, default=0.001)
+    parser.add_argument("--dataset-users", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", help="Commands to run, e.g. merch.")
+    parser.add_argument("--mix-only", action="store_true")
+    parser.add_argument(
+        "--tracemalloc", action="store_true", help="Measure the Python heap."
+    )
+    asyncio.get_event_loop().run_until_complete(main(parser.parse_args()))
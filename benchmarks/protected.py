@@ -0,0 +1,135 @@
+"""Compares lookups of protected items in the old and the new table layout.
+
+The old layout is an array of item IDs per user in `items`, without any index. The new one
+has a primary key on `items` and a row per protected item in `protected_items`, keyed on
+(user_id, item_id). Both are built as temporary tables with the same data, so the bot's
+tables are not touched. Most users protect a few items, some protect hundreds.
+
+Timed per layout, for random users:
+- has_pro: making sure the user has a row, done before every favourite command
+- list: all protected items of a user, for viewfav, merch and xmerch
+- member: whether an item is protected
+- exclude: a 1000 item inventory without the protected items, as for mirrored inventories
+
+Needs the bot's config.py for the Postgres login.
+
+Usage: python -m benchmarks.protected [--users 100000] [--lookups 2000]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import asyncpg
+
+import config
+
+SETUP = """
+CREATE TEMPORARY TABLE old_items ("user" bigint NOT NULL, protected bigint[] DEFAULT '{}');
+CREATE TEMPORARY TABLE new_items ("user" bigint PRIMARY KEY);
+CREATE TEMPORARY TABLE new_protected (
+    user_id bigint NOT NULL,
+    item_id bigint NOT NULL,
+    PRIMARY KEY (user_id, item_id)
+);
+"""
+
+FILL = """
+INSERT INTO old_items ("user", protected)
+    SELECT u, ARRAY(SELECT u * 1000 + g FROM generate_series(1, n) g)
+    FROM (
+        SELECT u, floor(random() ^ 8 * 500)::int AS n FROM generate_series(1, $1) u
+    ) users;
+INSERT INTO new_items ("user") SELECT "user" FROM old_items;
+INSERT INTO new_protected (user_id, item_id) SELECT "user", unnest(protected) FROM old_items;
+ANALYZE old_items;
+ANALYZE new_items;
+ANALYZE new_protected;
+"""
+
+# name: (old layout, new layout, whether an item ID is passed as $2), the user is $1
+QUERIES = {
+    "has_pro": (
+        'SELECT EXISTS(SELECT 1 FROM old_items WHERE "user"=$1);',
+        'INSERT INTO new_items ("user") VALUES ($1) ON CONFLICT DO NOTHING;',
+        False,
+    ),
+    "list": (
+        'SELECT protected FROM old_items WHERE "user"=$1;',
+        "SELECT item_id FROM new_protected WHERE user_id=$1;",
+        False,
+    ),
+    "member": (
+        'SELECT $2::bigint=ANY(protected) FROM old_items WHERE "user"=$1;',
+        "SELECT EXISTS(SELECT 1 FROM new_protected WHERE user_id=$1 AND item_id=$2);",
+        True,
+    ),
+    "exclude": (
+        "SELECT i FROM generate_series($1::bigint * 1000, $1::bigint * 1000 + 999) i"
+        ' WHERE NOT i=ANY(coalesce((SELECT protected FROM old_items WHERE "user"=$1),'
+        " ARRAY[]::bigint[]));",
+        "SELECT i FROM generate_series($1::bigint * 1000, $1::bigint * 1000 + 999) i"
+        " WHERE NOT EXISTS(SELECT 1 FROM new_protected p WHERE p.user_id=$1 AND p.item_id=i);",
+        False,
+    ),
+}
+
+
+async def measure(conn, query: str, lookups: list) -> list:
+    statement = await conn.prepare(query)
+    timings = []
+    for args in lookups:
+        start = time.perf_counter()
+        await statement.fetch(*args)
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)
+
+
+async def plan(conn, query: str, args: tuple) -> str:
+    rows = await conn.fetch(f"EXPLAIN {query}", *args)
+    # the outermost scan is what matters
+    lines = [r[0].strip(" ->") for r in rows]
+    return next((line for line in lines if "Scan" in line), lines[0]).split("  (")[0]
+
+
+async def main(args):
+    conn = await asyncpg.connect(**config.postgres_login)
+    try:
+        await conn.execute(SETUP)
+        start = time.perf_counter()
+        await conn.execute(FILL.replace("$1", str(int(args.users))))
+        rows = await conn.fetchval("SELECT count(*) FROM new_protected;")
+        print(
+            f"{args.users} users, {rows} protected items,"
+            f" filled in {time.perf_counter() - start:.1f} s"
+        )
+
+        rng = random.Random(args.seed)
+        lookups = []
+        for _ in range(args.lookups):
+            user = rng.randint(1, args.users)
+            lookups.append((user, user * 1000 + rng.randint(1, 20)))
+
+        for name, (old, new, with_item) in QUERIES.items():
+            params = lookups if with_item else [(user,) for user, _ in lookups]
+            for layout, query in (("old", old), ("new", new)):
+                await measure(conn, query, params[:50])  # warm up
+                timings = await measure(conn, query, params)
+                print(
+                    f"{name:<8} {layout}  mean {statistics.mean(timings) * 1e6:>8.0f} µs"
+                    f"  p50 {timings[len(timings) // 2] * 1e6:>8.0f} µs"
+                    f"  p99 {timings[int(len(timings) * 0.99)] * 1e6:>8.0f} µs"
+                    f"  {await plan(conn, query, params[0])}"
+                )
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.get_event_loop().run_until_complete(main(parser.parse_args()))
@@ -0,0 +1,72 @@
+"""Measures the overhead per permit of the ratelimiters.
+
+The rate is set high enough that no permit is ever waited for, so the numbers are the cost of
+the bookkeeping alone: a lock and some arithmetic for TokenBucket, and one EVALSHA round trip
+for RedisTokenBucket.
+
+Usage: python -m benchmarks.ratelimit [--redis redis://localhost] [--permits 10000]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import aioredis
+
+from utils.ratelimit import RedisTokenBucket, TokenBucket
+
+KEY = "travapi:ratelimit:benchmark"
+
+
+async def measure(bucket, permits: int, concurrency: int) -> list:
+    timings = []
+
+    async def worker(count: int):
+        for _ in range(count):
+            start = time.perf_counter()
+            await bucket.acquire()
+            timings.append(time.perf_counter() - start)
+
+    await asyncio.gather(*[worker(permits // concurrency) for _ in range(concurrency)])
+    return timings
+
+
+def report(name: str, timings: list, elapsed: float):
+    timings = sorted(timings)
+    print(
+        f"{name:<32} {len(timings) / elapsed:>10.0f} permits/s"
+        f"  mean {statistics.mean(timings) * 1e6:>8.1f} µs"
+        f"  p50 {timings[len(timings) // 2] * 1e6:>8.1f} µs"
+        f"  p99 {timings[int(len(timings) * 0.99)] * 1e6:>8.1f} µs"
+    )
+
+
+async def main(args):
+    redis = await aioredis.create_pool(args.redis)
+    rate = args.permits * 10
+    try:
+        for concurrency in (1, 10, 100):
+            for name, bucket in (
+                ("TokenBucket", TokenBucket(rate, 1)),
+                ("RedisTokenBucket", RedisTokenBucket(redis, KEY, rate, 1)),
+            ):
+                await redis.execute("DEL", KEY)
+                start = time.perf_counter()
+                timings = await measure(bucket, args.permits, concurrency)
+                report(
+                    f"{name} ({concurrency} concurrent)",
+                    timings,
+                    time.perf_counter() - start,
+                )
+    finally:
+        await redis.execute("DEL", KEY)
+        redis.close()
+        await redis.wait_closed()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--redis", default="redis://localhost")
+    parser.add_argument("--permits", type=int, default=10000)
+    asyncio.get_event_loop().run_until_complete(main(parser.parse_args()))
@@ -3,13 +3,16 @@ import datetime
 from discord.ext import commands
 
 from classes.context import Context
-from utils.checks import ApiIsDead
+from utils.reactions import ReactionDispatcher
+from utils.scheduler import Priority, current_priority
 
 
 class Bot(commands.AutoShardedBot):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.launch_time = datetime.datetime.now()
+        self.reactions = ReactionDispatcher(self.loop)
+        self.tracer = None
 
     async def on_message(self, message):
         if (message.author.id in self.config.bans) or (message.author == self.user):
@@ -18,11 +21,16 @@ class Bot(commands.AutoShardedBot):
 
     async def process_commands(self, message):
         ctx = await super().get_context(message, cls=Context)
-        await super().invoke(ctx)
+        # commands decorated with utils.scheduler.priority change it once they run
+        current_priority.set(Priority.INTERACTIVE)
+        # started before the checks run, as they may query the database
+        trace = self.tracer.start(ctx) if self.tracer and ctx.command else None
+        try:
+            await super().invoke(ctx)
+        finally:
+            if trace is not None:
+                self.tracer.finish(ctx, trace)
 
-    async def check_for_error_500(self):
-        ttl = await self.redis.execute("TTL", f"travapi:520")
-        if ttl == -2:
-            return True
-        else:
-            raise ApiIsDead(ttl)
+    async def on_raw_reaction_add(self, payload):
+        if payload.user_id != self.user.id:
+            self.reactions.dispatch(payload)
@@ -1,3 +1,4 @@
+import asyncio
 from contextlib import suppress
 from typing import Optional, Union
 
@@ -14,6 +15,9 @@ class Context(commands.Context):
         super().__init__(**kwargs)
         self.bot = kwargs.pop("bot")
         self.db = self.bot.pool
+        # set by the tracer if this invocation is traced
+        self.trace = None
+        self.trace_sampled = False
 
     async def confirm(
         self,
@@ -39,21 +43,19 @@ class Context(commands.Context):
         for emoji in emojis:
             await msg.add_reaction(emoji)
 
-        def check(r: discord.Reaction, u: discord.User) -> bool:
-            return u == user and r.emoji in emojis and r.message.id == msg.id
-
         async def cleanup() -> None:
             with suppress(discord.HTTPException):
                 await msg.delete()
 
+        choices = [str(emoji) for emoji in emojis]
         try:
-            reaction, _ = await self.bot.wait_for(
-                "reaction_add", check=check, timeout=timeout
+            payload = await self.bot.reactions.wait_for(
+                msg.id, user_id=user.id, emojis=choices, timeout=timeout
             )
-        except TimeoutError:
+        except asyncio.TimeoutError:
             await cleanup()
             raise NoChoice("You did not choose anything.")
 
         await cleanup()
 
-        return bool(emojis.index(reaction.emoji))
+        return bool(choices.index(str(payload.emoji)))
@@ -0,0 +1,241 @@
+import asyncio
+import hashlib
+import time
+from typing import Any, AsyncIterator, Callable, List, Tuple, Union
+
+from aiohttp import ClientError
+
+from utils.breaker import CircuitBreaker
+from utils.cache import ResponseCache
+from utils.checks import ApiIsDead, ApiUnavailable, TooManyRequests
+from utils.query import Query, canonical_url, endpoint, has_param, with_params
+from utils.ratelimit import RedisTokenBucket
+from utils.scheduler import Priority, PriorityScheduler, current_priority
+from utils.tracing import span
+
+
+class TravitiaClient:
+    """Shared client for the Travitia API.
+
+    Every request waits for a permit from the token bucket, so bursts from many users
+    are queued instead of running into the API's ratelimit. The bucket is stored in Redis and
+    shared by all processes using the same API token."""
+
+    base_url = "https://public-api.travitia.xyz/idle/"
+
+    def __init__(self, bot):
+        self.bot = bot
+        rate, per = getattr(bot.config, "api_ratelimit", (3, 10))
+        # the ratelimit belongs to the token, so every process using it shares the bucket
+        token = hashlib.sha256(bot.config.api_token.encode()).hexdigest()
+        self.bucket = RedisTokenBucket(
+            bot.redis, f"travapi:ratelimit:{token}", rate, per
+        )
+        self.scheduler = PriorityScheduler(
+            self.bucket, aging=getattr(bot.config, "api_priority_aging", 30)
+        )
+        self.page_size = getattr(bot.config, "api_page_size", 500)
+        self.cache = ResponseCache(
+            bot.redis,
+            ttls=getattr(bot.config, "api_cache_ttls", {}),
+            negative_ttl=getattr(bot.config, "api_cache_negative_ttl", 15),
+            stale=getattr(bot.config, "api_cache_stale", 3600),
+        )
+        self.breaker = CircuitBreaker(
+            bot.redis, **getattr(bot.config, "api_breaker", {})
+        )
+        self._refreshing = set()
+        self._inflight = {}
+        self.coalesced = 0
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": self.bot.config.api_token}
+
+    def url(self, query: Union[str, Query]) -> str:
+        """Prepends the base URL to a query, if it is not already there."""
+        query = str(query)
+        return query if query.startswith(self.base_url) else self.base_url + query
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self.scheduler)
+
+    @property
+    def wait_time(self) -> float:
+        return self.bucket.last_wait
+
+    async def request(self, query: Union[str, Query]) -> Tuple[int, Any]:
+        """Sends a GET request to the API and returns the status code and the parsed JSON.
+
+        Concurrent requests for the same query share a single request and its result, so
+        callers must not modify the returned data.
+        Raises ApiIsDead while the circuit breaker is open or when the request opened it,
+        ApiUnavailable on other 5XX status codes and connection errors, and TooManyRequests
+        on 429."""
+        url = canonical_url(self.url(query))
+        task = self._inflight.get(url)
+        if task is None:
+            task = self.bot.loop.create_task(self._request(url))
+            self._inflight[url] = task
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        else:
+            self.coalesced += 1
+        # shielded, so one invocation being cancelled does not fail the others
+        return await asyncio.shield(task)
+
+    async def _request(self, url: str) -> Tuple[int, Any]:
+        return await self._send(url, lambda r: r.json(content_type=None))
+
+    async def _send(self, url: str, consume: Callable) -> Tuple[int, Any]:
+        # fails fast while the circuit is open, instead of waiting for a permit first
+        await self.breaker.allow(claim=False)
+        with span("api.wait"):
+            await self.scheduler.acquire()
+        # claimed only now, so the probe cannot time out while it waits in the queue
+        probe = await self.breaker.allow()
+        recorded = False
+        try:
+            start = time.perf_counter()
+            try:
+                with span("api", endpoint=endpoint(url)):
+                    async with self.bot.session.get(url, headers=self.headers) as r:
+                        status = r.status
+                        if status // 100 != 5 and status != 429:
+                            result = await consume(r)
+            except (ClientError, asyncio.TimeoutError, ValueError):
+                # the body not being valid JSON counts as a failure, like losing the connection
+                status = None
+            self.bot.metrics.observe_request(url, status, time.perf_counter() - start)
+
+            failed = status is None or status // 100 == 5
+            opened = await self.breaker.record(not failed, probe)
+            recorded = True
+        finally:
+            if probe and not recorded:
+                # a probe that raised or was cancelled must not leave the circuit half-open
+                await self.breaker.record(False, probe)
+        if opened:
+            raise ApiIsDead(opened)
+        elif failed:
+            raise ApiUnavailable(status)
+        elif status == 429:
+            raise TooManyRequests()
+        return status, result
+
+    async def stream(
+        self, query: Union[str, Query], consume: Callable
+    ) -> Tuple[int, Any]:
+        """Sends a GET request and passes the response to `consume` while the body is still being received.
+
+        Returns the status code and what `consume` returned. Streamed requests are neither
+        cached nor coalesced."""
+        return await self._send(self.url(query), consume)
+
+    async def get(self, query: Union[str, Query], *, cache: bool = True) -> Any:
+        """Like request, but only returns the parsed JSON.
+
+        Successful responses are cached with the TTL configured for their endpoint. While the
+        API is not available, expired entries are served instead and refreshed once it is back.
+        """
+        url = canonical_url(self.url(query))
+        entry = await self.cache.get(url) if cache else None
+        if entry is not None and entry.fresh:
+            return entry.data
+
+        try:
+            status, data = await self.request(url)
+        except (ApiIsDead, ApiUnavailable) as e:
+            if entry is None:
+                raise
+            self.schedule_refresh(url, getattr(e, "timer", 0))
+            return entry.data
+
+        if cache and status == 200:
+            await self.cache.set(url, data)
+        return data
+
+    def paged(self, query: Union[str, Query], order: str = "id.asc") -> str:
+        """Returns the full URL of a query, ordered by `order` unless it is ordered already.
+
+        Paging through unordered results is not stable."""
+        url = self.url(query)
+        if order and not has_param(url, "order"):
+            url = with_params(url, order=order)
+        return url
+
+    async def page(
+        self,
+        query: Union[str, Query],
+        index: int,
+        *,
+        page_size: int = None,
+        order: str = "id.asc",
+        cache: bool = True,
+    ) -> List[Any]:
+        """Fetches a single page of a query, using limit and offset."""
+        page_size = page_size or self.page_size
+        return await self.get(
+            with_params(
+                self.paged(query, order), limit=page_size, offset=index * page_size
+            ),
+            cache=cache,
+        )
+
+    async def pages(
+        self,
+        query: Union[str, Query],
+        *,
+        page_size: int = None,
+        order: str = "id.asc",
+        cache: bool = True,
+    ) -> AsyncIterator[List[Any]]:
+        """Walks a query page by page, using limit and offset, and yields each page.
+
+        Every page is a separate request and waits for its own permit. If the query is not
+        ordered, it is ordered by `order` so that pages are stable."""
+        page_size = page_size or self.page_size
+        url = self.paged(query, order)
+
+        offset = 0
+        while True:
+            page = await self.get(
+                with_params(url, limit=page_size, offset=offset), cache=cache
+            )
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            offset += len(page)
+
+    async def iterate(self, query: Union[str, Query], **kwargs) -> AsyncIterator[Any]:
+        """Like pages, but yields the single rows."""
+        async for page in self.pages(query, **kwargs):
+            for row in page:
+                yield row
+
+    def schedule_refresh(self, url: str, delay: int):
+        """Refreshes a cached query in the background once the API is available again.
+
+        Only one refresh per query runs at a time, across all processes."""
+        if url in self._refreshing:
+            return
+        self._refreshing.add(url)
+        self.bot.loop.create_task(self._refresh(url, delay))
+
+    async def _refresh(self, url: str, delay: int):
+        current_priority.set(Priority.BACKGROUND)
+        lock = f"travapi:refresh:{self.cache.key(url)}"
+        try:
+            if not await self.bot.redis.execute(
+                "SET", lock, "1", "NX", "EX", max(delay, 0) + 60
+            ):
+                return
+            await asyncio.sleep(max(delay, 0))
+            status, data = await self.request(url)
+            if status == 200:
+                await self.cache.set(url, data)
+        except Exception:
+            pass
+        finally:
+            self._refreshing.discard(url)
@@ -1,17 +1,22 @@
 import asyncio
 from io import BytesIO
+from tempfile import SpooledTemporaryFile
 from pprint import pformat, pprint
 from typing import Union
 from urllib.parse import unquote
 
 import discord
 from discord.ext import commands
-from discord.ext.commands.cooldowns import BucketType
 
 from classes.converters import IntRange
 from config import api_cooldown
 from utils.checks import *
-from utils.paginator import Paginator
+from utils.cooldowns import cooldown
+from utils.jsonstream import JsonStream
+from utils.merging import plan_merges, stat
+from utils.paginator import ApiPaginator, Paginator
+from utils.query import Query
+from utils.scheduler import Priority, priority
 
 
 def elongate(string: str, length: int):
@@ -19,6 +24,12 @@ def elongate(string: str, length: int):
     return done
 
 
+def write_entry(fp, entry, index: int):
+    """Writes a pretty-printed array entry to a file, indented like pformat would."""
+    separator = ",\n " if index else ""
+    fp.write((separator + pformat(entry).replace("\n", "\n ")).encode())
+
+
 class Api(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -78,7 +89,7 @@ class Api(commands.Cog):
                 return level - 1
         return 30
 
-    @commands.cooldown(1, api_cooldown, BucketType.user)
+    @cooldown(1, api_cooldown)
     @commands.command()
     async def get(self, ctx, *, query: str):
         """
@@ -86,7 +97,12 @@ class Api(commands.Cog):
         If the output is too long, it will be put in an attached txt file.
 
         The "https://public-api.travitia.xyz/idle/" part of the URL does not need to be included.
+        Start the query with --pages to browse the result page by page instead; only the pages
+        you look at are requested. Add an order (e.g. &order=id.asc) to keep pages stable.
         """
+        paginate = query.startswith("--pages ")
+        if paginate:
+            query = query[len("--pages ") :].strip()
         if (
             not query.startswith(self.base_url)
             and not query.split("?")[0] in self.endpoints
@@ -101,43 +117,42 @@ class Api(commands.Cog):
             if not query.startswith(self.base_url)
             else query
         )
-        color = 0x00FF00
-        await self.bot.check_for_error_500()
-        async with self.bot.session.get(
-            query, headers={"Authorization": self.bot.config.api_token}
-        ) as r:
-            status = r.status
-            if status != 200:
-                if int(status / 100) == 5:
-                    await self.bot.redis.execute(
-                        "SET", f"travapi:520", "timeout", "EX", 3600
-                    )
-                    return await ctx.send(
-                        "The API returned a 5XX error code. This means it is currently not available."
-                        " Please try again in one hour."
-                    )
-                elif status == 429:
-                    return await ctx.send(
-                        "429: Too many requests. The API only allows three requests per"
-                        " ten seconds."
-                    )
-                color = 0xFF0000
-            res = await r.json()
+        if paginate:
+
+            def render(rows: list) -> discord.Embed:
+                text = pformat(rows).replace("`", "\u200b`\u200b")
+                if len(text) > 1900:
+                    text = f"{text[:1900]}..."
+                return discord.Embed(
+                    title=query[:256],
+                    description=f"```py\n{text}\n```",
+                    color=0x00FF00,
+                )
 
-        if len(str(res)) > 1500:
-            File = discord.File(
-                filename="result.txt", fp=BytesIO(pformat(res).encode())
-            )
+            return await ApiPaginator(
+                self.bot.travitia,
+                query,
+                page_size=25,
+                per_page=5,
+                order=None,
+                render=render,
+            ).paginate(ctx)
+
+        status, (count, res, fp) = await self.bot.travitia.stream(
+            query, self.render_result
+        )
+        color = 0x00FF00 if status == 200 else 0xFF0000
+
+        if fp is not None:
+            File = discord.File(filename="result.txt", fp=fp)
             nres = (
                 "{0} entries found, content too long to display. Try paginating"
                 " (&limit=10&offset=5), reducing the page size when paginating, or"
-                " selecting fewer columns. The full result is attached.".format(
-                    len(res)
-                )
+                " selecting fewer columns. The full result is attached.".format(count)
             )
         else:
             File = None
-            nres = pformat(await r.json()).replace(
+            nres = pformat(res).replace(
                 "`", "\u200b`\u200b"
             )  # inaccurate, but doesn't break the codeblock in display
         embed = discord.Embed(
@@ -145,9 +160,43 @@ class Api(commands.Cog):
             description="{0}\n```py\n{1}\n```".format(query, nres),
             color=color,
         )
-        await ctx.send(embed=embed, file=File)
+        try:
+            await ctx.send(embed=embed, file=File)
+        finally:
+            if fp is not None:
+                fp.close()
+
+    async def render_result(self, r):
+        """Decodes a response for the get command while it is being received.
+
+        As long as the result is short enough to display, its entries are kept. Once it gets
+        too long, everything is written to a spooled file instead, entry by entry.
+        Returns the entry count, the result (if kept) and the file (if any)."""
+        stream = JsonStream(r.content)
+        entries, size, count, fp = [], 0, 0, None
+
+        async for entry in stream:
+            count += 1
+            if fp is None:
+                entries.append(entry)
+                size += len(str(entry))
+                if size <= 1500:
+                    continue
+                fp = SpooledTemporaryFile(max_size=1024 * 1024)
+                fp.write(b"[" if stream.array else b"")
+                for index, kept in enumerate(entries):
+                    write_entry(fp, kept, index)
+                entries = None
+            else:
+                write_entry(fp, entry, count - 1)
+
+        if fp is not None:
+            fp.write(b"]" if stream.array else b"")
+            fp.seek(0)
+            return count, None, fp
+        return count, entries if stream.array or not entries else entries[0], None
 
-    @commands.cooldown(1, api_cooldown, BucketType.user)
+    @cooldown(1, api_cooldown)
     @commands.command()
     async def items(self, ctx, user: int = None):
         """
@@ -155,32 +204,18 @@ class Api(commands.Cog):
         [user] is a user ID. If not given, the author's ID is used.
         """
         user = user or ctx.author.id
-        person = await self.bot.fetch_user(user)
-        query = f"{self.base_url}allitems?select=id,damage,armor,name,type,inventory(equipped)d&owner=eq.{user}&inventory.equipped=is.true"
-        await self.bot.check_for_error_500()
-        async with self.bot.session.get(
-            query, headers={"Authorization": self.bot.config.api_token}
-        ) as r:
-            status = r.status
-            if status != 200:
-                if int(status / 100) == 5:
-                    await self.bot.redis.execute(
-                        "SET", f"travapi:520", "timeout", "EX", 3600
-                    )
-                    return await ctx.send(
-                        "The API returned a 5XX error code. This means it is currently not available."
-                        " Please try again in one hour."
-                    )
-                elif status == 429:
-                    return await ctx.send(
-                        "429: Too many requests. The API only allows three requests per"
-                        " ten seconds."
-                    )
-            res = await r.json()
-            if not res:
-                res = "This user has no items equipped or does not have a profile!"
-            else:
-                res = pformat([r for r in res if r["inventory"]])
+        person = await self.bot.resolver.resolve(user) or user
+        query = (
+            Query("allitems")
+            .select("id", "damage", "armor", "name", "type", "inventory(equipped)")
+            .eq("owner", user)
+            .is_("inventory.equipped", True)
+        )
+        res = await self.bot.travitia.get(query)
+        if not res:
+            res = "This user has no items equipped or does not have a profile!"
+        else:
+            res = pformat([r for r in res if r["inventory"]])
         embed = discord.Embed(
             title=f"{person}'s equipped items:",
             description="```py\n{0}\n```".format(res),
@@ -188,7 +223,7 @@ class Api(commands.Cog):
         )
         await ctx.send(embed=embed)
 
-    @commands.cooldown(1, api_cooldown, BucketType.user)
+    @cooldown(1, api_cooldown)
     @commands.command(aliases=["p", "pp", "me"])
     async def profile(
         self, ctx, *, user: Union[discord.User, discord.Member, int] = None
@@ -198,57 +233,37 @@ class Api(commands.Cog):
             person = str(user)
             user = user.id
         else:
-            try:
-                person = await self.bot.fetch_user(user)
-            except discord.NotFound:
+            person = await self.bot.resolver.resolve(user)
+            if person is None:
                 return await ctx.send("This user does not exist.")
-        query = f"{self.base_url}profile?user=eq.{user}"
-        await self.bot.check_for_error_500()
-        async with self.bot.session.get(
-            query, headers={"Authorization": self.bot.config.api_token}
-        ) as r:
-            status = r.status
-            if status != 200:
-                if int(status / 100) == 5:
-                    await self.bot.redis.execute(
-                        "SET", f"travapi:520", "timeout", "EX", 3600
-                    )
-                    return await ctx.send(
-                        "The API returned a 5XX error code. This means it is currently not available."
-                        " Please try again in one hour."
-                    )
-                elif status == 429:
-                    return await ctx.send(
-                        "429: Too many requests. The API only allows three requests per"
-                        " ten seconds."
-                    )
-            res = await r.json()
-            if not res:
-                ponse = "This user has no profile!"
-            else:
-                dic = res[0]
-                max_len = 0
-                for item in dic.keys():
-                    if len(str(item) + ":") > max_len:
-                        max_len = len(str(item))
-                ponse = "\n".join(
-                    [
-                        f"{elongate(x[0]+':', max_len)} {x[1]}"
-                        for x in dic.items()
-                    ]
-                )
+        query = Query("profile").eq("user", user)
+        res = await self.bot.travitia.get(query)
+        if not res:
+            ponse = "This user has no profile!"
+        else:
+            dic = res[0]
+            max_len = 0
+            for item in dic.keys():
+                if len(str(item) + ":") > max_len:
+                    max_len = len(str(item))
+            ponse = "\n".join(
+                [
+                    f"{elongate(x[0]+':', max_len)} {x[1]}"
+                    for x in dic.items()
+                ]
+            )
 
-            embed = discord.Embed(
-                title=f"{person}'s profile",
-                description=f"""\
+        embed = discord.Embed(
+            title=f"{person}'s profile",
+            description=f"""\
 ```
 {ponse}
 ```
 """,
-            )
-            await ctx.send(embed=embed)
+        )
+        await ctx.send(embed=embed)
 
-    @commands.cooldown(1, api_cooldown, BucketType.user)
+    @cooldown(1, api_cooldown)
     @commands.command()
     async def merge(self, ctx, item: Union[int, str]):
         """Finds an item that would be ideal to merge, based on the given item ID or type.
@@ -256,7 +271,9 @@ class Api(commands.Cog):
         Equipped items, as well as items with a signature are automatically filtered out."""
 
         if isinstance(item, int):
-            query = f"{self.base_url}allitems?select=*,inventory(equipped)&id=eq.{item}"
+            query = (
+                Query("allitems").select("*", "inventory(equipped)").eq("id", item)
+            )
 
         else:
             valid_types = {
@@ -280,33 +297,17 @@ class Api(commands.Cog):
             max_ = 82 if valid_types[item] == "both" else 41
             doa = "armor" if item == "Shield" else "damage"
             query = (
-                f"{self.base_url}allitems?"
-                f"select=*,inventory(equipped)&type=eq.{item.title()}&order={doa}.desc&{doa}=lt.{max_}"
-                f"&owner=eq.{ctx.author.id}&limit=1"
+                Query("allitems")
+                .select("*", "inventory(equipped)")
+                .eq("type", item)
+                .lt(doa, max_)
+                .eq("owner", ctx.author.id)
+                .order(doa, "desc")
+                .limit(1)
             )
             # query gets the highest, still mergeable item of that type
 
-        await self.bot.check_for_error_500()
-        async with self.bot.session.get(
-            query,
-            headers={"Authorization": self.bot.config.api_token},
-        ) as r:
-            status = r.status
-            if status != 200:
-                if int(status / 100) == 5:
-                    await self.bot.redis.execute(
-                        "SET", f"travapi:520", "timeout", "EX", 3600
-                    )
-                    return await ctx.send(
-                        "The API returned a 5XX error code. This means it is currently not available."
-                        " Please try again in one hour."
-                    )
-                elif status == 429:
-                    return await ctx.send(
-                        "429: Too many requests. The API only allows three requests per"
-                        " ten seconds."
-                    )
-            res = await r.json()
+        res = await self.bot.travitia.get(query, cache=False)
         if not res:
             if isinstance(item, int):
                 return await ctx.send(
@@ -326,6 +327,12 @@ class Api(commands.Cog):
                 "This item is already at max mergeable stat or above."
             )
 
+        if not res["inventory"]:
+            # items on the market have no inventory entry
+            return await ctx.send(
+                f"Item `{res['id']}` is not in an inventory; it may be on the market."
+            )
+
         item_id = res["id"]
         doa = "armor" if res["type"] == "Shield" else "damage"
         absmax_ = 82 if res["hand"] == "both" else 41
@@ -341,51 +348,18 @@ class Api(commands.Cog):
             ):
                 return await ctx.send("Command cancelled.")
         query = (
-            "{base_url}allitems?select=*,inventory(equipped)&armor=gte."
-            "{_min}&armor=lte.{_max}&type=eq.{_type}&inventory.equipped=is.true&order=armor.asc&signature=is.null"
-            "&owner=eq.{owner}".format(
-                base_url=self.base_url,
-                _min=res["armor"] - 5,
-                _max=absmax_
-                if res["armor"] + 5 >= absmax_
-                else res["armor"] + 5,
-                _type=res["type"],
-                owner=res["owner"],
-            )
-            if res["type"] == "Shield"
-            else "{base_url}allitems?select=*,inventory(equipped)&damage=gte."
-            "{_min}&damage=lte.{_max}&type=eq.{_type}&inventory.equipped=is.true&order=damage.asc&signature=is.null"
-            "&owner=eq.{owner}".format(
-                base_url=self.base_url,
-                _min=res["damage"] - 5,
-                _max=absmax_
-                if res["damage"] + 5 >= absmax_
-                else res["damage"] + 5,
-                _type=res["type"],
-                owner=res["owner"],
-            )
+            Query("allitems")
+            .select("*", "inventory(equipped)")
+            .gte(doa, res[doa] - 5)
+            .lte(doa, min(res[doa] + 5, absmax_))
+            .eq("type", res["type"])
+            .is_("inventory.equipped", True)
+            .is_("signature", None)
+            .eq("owner", res["owner"])
+            .order(doa)
         )
 
-        await self.bot.check_for_error_500()
-        async with self.bot.session.get(
-            query, headers={"Authorization": self.bot.config.api_token}
-        ) as r:
-            status = r.status
-            if status != 200:
-                if int(status / 100) == 5:
-                    await self.bot.redis.execute(
-                        "SET", f"travapi:520", "timeout", "EX", 3600
-                    )
-                    return await ctx.send(
-                        "The API returned a 5XX error code. This means it is currently not available."
-                        " Please try again in one hour."
-                    )
-                elif status == 429:
-                    return await ctx.send(
-                        "429: Too many requests. The API only allows three requests per"
-                        " ten seconds."
-                    )
-            nres = await r.json()
+        nres = await self.bot.travitia.get(query, cache=False)
 
         if not nres:
             return await ctx.send("No fitting items found...")
@@ -425,7 +399,60 @@ Found {len(items)} mergable item(s).
 `$merge {item_id} {items[0]["id"]}`"""
         )
 
-    @commands.cooldown(1, api_cooldown, BucketType.user)
+    @priority(Priority.BULK)
+    @cooldown(1, api_cooldown)
+    @commands.command()
+    async def mergeall(self, ctx):
+        """Plans as many merges as possible for your whole inventory at once.
+
+        Items are only paired with items of the same type and at most 5 stat apart. Equipped items, as well as items with a signature are left out.
+        The plan is sent as paste-ready `$merge` commands and as a file."""
+        async with ctx.typing():
+            items = [
+                item
+                async for item in self.bot.travitia.iterate(
+                    Query("allitems")
+                    .select(
+                        "id",
+                        "type",
+                        "hand",
+                        "damage",
+                        "armor",
+                        "signature",
+                        "inventory(equipped)",
+                    )
+                    .eq("owner", ctx.author.id),
+                    cache=False,
+                )
+            ]
+        pairs = plan_merges(items)
+        if not pairs:
+            return await ctx.send("No fitting items found...")
+
+        lines = [f"$merge {kept['id']} {merged['id']}" for kept, merged in pairs]
+        plan = "\n".join(
+            f"{kept['id']}: {stat(kept)} {kept['type']} + {merged['id']}: {stat(merged)} {merged['type']}"
+            for kept, merged in pairs
+        )
+        File = discord.File(
+            fp=BytesIO((f"{plan}\n\n" + "\n".join(lines) + "\n").encode()),
+            filename="mergeplan.txt",
+        )
+
+        shown, length = [], 0
+        for line in lines:
+            length += len(line) + 1
+            if length > 1800:
+                shown.append(f"...and {len(lines) - len(shown)} more")
+                break
+            shown.append(line)
+        shown = "\n".join(shown)
+        await ctx.send(
+            f"Found {len(pairs)} merge(s) for {len(items)} item(s).\n```\n{shown}```",
+            file=File,
+        )
+
+    @cooldown(1, api_cooldown)
     @commands.command(aliases=["item", "i"])
     async def iteminfo(self, ctx, *itemids: IntRange):
         """Get info on item(s), from their owners to signatures and stats."""
@@ -439,29 +466,9 @@ Found {len(items)} mergable item(s).
                 ":warning: Cannot view more than 250 items at a time, only selecting the first 250"
             )
             itemids = itemids[0:249]
-        joined_items = ",".join(str(i) for i in itemids)
-        query = f"{self.base_url}allitems?id=in.({joined_items})"
-
-        await self.bot.check_for_error_500()
-        async with self.bot.session.get(
-            query, headers={"Authorization": self.bot.config.api_token}
-        ) as r:
-            status = r.status
-            if status != 200:
-                if int(status / 100) == 5:
-                    await self.bot.redis.execute(
-                        "SET", f"travapi:520", "timeout", "EX", 3600
-                    )
-                    return await ctx.send(
-                        "The API returned a 5XX error code. This means it is currently not available."
-                        " Please try again in one hour."
-                    )
-                elif status == 429:
-                    return await ctx.send(
-                        "429: Too many requests. The API only allows three requests per"
-                        " ten seconds."
-                    )
-            res = await r.json()
+        query = Query("allitems").in_("id", itemids)
+
+        res = await self.bot.travitia.get(query)
 
         if not res:
             if len(itemids) == 1:
@@ -482,69 +489,67 @@ Found {len(items)} mergable item(s).
 
         # item = res[0]
 
-        item_embeds = []
+        # embeds and owners are only looked up once their page is shown
+        await Paginator(records=res, render=self.item_embed).paginate(ctx)
+
+        # await ctx.send(embed=embed)
 
-        for item in res:
+    async def item_embed(self, item: dict) -> discord.Embed:
+        """Builds the iteminfo page of an item."""
+        pn = (
+            "An"
+            if item["type"].startswith(("A", "E", "I", "O", "U"))
+            else "A"
+        )
+        doa = "armor" if item["type"] == "Shield" else "damage"
+        stat = item["damage"] + item["armor"]
+        owner = await self.bot.resolver.resolve(item["owner"]) or "Unknown user"
 
+        embed = discord.Embed(
+            title=item["name"],
+            description=f"{pn} {item['type'].lower()} with {stat} {doa}",
+        )
+        # embed.add_thumbnail(url=f"attachment://{item['type']}.png")
+        embed.add_field(
+            name="Currently owned by",
+            value=f"{owner} ({item['owner']})",
+            inline=False,
+        )
+        embed.add_field(
+            name="General info",
+            value="Item ID: {0}\nItem value: {1}\nHand used: {2}".format(
+                item["id"], item["value"], item["hand"]
+            ),
+            inline=False,
+        )
+
+        if item["signature"]:
+            embed.add_field(
+                name="Signature", value=item["signature"], inline=False
+            )
+        if item["original_type"]:
             pn = (
                 "An"
-                if item["type"].startswith(("A", "E", "I", "O", "U"))
+                if item["original_type"].startswith(
+                    ("A", "E", "I", "O", "U")
+                )
                 else "A"
             )
-            doa = "armor" if item["type"] == "Shield" else "damage"
-            stat = item["damage"] + item["armor"]
-            owner = await self.bot.fetch_user(item["owner"])
-
-            embed = discord.Embed(
-                title=item["name"],
-                description=f"{pn} {item['type'].lower()} with {stat} {doa}",
-            )
-            # embed.add_thumbnail(url=f"attachment://{item['type']}.png")
             embed.add_field(
-                name="Currently owned by",
-                value=f"{owner} ({item['owner']})",
-                inline=False,
+                name="Original Type",
+                value=f"This item was originally {pn} {item['original_type']}",
             )
-            embed.add_field(
-                name="General info",
-                value="Item ID: {0}\nItem value: {1}\nHand used: {2}".format(
-                    item["id"], item["value"], item["hand"]
-                ),
-                inline=False,
-            )
-
-            if item["signature"]:
-                embed.add_field(
-                    name="Signature", value=item["signature"], inline=False
-                )
-            if item["original_type"]:
-                pn = (
-                    "An"
-                    if item["original_type"].startswith(
-                        ("A", "E", "I", "O", "U")
-                    )
-                    else "A"
-                )
-                embed.add_field(
-                    name="Original Type",
-                    value=f"This item was originally {pn} {item['original_type']}",
-                )
-            item_embeds.append(embed)
-
-        await Paginator(extras=item_embeds).paginate(ctx)
+        return embed
 
-        # await ctx.send(embed=embed)
-
-    def get_guild(self, *, name: str = None, _id: int = None) -> str:
+    def get_guild(self, *, name: str = None, _id: int = None) -> Query:
         if not name and not _id:
             raise ValueError("Neither name nor ID given")
         if _id:
-            url = f"{self.base_url}guild?id=eq.{_id}&limit=1"
-        else:
-            url = f"{self.base_url}guild?name=eq.{name}"
-        return url
+            return Query("guild").eq("id", _id).limit(1)
+        return Query("guild").eq("name", name)
 
-    @commands.cooldown(1, api_cooldown, BucketType.user)
+    @priority(Priority.BULK)
+    @cooldown(1, api_cooldown)
     @commands.command(usage="<Name or ID>")
     async def guildmembers(self, ctx, *, name_or_id: Union[int, str]):
         """Returns a list of all guild, paginated"""
@@ -554,25 +559,7 @@ Found {len(items)} mergable item(s).
         else:
             url = self.get_guild(_id=name_or_id)
 
-        async with self.bot.session.get(
-            url, headers={"Authorization": self.bot.config.api_token}
-        ) as r:
-            status = r.status
-            if status != 200:
-                if int(status / 100) == 5:
-                    await self.bot.redis.execute(
-                        "SET", f"travapi:520", "timeout", "EX", 3600
-                    )
-                    return await ctx.send(
-                        "The API returned a 5XX error code. This means it is currently not available."
-                        " Please try again in one hour."
-                    )
-                elif status == 429:
-                    return await ctx.send(
-                        "429: Too many requests. The API only allows three requests per"
-                        " ten seconds."
-                    )
-            res = await r.json()
+        res = await self.bot.travitia.get(url)
 
         # this is a guild
         if not res:
@@ -586,77 +573,52 @@ Found {len(items)} mergable item(s).
         # now we actually have a guild
         # we get the members by its ID
         guild_id = res[0]["id"]
-        url = f"{self.base_url}profile?guild=eq.{guild_id}"
-        async with self.bot.session.get(
-            url, headers={"Authorization": self.bot.config.api_token}
-        ) as r:
-            status = r.status
-            if status != 200:
-                if int(status / 100) == 5:
-                    await self.bot.redis.execute(
-                        "SET", f"travapi:520", "timeout", "EX", 3600
-                    )
-                    return await ctx.send(
-                        "The API returned a 5XX error code. This means it is currently not available."
-                        " Please try again in one hour."
-                    )
-                elif status == 429:
-                    return await ctx.send(
-                        "429: Too many requests. The API only allows three requests per"
-                        " ten seconds."
-                    )
-            res = await r.json()
+        url = Query("profile").eq("guild", guild_id)
+
+        async def render(members: list) -> discord.Embed:
+            # copied, the response may be shared with other invocations
+            member = dict(members[0], level=self.get_level(members[0]["xp"]))
+            if GET_USERNAMES:
+                member["username"] = (
+                    await self.bot.resolver.resolve(member["user"]) or member["user"]
+                )
+            else:
+                member["username"] = member["user"]
+
+            max_len = 0
+            for item in member.keys():
+                if len(str(item) + ":") > max_len:
+                    max_len = len(str(item))
+            ponse = "\n".join(
+                [f"{elongate(x[0]+':', max_len)} {x[1]}" for x in member.items()]
+            )
+
+            return discord.Embed(
+                title=str(member["username"]),
+                description=f"""\
+```
+{ponse}
+```
+""",
+            )
+
+        # members are only fetched once their page is shown
+        paginator = ApiPaginator(
+            self.bot.travitia, url, page_size=10, order="user.asc", render=render
+        )
 
         # now we have a list of members
-        if not res:
+        if not await paginator.first():
             return await ctx.send(
                 "Somehow this guild does not have any members. I have no idea how this happened."
             )
 
-        if await ctx.confirm(
-            "Do you wanna get the usernames too? Might take a while."
-        ):
+        if await ctx.confirm("Do you wanna get the usernames too?"):
             GET_USERNAMES = True
         else:
             GET_USERNAMES = False
 
-        embeds = []
-
-        async with ctx.channel.typing():
-            for member in res:
-                member["level"] = self.get_level(member["xp"])
-                if GET_USERNAMES:
-                    member["username"] = ctx.guild.get_member(member["user"])
-                    if not member["username"]:
-                        member["username"] = await self.bot.fetch_user(
-                            member["user"]
-                        )
-                        # await asyncio.sleep(0.5)
-                else:
-                    member["username"] = member["user"]
-
-                max_len = 0
-                for item in member.keys():
-                    if len(str(item) + ":") > max_len:
-                        max_len = len(str(item))
-                ponse = "\n".join(
-                    [
-                        f"{elongate(x[0]+':', max_len)} {x[1]}"
-                        for x in member.items()
-                    ]
-                )
-
-                embed = discord.Embed(
-                    title=str(member["username"]),
-                    description=f"""\
-```
-{ponse}
-```
-""",
-                )
-                embeds.append(embed)
-
-        await Paginator(extras=embeds).paginate(ctx)
+        await paginator.paginate(ctx)
 
 
 def setup(bot):
@@ -1,3 +1,4 @@
+import math
 import traceback
 from datetime import timedelta
 
@@ -13,7 +14,7 @@ class Errors(commands.Cog):
         if isinstance(error, commands.CommandNotFound):
             return
         elif isinstance(error, commands.CommandOnCooldown):
-            time = timedelta(seconds=int(error.retry_after))
+            time = timedelta(seconds=math.ceil(error.retry_after))
             return await ctx.send(
                 "You are on cooldown! Try again in {0}.\nAlternatively, take a look at `{1}source` to host your own version!".format(
                     time, ctx.prefix
@@ -32,7 +33,22 @@ class Errors(commands.Cog):
         elif isinstance(error, ApiIsDead):
             return await ctx.send(
                 f"The API returned a 5XX error code. This means it is currently not available."
-                f" Please try again in {error.timer} seconds."
+                " Please try again in {0}.".format(
+                    f"{error.timer} seconds" if error.timer else "a few seconds"
+                )
+            )
+        elif isinstance(error, ApiUnavailable):
+            return await ctx.send(
+                "The API {0}. Please try again.".format(
+                    f"returned a {error.status} error code"
+                    if error.status
+                    else "could not be reached"
+                )
+            )
+        elif isinstance(error, TooManyRequests):
+            return await ctx.send(
+                "429: Too many requests. The API only allows three requests per"
+                " ten seconds."
             )
         elif isinstance(error, commands.CheckFailure):
             if isinstance(error, CommandInDevelopment):
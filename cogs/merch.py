@@ -1,16 +1,18 @@
-import argparse
 import asyncio
+import functools
 import shlex
 from io import BytesIO
 from typing import Union
 
 import discord
 from discord.ext import commands
-from discord.ext.commands.cooldowns import BucketType
 
 from config import api_cooldown
 from utils.checks import dev, has_pro
-from utils.paginator import Paginator
+from utils.cooldowns import cooldown
+from utils.paginator import ApiPaginator, Paginator
+from utils.query import Query
+from utils.scheduler import Priority, priority
 
 
 def chunks(iterable, size):
@@ -19,15 +21,164 @@ def chunks(iterable, size):
         yield iterable[i : i + size]
 
 
-class Arguments(argparse.ArgumentParser):
-    def error(self, message):
-        raise RuntimeError(message)
+@functools.lru_cache(maxsize=None)
+def xmerch_parser():
+    """Builds the parser for xmerch's arguments once, on first use."""
+    import argparse
+
+    class Arguments(argparse.ArgumentParser):
+        def error(self, message):
+            raise RuntimeError(message)
+
+    parser = Arguments(add_help=False, allow_abbrev=True)
+    parser.add_argument("--help", action="store_true", help="Shows this message.")
+    parser.add_argument(
+        "-u",
+        "--user",
+        help=(
+            "A Discord User, could be their tag or User ID. Defaults to the command"
+            " author if not given."
+        ),
+    )
+    parser.add_argument(
+        "-hi",
+        "--upper",
+        type=int,
+        default=0,
+        help=(
+            "The highest stat to include, this is inclusive. Should be an integer"
+            " type. Defaults to 100."
+        ),
+    )
+    parser.add_argument(
+        "-lo",
+        "--lower",
+        type=int,
+        default=0,
+        help=(
+            "The lowest stat to include, this is inclusive. Should be an integer"
+            " type. Defaults to 0."
+        ),
+    )
+    parser.add_argument(
+        "-t",
+        "--type",
+        "--types",
+        nargs="+",
+        type=str.title,
+        default=[],
+        help=(
+            "The item types to include. All types by default. Can be multiple (view"
+            " examples page)."
+        ),
+    )
+    parser.add_argument(
+        "-h",
+        "--hand",
+        "--hands",
+        nargs="+",
+        type=str.lower,
+        default=[],
+        help=(
+            "The item hands to include. All hands by default. Can be multiple (view"
+            " examples page)."
+        ),
+    )
+    parser.add_argument(
+        "-vh",
+        "--valueupper",
+        type=int,
+        default=0,
+        help=(
+            "The highest value to include, this is inclusive. Should be an integer"
+            " type. Defaults to 10000."
+        ),
+    )
+    parser.add_argument(
+        "-vl",
+        "--valuelower",
+        type=int,
+        default=0,
+        help=(
+            "The lowest value to include, this is inclusive. Should be an integer"
+            " type. Defaults to 0."
+        ),
+    )
+    parser.add_argument(
+        "-idlo",
+        "--idlower",
+        type=int,
+        default=0,
+        help=(
+            "The lowest item ID to include, this is inclusive. Should be an integer"
+            " type. Defaults to 0."
+        ),
+    )
+    parser.add_argument(
+        "-idhi",
+        "--idupper",
+        type=int,
+        default=0,
+        help=(
+            "The highest item ID to include, this is inclusive. Should be an"
+            " integer type. Defaults to 100000000."
+        ),
+    )
+    parser.add_argument(
+        "-ex",
+        "--exclude",
+        nargs="+",
+        type=int,
+        default=[],
+        help=(
+            "A list of item IDs to exclude. Should be integer types. Can be"
+            " multiple (view examples page)."
+        ),
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=100,
+        help=(
+            "The amount of items to include in the output. Above 100 may be hard to"
+            " process, above 150 may be impossible to send. Should be an integer"
+            " type. Defaults to 100."
+        ),
+    )
+    parser.add_argument(
+        "--file",
+        action="store_true",
+        help=(
+            "If given, will send the full list as an attached .log file, after"
+            " exclusion but before limiting."
+        ),
+    )
+    parser.add_argument(
+        "--copy",
+        "-cc",
+        action="store_true",
+        help=(
+            "If given, will make it easier to copy, without the need to add the"
+            " backticks manually."
+        ),
+    )
+    return parser
 
 
 class Merch(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    @staticmethod
+    def inventory_query(user: int) -> Query:
+        """A query for the IDs of a user's items, with their inventory entry only if unequipped."""
+        return (
+            Query("allitems")
+            .select("id", "inventory(equipped)")
+            .is_("inventory.equipped", False)
+            .eq("owner", user)
+        )
+
     def format_url(
         self,
         *,
@@ -41,45 +192,69 @@ class Merch(commands.Cog):
         id_upper: int = None,
         id_lower: int = None,
     ):
-        base = f"https://public-api.travitia.xyz/idle/allitems?&select=id,inventory(equipped)&inventory.equipped=is.false&owner=eq.{user}"
-        dmg, dfn = f"{base}&armor=eq.0", f"{base}&damage=eq.0"
+        """Builds a single query for a user's unequipped items matching the filters.
+
+        Items count as weapons (armor 0) or shields (damage 0), and the stat bounds apply to
+        damage or armor respectively, so both cases are combined in one `or` filter."""
+        query = self.inventory_query(user)
+        dmg, dfn = Query().eq("armor", 0), Query().eq("damage", 0)
 
         if stat_lower:
-            dmg += f"&damage=gte.{stat_lower}"
-            dfn += f"&armor=gte.{stat_lower}"
+            dmg.gte("damage", stat_lower)
+            dfn.gte("armor", stat_lower)
 
         if stat_upper:
-            dmg += f"&damage=lte.{stat_upper}"
-            dfn += f"&armor=lte.{stat_upper}"
+            dmg.lte("damage", stat_upper)
+            dfn.lte("armor", stat_upper)
+
+        query.or_(dmg, dfn)
 
         if types:
-            dmg += f"&type=in.({','.join(types)})"
-            dfn += f"&type=in.({','.join(types)})"
+            query.in_("type", types)
 
         if hands:
-            dmg += f"&hand=in.({','.join(hands)})"
-            dfn += f"&hand=in.({','.join(hands)})"
+            query.in_("hand", hands)
 
         if value_lower:
-            dmg += f"&value=gte.{value_lower}"
-            dfn += f"&value=gte.{value_lower}"
+            query.gte("value", value_lower)
 
         if value_upper:
-            dmg += f"&value=lte.{value_upper}"
-            dfn += f"&value=lte.{value_upper}"
+            query.lte("value", value_upper)
 
         if id_lower:
-            dmg += f"&id=gte.{id_lower}"
-            dfn += f"&id=gte.{id_lower}"
+            query.gte("id", id_lower)
 
         if id_upper:
-            dmg += f"&id=lte.{id_upper}"
-            dfn += f"&id=lte.{id_upper}"
+            query.lte("id", id_upper)
+
+        return query
 
-        return [dmg, dfn]
+    async def protected(self, user: int) -> list:
+        """The IDs of a user's protected items."""
+        return [
+            r["item_id"]
+            for r in await self.bot.pool.fetch(
+                "SELECT item_id FROM protected_items WHERE user_id=$1;", user
+            )
+        ]
+
+    async def collect_ids(self, query: Query, *, exclude: list, limit: int = None):
+        """Collects the IDs of unequipped items from the query, page by page.
+
+        Stops fetching pages once more than `limit` IDs have been found."""
+        itemlist = []
+        exclude = {str(i) for i in exclude}
+        async for item in self.bot.travitia.iterate(query):
+            item_id = str(item["id"])
+            if not item["inventory"] or item_id in exclude:
+                continue
+            itemlist.append(item_id)
+            if limit is not None and len(itemlist) > limit:
+                break
+        return itemlist
 
     @has_pro()
-    @commands.cooldown(1, api_cooldown, BucketType.user)
+    @cooldown(1, api_cooldown)
     @commands.command(aliases=["favourite", "favorite", "fav"])
     async def protect(self, ctx, *ids: int):
         """Protect items so that they will not be included in merch searches.
@@ -88,38 +263,18 @@ class Merch(commands.Cog):
             return await ctx.send("No item IDs given.")
         HINT = False
         ids = sorted(list(set(ids)))  # kill dupes
-        await self.bot.check_for_error_500()
-        async with self.bot.session.get(
-            "https://public-api.travitia.xyz/idle/allitems?select=owner,id&"
-            f"id=in.({','.join([str(i) for i in ids])})",
-            headers={"Authorization": self.bot.config.api_token},
-        ) as r:
-            if r.status != 200:
-                if int(status / 100) == 5:
-                    await self.bot.redis.execute(
-                        "SET", f"travapi:520", "timeout", "EX", 3600
-                    )
-                    return await ctx.send(
-                        "The API returned a 5XX error code. This means it is currently not available."
-                        " Please try again in one hour."
-                    )
-            res = await r.json()
+        res = await self.bot.travitia.get(
+            Query("allitems").select("owner", "id").in_("id", ids)
+        )
         ids_ = sorted([i["id"] for i in res if i["owner"] == ctx.author.id])
         if ids != ids_:
             HINT = True
-        async with self.bot.pool.acquire() as conn:
-            already_protected = (
-                await conn.fetchval(
-                    'SELECT protected FROM items WHERE "user"=$1;', ctx.author.id
-                )
-                or []
-            )
-            to_protect = list(set(already_protected + ids_))
-            await conn.execute(
-                'UPDATE items SET protected=$1 WHERE "user"=$2',
-                to_protect,
-                ctx.author.id,
-            )
+        await self.bot.pool.execute(
+            """INSERT INTO protected_items (user_id, item_id)
+            SELECT $1, unnest($2::bigint[]) ON CONFLICT DO NOTHING;""",
+            ctx.author.id,
+            ids_,
+        )
         await ctx.send(
             "Updated protected items. Use `< viewfav` to verify.{}".format(
                 "\nPlease note that some of the items did not belong to you, so they haven't been added."
@@ -134,12 +289,10 @@ class Merch(commands.Cog):
         """Remove one of your protected items, they can then appear in merch searches again."""
         if not ids:
             return await ctx.send("No item IDs given.")
-        protected = await self.bot.pool.fetchval(
-            'SELECT protected FROM items WHERE "user"=$1;', ctx.author.id
-        )
-        to_protect = list(set(protected) - set(ids))
         await self.bot.pool.execute(
-            'UPDATE items SET protected=$1 WHERE "user"=$2;', to_protect, ctx.author.id
+            "DELETE FROM protected_items WHERE user_id=$1 AND item_id=ANY($2::bigint[]);",
+            ctx.author.id,
+            list(ids),
         )
         await ctx.send("Updated protected items. Use `< viewfav` to verify.")
 
@@ -148,41 +301,69 @@ class Merch(commands.Cog):
     async def clearfav(self, ctx):
         """Clear your protected items list."""
         await self.bot.pool.execute(
-            """UPDATE items SET protected='{}' WHERE "user"=$1;""", ctx.author.id
+            "DELETE FROM protected_items WHERE user_id=$1;", ctx.author.id
         )
         await ctx.send("Cleared your protected items list.")
 
+    @commands.group(invoke_without_command=True)
+    async def mirror(self, ctx):
+        """Keep a copy of your inventory, so merch and xmerch can filter it without waiting for the API.
+        Use `< mirror on` to start and `< mirror off` to stop. The copy is brought up to date automatically."""
+        count = await self.bot.pool.fetchval(
+            "SELECT count(*) FROM mirror_items WHERE owner=$1;", ctx.author.id
+        )
+        if not await self.bot.mirror.enabled(ctx.author.id):
+            return await ctx.send(
+                f"Your inventory is not mirrored. Use `{ctx.prefix}mirror on` to start."
+            )
+        await ctx.send(f"Your inventory is mirrored, with {count} items.")
+
+    @priority(Priority.BULK)
+    @cooldown(1, api_cooldown)
+    @mirror.command(name="on")
+    async def mirror_on(self, ctx):
+        """Start mirroring your inventory."""
+        async with ctx.typing():
+            await self.bot.mirror.enable(ctx.author.id)
+        await ctx.send(
+            "Your inventory is mirrored now. merch and xmerch will use the mirror for"
+            " your items."
+        )
+
+    @mirror.command(name="off")
+    async def mirror_off(self, ctx):
+        """Stop mirroring your inventory and delete the copy."""
+        await self.bot.mirror.disable(ctx.author.id)
+        await ctx.send("Your inventory is not mirrored anymore.")
+
+    @priority(Priority.BULK)
+    @cooldown(1, api_cooldown)
+    @mirror.command(name="sync")
+    async def mirror_sync(self, ctx):
+        """Bring the copy of your inventory up to date right now, e.g. after trading items."""
+        if not await self.bot.mirror.enabled(ctx.author.id):
+            return await ctx.send(
+                f"Your inventory is not mirrored. Use `{ctx.prefix}mirror on` to start."
+            )
+        async with ctx.typing():
+            count = await self.bot.mirror.sync(ctx.author.id, full=True)
+        await ctx.send(f"Synced your mirror, it has {count} items now.")
+
+    @priority(Priority.BULK)
     @has_pro()
-    @commands.cooldown(1, api_cooldown, BucketType.user)
+    @cooldown(1, api_cooldown)
     @commands.command()
     async def viewfav(self, ctx):
         """View a list of your protected items."""
-        items = await self.bot.pool.fetchval(
-            'SELECT protected FROM items WHERE "user"=$1', ctx.author.id
-        )
+        items = await self.protected(ctx.author.id)
         if not items:
             return await ctx.send("No protected items!")
 
-        await self.bot.check_for_error_500()
-        async with self.bot.session.get(
-            "https://public-api.travitia.xyz/idle/allitems?select=name,id,armor,damage&"
-            f"id=in.({','.join([str(i) for i in items])})",
-            headers={"Authorization": self.bot.config.api_token},
-        ) as r:
-            if r.status != 200:
-                if int(r.status / 100) == 5:
-                    await self.bot.redis.execute(
-                        "SET", f"travapi:520", "timeout", "EX", 3600
-                    )
-                    return await ctx.send(
-                        "The API returned a 5XX error code. This means it is currently not available."
-                        " Please try again in one hour."
-                    )
-            data = await r.json()
+        query = (
+            Query("allitems").select("name", "id", "armor", "damage").in_("id", items)
+        )
 
-        extras = []
-        chunkers = chunks(data, 5)
-        for chunk in chunkers:
+        def render(chunk: list) -> discord.Embed:
             e = discord.Embed(
                 title="Protected items",
                 color=discord.Color.blurple(),
@@ -197,10 +378,15 @@ class Merch(commands.Cog):
                     value=f"With {type_[1]} {type_[0]} | ID: {i['id']}",
                     inline=False,
                 )
-            extras.append(e)
-        await Paginator(extras=extras).paginate(ctx)
+            return e
 
-    @commands.cooldown(1, api_cooldown, BucketType.user)
+        # items are fetched 25 at a time, once their page is shown
+        await ApiPaginator(
+            self.bot.travitia, query, page_size=25, per_page=5, render=render
+        ).paginate(ctx)
+
+    @priority(Priority.BULK)
+    @cooldown(1, api_cooldown)
     @commands.command(aliases=["merchant", "merchall"])
     async def merch(
         self,
@@ -227,14 +413,6 @@ class Merch(commands.Cog):
                 f"Could not convert {user} to discord.User or int."
             )
 
-        exc = (
-            await self.bot.pool.fetchval(
-                'SELECT protected FROM items WHERE "user"=$1', ctx.author.id
-            )
-            or []
-        )
-        exc = [str(i) for i in exc]
-
         if (upperbound is not None) and not lowerbound:
             lowerbound = 0
 
@@ -245,81 +423,37 @@ class Merch(commands.Cog):
                     f"`lowerbound ({lowerbound})` is larger than `upperbound"
                     f" ({upperbound})`; switching the values..."
                 )
-
-            querydamage = (
-                f"https://public-api.travitia.xyz/idle/allitems?&select=id,inventory("
-                f"equipped)&inventory.equipped=is.false&owner=eq.{user}&damage=gte.{lowerbound}&damage=lte."
-                f"{upperbound}&armor=eq.0 "
-            )
-            queryarmor = (
-                f"https://public-api.travitia.xyz/idle/allitems?&select=id,inventory("
-                f"equipped)&inventory.equipped=is.false&owner=eq.{user}&armor=gte.{lowerbound}&armor=lte."
-                f"{upperbound}&damage=eq.0 "
-            )
+                lowerbound, upperbound = upperbound, lowerbound
 
             async with ctx.typing():
-                await self.bot.check_for_error_500()
-                async with self.bot.session.get(
-                    querydamage, headers={"Authorization": self.bot.config.api_token}
-                ) as r:
-                    status = r.status
-                    if status != 200:
-                        if int(status / 100) == 5:
-                            await self.bot.redis.execute(
-                                "SET", f"travapi:520", "timeout", "EX", 3600
-                            )
-                            return await ctx.send(
-                                "The API returned a 5XX error code. This means it is currently not available."
-                                " Please try again in one hour."
-                            )
-                        elif status == 429:
-                            return await ctx.send(
-                                "429: Too many requests. The API only allows three"
-                                " requests per ten seconds."
-                            )
-                    resdamage = await r.json()
-                weaponlist = [str(item["id"]) for item in resdamage]
-                await self.bot.check_for_error_500()
-                async with self.bot.session.get(
-                    queryarmor, headers={"Authorization": self.bot.config.api_token}
-                ) as r:
-                    if r.status != 200:
-                        if int(r.status / 100) == 5:
-                            await self.bot.redis.execute(
-                                "SET", f"travapi:520", "timeout", "EX", 3600
-                            )
-                            return await ctx.send(
-                                "The API returned a 5XX error code. This means it is currently not available."
-                                " Please try again in one hour."
-                            )
-                    resarmor = await r.json()
-                shieldlist = [str(item["id"]) for item in resarmor]
-                itemlist = list(set(weaponlist + shieldlist) - set(exc))
+                itemlist = await self.bot.mirror.item_ids(
+                    user,
+                    exclude=[],
+                    protected_by=ctx.author.id,
+                    limit=150,
+                    stat_lower=lowerbound,
+                    stat_upper=upperbound,
+                )
+                if itemlist is None:
+                    itemlist = await self.collect_ids(
+                        self.format_url(
+                            user=user, stat_lower=lowerbound, stat_upper=upperbound
+                        ),
+                        exclude=await self.protected(ctx.author.id),
+                        limit=150,
+                    )
 
         else:
-            query = (
-                f"https://public-api.travitia.xyz/idle/allitems?&select=id,inventory("
-                f"equipped)&inventory.equipped=is.false&owner=eq.{user}"
-            )
             async with ctx.typing():
-                await self.bot.check_for_error_500()
-                async with self.bot.session.get(
-                    query, headers={"Authorization": self.bot.config.api_token}
-                ) as r:
-                    if r.status != 200:
-                        if int(r.status / 100) == 5:
-                            await self.bot.redis.execute(
-                                "SET", f"travapi:520", "timeout", "EX", 3600
-                            )
-                            return await ctx.send(
-                                "The API returned a 5XX error code. This means it is currently not available."
-                                " Please try again in one hour."
-                            )
-                    res = await r.json()
-                itemlist = list(
-                    set([str(item["id"]) for item in res if item["inventory"]])
-                    - set(exc)
+                itemlist = await self.bot.mirror.item_ids(
+                    user, exclude=[], protected_by=ctx.author.id, limit=150
                 )
+                if itemlist is None:
+                    itemlist = await self.collect_ids(
+                        self.inventory_query(user),
+                        exclude=await self.protected(ctx.author.id),
+                        limit=150,
+                    )
 
         if len(itemlist) == 0:
             return await ctx.send("No items to merch!")
@@ -335,16 +469,10 @@ class Merch(commands.Cog):
 
         await out.add_reaction("\U0001F5D1")
 
-        def recheck(r, u):
-            return (
-                str(r.emoji) == "\U0001F5D1"
-                and r.message.id == out.id
-                and u.id == ctx.author.id
-                and not u.bot
-            )
-
         try:
-            await self.bot.wait_for("reaction_add", check=recheck, timeout=30)
+            await self.bot.reactions.wait_for(
+                out.id, user_id=ctx.author.id, emojis=["\U0001F5D1"], timeout=30
+            )
             return await out.delete()
         except asyncio.TimeoutError:
             try:
@@ -352,7 +480,8 @@ class Merch(commands.Cog):
             except discord.Forbidden:
                 await out.remove_reaction("\U0001F5D1", ctx.me)
 
-    @commands.cooldown(1, api_cooldown, BucketType.user)
+    @priority(Priority.BULK)
+    @cooldown(1, api_cooldown)
     @commands.command(aliases=["xmerchant", "xmerchall"])
     async def xmerch(self, ctx, *, args=None):
         """
@@ -366,138 +495,7 @@ class Merch(commands.Cog):
                 "No arguments passed. Please take a look at `< xmerch --help`"
             )
 
-        parser = Arguments(add_help=False, allow_abbrev=True)
-        parser.add_argument("--help", action="store_true", help="Shows this message.")
-        parser.add_argument(
-            "-u",
-            "--user",
-            help=(
-                "A Discord User, could be their tag or User ID. Defaults to the command"
-                " author if not given."
-            ),
-        )
-        parser.add_argument(
-            "-hi",
-            "--upper",
-            type=int,
-            default=0,
-            help=(
-                "The highest stat to include, this is inclusive. Should be an integer"
-                " type. Defaults to 100."
-            ),
-        )
-        parser.add_argument(
-            "-lo",
-            "--lower",
-            type=int,
-            default=0,
-            help=(
-                "The lowest stat to include, this is inclusive. Should be an integer"
-                " type. Defaults to 0."
-            ),
-        )
-        parser.add_argument(
-            "-t",
-            "--type",
-            "--types",
-            nargs="+",
-            type=str.title,
-            default=[],
-            help=(
-                "The item types to include. All types by default. Can be multiple (view"
-                " examples page)."
-            ),
-        )
-        parser.add_argument(
-            "-h",
-            "--hand",
-            "--hands",
-            nargs="+",
-            type=str.lower,
-            default=[],
-            help=(
-                "The item hands to include. All hands by default. Can be multiple (view"
-                " examples page)."
-            ),
-        )
-        parser.add_argument(
-            "-vh",
-            "--valueupper",
-            type=int,
-            default=0,
-            help=(
-                "The highest value to include, this is inclusive. Should be an integer"
-                " type. Defaults to 10000."
-            ),
-        )
-        parser.add_argument(
-            "-vl",
-            "--valuelower",
-            type=int,
-            default=0,
-            help=(
-                "The lowest value to include, this is inclusive. Should be an integer"
-                " type. Defaults to 0."
-            ),
-        )
-        parser.add_argument(
-            "-idlo",
-            "--idlower",
-            type=int,
-            default=0,
-            help=(
-                "The lowest item ID to include, this is inclusive. Should be an integer"
-                " type. Defaults to 0."
-            ),
-        )
-        parser.add_argument(
-            "-idhi",
-            "--idupper",
-            type=int,
-            default=0,
-            help=(
-                "The highest item ID to include, this is inclusive. Should be an"
-                " integer type. Defaults to 100000000."
-            ),
-        )
-        parser.add_argument(
-            "-ex",
-            "--exclude",
-            nargs="+",
-            type=int,
-            default=[],
-            help=(
-                "A list of item IDs to exclude. Should be integer types. Can be"
-                " multiple (view examples page)."
-            ),
-        )
-        parser.add_argument(
-            "--limit",
-            type=int,
-            default=100,
-            help=(
-                "The amount of items to include in the output. Above 100 may be hard to"
-                " process, above 150 may be impossible to send. Should be an integer"
-                " type. Defaults to 100."
-            ),
-        )
-        parser.add_argument(
-            "--file",
-            action="store_true",
-            help=(
-                "If given, will send the full list as an attached .log file, after"
-                " exclusion but before limiting."
-            ),
-        )
-        parser.add_argument(
-            "--copy",
-            "-cc",
-            action="store_true",
-            help=(
-                "If given, will make it easier to copy, without the need to add the"
-                " backticks manually."
-            ),
-        )
+        parser = xmerch_parser()
 
         valid_types = [
             "Sword",
@@ -613,8 +611,7 @@ class Merch(commands.Cog):
         hiid = abs(args.idupper)
         loid = abs(args.idlower)
 
-        urls = self.format_url(
-            user=user,
+        filters = dict(
             stat_upper=upper or None,
             stat_lower=lower or None,
             types=types or None,
@@ -625,51 +622,23 @@ class Merch(commands.Cog):
             id_lower=loid or None,
         )
 
-        async with ctx.typing():
-            itemlist = []
-            for query in urls:
-                await self.bot.check_for_error_500()
-                async with self.bot.session.get(
-                    query, headers={"Authorization": self.bot.config.api_token}
-                ) as r:
-                    status = r.status
-                    if status != 200:
-                        if int(status / 100) == 5:
-                            await self.bot.redis.execute(
-                                "SET", f"travapi:520", "timeout", "EX", 3600
-                            )
-                            return await ctx.send(
-                                "The API returned a 5XX error code. This means it is currently not available."
-                                " Please try again in one hour."
-                            )
-                        elif status == 429:
-                            return await ctx.send(
-                                "429: Ratelimits apply, please try again in a few"
-                                " seconds."
-                            )
-                    res = await r.json()
-
-                itemlist += res
-
-        if len(itemlist) == 0:
-            return await ctx.send("No items to merch!")
+        limit = abs(args.limit)
 
-        itemlist = [str(item["id"]) for item in itemlist if item["inventory"]]
-        exc = (
-            await self.bot.pool.fetchval(
-                'SELECT protected FROM items WHERE "user"=$1', ctx.author.id
+        async with ctx.typing():
+            # mirrored inventories are filtered locally
+            itemlist = await self.bot.mirror.item_ids(
+                user,
+                exclude=args.exclude,
+                protected_by=ctx.author.id,
+                limit=None if args.file else limit,
+                **filters,
             )
-            or []
-        )
-        exc = [str(i) for i in exc]
-        exclude = [
-            str(i) for i in set(args.exclude)
-        ] + exc  # removes dupes too, I'm a genius
-        for i in exclude:
-            try:
-                itemlist.remove(i)
-            except ValueError:
-                pass
+            if itemlist is None:
+                itemlist = await self.collect_ids(
+                    self.format_url(user=user, **filters),
+                    exclude=args.exclude + await self.protected(ctx.author.id),
+                    limit=None if args.file else limit,
+                )
 
         if len(itemlist) == 0:
             return await ctx.send("No items to merch!")
@@ -680,12 +649,7 @@ class Merch(commands.Cog):
             )
             if not ctx.me.permissions_in(ctx.channel).attach_files:
                 return await ctx.send("I don't have permission to attach files here :(")
-            return await ctx.send(
-                "Here is your list!\nPlease note that due to API limitations, this list might be incomplete.",
-                file=File,
-            )
-
-        limit = abs(args.limit)
+            return await ctx.send("Here is your list!", file=File)
 
         if args.copy:
             output = "\`\`\`\n$merch {0}\n\`\`\`".format(" ".join(itemlist[:limit]))
@@ -706,16 +670,10 @@ class Merch(commands.Cog):
 
         await out.add_reaction("\U0001F5D1")
 
-        def recheck(r, u):
-            return (
-                str(r.emoji) == "\U0001F5D1"
-                and r.message.id == out.id
-                and u.id == ctx.author.id
-                and not u.bot
-            )
-
         try:
-            await self.bot.wait_for("reaction_add", check=recheck, timeout=30)
+            await self.bot.reactions.wait_for(
+                out.id, user_id=ctx.author.id, emojis=["\U0001F5D1"], timeout=30
+            )
             return await out.delete()
         except asyncio.TimeoutError:
             try:
@@ -2,8 +2,6 @@ import datetime
 import platform
 
 import discord
-import humanize
-import psutil
 from discord.ext import commands
 
 
@@ -36,6 +34,10 @@ class Miscellaneous(commands.Cog):
     @commands.command(aliases=["statistics"])
     async def stats(self, ctx):
         """View some statisics about the bot."""
+        # imported here, as they are slow to import and only needed for this
+        import humanize
+        import psutil
+
         meminfo = psutil.virtual_memory()
         embed = discord.Embed(title="Statistics", color=discord.Color.blurple())
         embed.add_field(name="CPU info", value=f"**{psutil.cpu_percent()}%** used")
@@ -45,6 +47,15 @@ class Miscellaneous(commands.Cog):
                 f"**{meminfo.percent}%** of {humanize.naturalsize(meminfo.total)} used"
             ),
         )
+        embed.add_field(
+            name="API queue",
+            value="\n".join(
+                f"{p.name.title()}: **{s.waiting}** waiting, average wait"
+                f" {s.average_wait:.2f}s"
+                for p, s in self.bot.travitia.scheduler.stats.items()
+            )
+            + f"\nCircuit: {await self.bot.travitia.breaker.state()}",
+        )
         embed.add_field(
             name="Development",
             value=(
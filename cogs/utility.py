@@ -1,5 +1,4 @@
 import discord
-import humanize
 from discord.ext import commands
 
 from utils.paginator import Paginator
@@ -21,6 +20,8 @@ class Utility(commands.Cog):
 
     @commands.command(alises=["user", "userinfo"])
     async def info(self, ctx, user: discord.Member = None):
+        import humanize
+
         user = user or ctx.author
 
         baseinfo_embed = discord.Embed(
@@ -84,6 +85,8 @@ class Utility(commands.Cog):
     @commands.command()
     async def lookup(self, ctx, user_id: int):
         """Look up a user by their ID."""
+        import humanize
+
         if user_id <= 0:
             return await ctx.send(
                 "I can already tell you this guy does not exist. "
@@ -98,7 +101,7 @@ class Utility(commands.Cog):
                 )
             )
 
-        user = await self.bot.fetch_user(user_id)
+        user = await self.bot.resolver.resolve(user_id)
         if not user:
             return await ctx.send("Could not find this user.")
 
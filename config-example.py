@@ -18,4 +18,62 @@ postgres_login = {
 """User cooldown for API commands. This will set a cooldown for API commands to make sure your token is not reset because of overuse."""
 api_cooldown = 30
 
+"""Requests allowed per seconds by the API, as (requests, seconds). Requests above this are queued until a slot frees up."""
+api_ratelimit = (3, 10)
+
+"""Seconds to cache API responses for, per endpoint. Endpoints that are not listed are not cached."""
+api_cache_ttls = {"allitems": 60, "profile": 120, "guild": 300}
+
+"""Seconds to cache empty results for, at most."""
+api_cache_negative_ttl = 15
+
+"""Seconds to keep expired responses around, to serve while the API is not available."""
+api_cache_stale = 3600
+
+"""Rows to request per page when walking large results. Must not be above the API's maximum rows per request."""
+api_page_size = 500
+
+"""Circuit breaker settings. The API is considered dead once `threshold` of the requests in the last `window` seconds failed,
+with at least `min_requests` made. It is then probed again after `open_for` seconds, doubling up to `max_open_for` seconds."""
+api_breaker = {
+    "window": 60,
+    "min_requests": 3,
+    "threshold": 0.5,
+    "open_for": 30,
+    "max_open_for": 3600,
+}
+
+"""API requests are served interactive commands first, then bulk commands like merch, then background work.
+A request waiting this many seconds longer than another one goes first, even if it has a lower priority."""
+api_priority_aging = 30
+
+"""Seconds after which a mirrored inventory is synced with the API again before it is used."""
+mirror_max_age = 600
+
+"""Seconds to wait for Postgres, Redis and logging in to Discord when starting, before giving up."""
+startup_timeout = 30
+
+"""File to save in-memory caches to when the bot is stopped, to start with them warm. None disables this.
+With several clusters, every cluster appends its number to the name."""
+snapshot_path = "cache.snapshot"
+
+"""Number of processes to run the bot in when started with launcher.py. Each process runs a slice of the shards."""
+clusters = 1
+
+"""Total number of shards when started with launcher.py. None uses the number Discord recommends."""
+shard_count = None
+
+"""Connection pool sizes per process. Keep (clusters * max_size) below your Postgres server's max_connections."""
+postgres_pool = {"min_size": 2, "max_size": 10}
+redis_pool = {"minsize": 1, "maxsize": 10}
+
+"""Port to serve Prometheus metrics on, at /metrics. None disables the server. Clusters use consecutive ports from this one."""
+metrics_host = "127.0.0.1"
+metrics_port = None
+
+"""Writes where the time of commands went to a file, as JSON lines. `sample_rate` is the share of commands written,
+commands slower than `slow` seconds are always written. None disables tracing."""
+tracing = None
+# tracing = {"path": "traces.jsonl", "sample_rate": 0.01, "slow": 10}
+
 bans = []
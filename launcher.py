@@ -0,0 +1,130 @@
+import asyncio
+import math
+import signal
+import sys
+import time
+
+from aiohttp import ClientSession
+
+import config
+
+# Discord allows one identify per 5 seconds, shards of a cluster connect one after another
+IDENTIFY_DELAY = 5
+
+
+async def get_shard_count() -> int:
+    """Returns the configured shard count, or the one Discord recommends."""
+    if getattr(config, "shard_count", None):
+        return config.shard_count
+    async with ClientSession() as session:
+        async with session.get(
+            "https://discord.com/api/v8/gateway/bot",
+            headers={"Authorization": f"Bot {config.token}"},
+        ) as r:
+            r.raise_for_status()
+            return (await r.json())["shards"]
+
+
+class Cluster:
+    """A bot process running a slice of the shards, restarted whenever it exits."""
+
+    def __init__(self, index: int, count: int, shard_ids: list, shard_count: int):
+        self.index = index
+        self.count = count
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.process = None
+        self.stopping = False
+        self.stopped = asyncio.Event()
+
+    def log(self, message: str):
+        print(f"[Cluster {self.index}] {message}", flush=True)
+
+    async def sleep(self, seconds: float):
+        """Like asyncio.sleep, but returns early once the cluster is stopped."""
+        try:
+            await asyncio.wait_for(self.stopped.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run(self, delay: float):
+        await self.sleep(delay)
+        backoff = IDENTIFY_DELAY
+        while not self.stopping:
+            started = time.monotonic()
+            self.process = await asyncio.create_subprocess_exec(
+                sys.executable,
+                "main.py",
+                "--cluster",
+                str(self.index),
+                "--clusters",
+                str(self.count),
+                "--shards",
+                ",".join(str(i) for i in self.shard_ids),
+                "--shard-count",
+                str(self.shard_count),
+            )
+            self.log(f"started with shards {self.shard_ids}, PID {self.process.pid}")
+            if self.stopping:
+                # stopped while the process was starting
+                self.process.terminate()
+            code = await self.process.wait()
+            if self.stopping:
+                return
+
+            # a cluster that keeps crashing right away is restarted less and less often
+            if time.monotonic() - started > 60:
+                backoff = IDENTIFY_DELAY
+            else:
+                backoff = min(backoff * 2, 300)
+            self.log(f"exited with code {code}, restarting in {backoff} seconds")
+            await self.sleep(backoff)
+
+    async def stop(self):
+        self.stopping = True
+        self.stopped.set()
+        if self.process is not None and self.process.returncode is None:
+            self.process.terminate()
+            await self.process.wait()
+
+
+async def run(clusters: list):
+    await asyncio.gather(
+        *[
+            # delayed, so clusters do not identify at the same time
+            cluster.run(delay=i * len(cluster.shard_ids) * IDENTIFY_DELAY)
+            for i, cluster in enumerate(clusters)
+        ]
+    )
+
+
+def plan(shard_count: int, count: int) -> list:
+    count = min(count, shard_count)
+    per_cluster = math.ceil(shard_count / count)
+    slices = [
+        list(range(start, min(start + per_cluster, shard_count)))
+        for start in range(0, shard_count, per_cluster)
+    ]
+    return [Cluster(i, len(slices), ids, shard_count) for i, ids in enumerate(slices)]
+
+
+loop = asyncio.get_event_loop()
+shard_count = loop.run_until_complete(get_shard_count())
+clusters = plan(shard_count, getattr(config, "clusters", 1))
+print(f"Running {shard_count} shards in {len(clusters)} clusters", flush=True)
+
+
+async def stop():
+    await asyncio.gather(*[cluster.stop() for cluster in clusters])
+
+
+for sig in (signal.SIGINT, signal.SIGTERM):
+    try:
+        # stopping the clusters lets run return, so none are left without a supervisor
+        loop.add_signal_handler(sig, lambda: loop.create_task(stop()))
+    except NotImplementedError:
+        pass  # on Windows, only Ctrl+C is handled, below
+try:
+    loop.run_until_complete(run(clusters))
+except KeyboardInterrupt:
+    loop.run_until_complete(stop())
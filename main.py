@@ -1,46 +1,209 @@
+import argparse
 import asyncio
 import datetime
-import os
+import importlib
+import signal
 import traceback
 
 import aioredis
 import asyncpg
-from aiohttp import ClientSession
+from aiohttp import ClientError, ClientSession, ClientTimeout
 from discord.ext import commands
 
 import config
 from classes.bot import Bot
+from classes.travitia import TravitiaClient
+from utils import snapshot
+from utils.metrics import Metrics
+from utils.migrations import migrate
+from utils.mirror import InventoryMirror
+from utils.startup import Startup
+from utils.tracing import TracedPool, Tracer, trace_http
+from utils.users import UserResolver
 
+parser = argparse.ArgumentParser(description="Runs the bot, or one cluster of it.")
+parser.add_argument("--cluster", type=int, default=0)
+parser.add_argument("--clusters", type=int, default=1)
+parser.add_argument("--shards", type=lambda s: [int(i) for i in s.split(",")])
+parser.add_argument("--shard-count", type=int)
 
-async def run():
-    bot = Bot(command_prefix=commands.when_mentioned_or(config.command_prefix))
-    bot.remove_command("help")
 
-    bot.pool = await asyncpg.create_pool(**config.postgres_login)
-    bot.redis = await aioredis.create_pool("redis://localhost")
+# extensions loaded before connecting, in this order
+EXTENSIONS = (
+    "cogs.errors",
+    "cogs.help",
+    "cogs.api",
+    "cogs.merch",
+    "cogs.misc",
+    "cogs.utility",
+)
+# loaded once the bot is ready, as they are slow to import and not needed before
+LATE_EXTENSIONS = ("jishaku",)
+
+
+def preload(names):
+    """Imports extensions and what they import, to have it cached when they are loaded."""
+    for name in names:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass  # reported when the extension is loaded
+
+
+def load_extensions(bot, names, startup: Startup):
+    for name in names:
+        try:
+            with startup.phase(name):
+                bot.load_extension(name)
+            print("successfully loaded cog", name)
+        except Exception:
+            with open("error.log", "a+") as error_log:
+                error_log.write("#############################################\n")
+                traceback.print_exc(file=error_log)
+            print(f"# Error loading {name}! See error.log for more info.")
+
+
+async def connect_postgres():
+    pool = await asyncpg.create_pool(
+        **config.postgres_login, **getattr(config, "postgres_pool", {})
+    )
+    await pool.fetchval("SELECT 1;")
+    return pool
+
+
+async def connect_redis():
+    redis = await aioredis.create_pool(
+        "redis://localhost", **getattr(config, "redis_pool", {})
+    )
+    await redis.execute("PING")
+    return redis
+
+
+async def warm_up(session: ClientSession, timeout: float):
+    """Opens a connection to the API ahead of the first command. Failing is not fatal."""
+    try:
+        async with session.head(
+            TravitiaClient.base_url, timeout=ClientTimeout(total=timeout)
+        ):
+            pass
+    except (ClientError, asyncio.TimeoutError) as e:
+        print(f"# Could not reach the API: {e!r}")
+
+
+def snapshot_path(bot):
+    path = getattr(config, "snapshot_path", None)
+    if path and bot.cluster_count > 1:
+        # the clusters' caches differ, every cluster keeps its own
+        path = f"{path}.{bot.cluster}"
+    return path
+
+
+async def shutdown(bot):
+    """Disconnects, saves the in-memory caches for the next start and closes connections."""
+    await bot.close()
+    path = snapshot_path(bot)
+    if path:
+        try:
+            snapshot.write(path, {"users": bot.resolver.entries()})
+        except OSError:
+            with open("error.log", "a+") as error_log:
+                error_log.write("#############################################\n")
+                traceback.print_exc(file=error_log)
+            print("# Error saving the cache snapshot! See error.log for more info.")
+    if bot.metrics.runner is not None:
+        await bot.metrics.runner.cleanup()
+    await bot.session.close()
+    bot.redis.close()
+    await bot.redis.wait_closed()
+    await bot.pool.close()
+
+
+async def run(args):
+    startup = Startup()
+    shards = {}
+    if args.shards is not None:
+        # started by launcher.py, only run our slice of the shards
+        shards = {"shard_ids": args.shards, "shard_count": args.shard_count}
+    bot = Bot(
+        command_prefix=commands.when_mentioned_or(config.command_prefix), **shards
+    )
+    bot.remove_command("help")
+    bot.cluster = args.cluster
+    bot.cluster_count = args.clusters
     bot.session = ClientSession()
+
+    # nothing depends on each other here, so it is all done at once
+    timeout = getattr(config, "startup_timeout", 30)
+    try:
+        with startup.phase("resources"):
+            bot.pool, bot.redis, *_ = await asyncio.gather(
+                startup.run("postgres", connect_postgres(), timeout=timeout),
+                startup.run("redis", connect_redis(), timeout=timeout),
+                startup.run("http", warm_up(bot.session, timeout)),
+                startup.run("login", bot.login(config.token), timeout=timeout),
+                startup.run(
+                    "preload", bot.loop.run_in_executor(None, preload, EXTENSIONS)
+                ),
+            )
+        # before anything uses the database
+        for name in await startup.run("migrations", migrate(bot.pool)):
+            print("applied migration", name)
+    except Exception:
+        print(startup.report())
+        await bot.session.close()
+        raise
+
+    if getattr(config, "tracing", None):
+        # only wrapped when tracing, so there is no overhead otherwise
+        bot.tracer = Tracer(**config.tracing)
+        bot.pool = TracedPool(bot.pool)
+        trace_http(bot.http)
     bot.config = config
+    bot.travitia = TravitiaClient(bot)
+    bot.resolver = UserResolver(bot)
+    path = snapshot_path(bot)
+    if path:
+        with startup.phase("snapshot"):
+            previous = snapshot.Snapshot.open(path)
+        if previous is not None:
+            # entries are only read when they are looked up
+            bot.resolver.snapshot = previous.section("users")
+    bot.mirror = InventoryMirror(bot, max_age=getattr(config, "mirror_max_age", 600))
     bot.started_at = datetime.datetime.now()
+    bot.metrics = Metrics(bot)
+    bot.before_invoke(bot.metrics.before_invoke)
+    bot.after_invoke(bot.metrics.after_invoke)
+    if getattr(config, "metrics_port", None):
+        # every cluster serves its own metrics, on consecutive ports
+        await startup.run(
+            "metrics",
+            bot.metrics.start_server(
+                getattr(config, "metrics_host", "127.0.0.1"),
+                config.metrics_port + bot.cluster,
+            ),
+        )
+
+    with startup.phase("cogs"):
+        load_extensions(bot, EXTENSIONS, startup)
+
+    async def when_ready():
+        with startup.phase("gateway"):
+            await bot.wait_until_ready()
+        load_extensions(bot, LATE_EXTENSIONS, startup)
+        print(startup.report())
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            bot.loop.add_signal_handler(sig, lambda: bot.loop.create_task(bot.close()))
+        except NotImplementedError:
+            pass  # on Windows, Ctrl+C stops the bot without shutting down cleanly
 
     try:
-        for file in os.listdir("cogs"):
-            if file.endswith(".py"):
-                try:
-                    bot.load_extension(f"cogs.{file[:-3]}")
-                    print("successfully loaded cog", file[:-3])
-                except Exception:
-                    with open("error.log", "a+") as error_log:
-                        error_log.write(
-                            "#############################################\n"
-                        )
-                        traceback.print_exc(file=error_log)
-                    error_log.close()
-                    print(f"# Error loading {file}! See error.log for more info.")
-        bot.load_extension("jishaku")
-        await bot.start(config.token)
-    except KeyboardInterrupt:
-        await bot.logout()
+        bot.loop.create_task(when_ready())
+        await bot.connect()
+    finally:
+        await shutdown(bot)
 
 
 loop = asyncio.get_event_loop()
-loop.run_until_complete(run())
+loop.run_until_complete(run(parser.parse_args()))
@@ -0,0 +1,13 @@
+-- Nothing kept a user from having several rows before, merge them first.
+CREATE TEMPORARY TABLE items_merged ON COMMIT DROP AS
+    SELECT "user", coalesce(array_agg(DISTINCT item) FILTER (WHERE item IS NOT NULL), '{}') AS protected
+    FROM items
+    LEFT JOIN LATERAL unnest(protected) AS item ON true
+    GROUP BY "user";
+
+DELETE FROM items;
+
+INSERT INTO items ("user", protected)
+    SELECT "user", protected FROM items_merged;
+
+ALTER TABLE items ADD CONSTRAINT items_pkey PRIMARY KEY ("user");
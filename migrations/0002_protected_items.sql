@@ -0,0 +1,12 @@
+-- One row per protected item instead of an array per user, so checking and excluding
+-- protected items is an index lookup.
+CREATE TABLE protected_items (
+    user_id bigint NOT NULL REFERENCES items ("user") ON DELETE CASCADE,
+    item_id bigint NOT NULL,
+    PRIMARY KEY (user_id, item_id)
+);
+
+INSERT INTO protected_items (user_id, item_id)
+    SELECT DISTINCT "user", item FROM items, unnest(protected) AS item;
+
+ALTER TABLE items DROP COLUMN protected;
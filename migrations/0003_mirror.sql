@@ -0,0 +1,22 @@
+-- Local copies of inventories for `mirror on`. Databases created from schema.sql while it
+-- still had these tables already have them.
+CREATE TABLE IF NOT EXISTS mirror_users (
+    "user" bigint PRIMARY KEY,
+    last_id bigint NOT NULL DEFAULT 0,
+    synced_at timestamp with time zone,
+    full_synced_at timestamp with time zone
+);
+
+CREATE TABLE IF NOT EXISTS mirror_items (
+    id bigint PRIMARY KEY,
+    owner bigint NOT NULL,
+    damage integer NOT NULL,
+    armor integer NOT NULL,
+    value integer NOT NULL,
+    type text NOT NULL,
+    hand text NOT NULL,
+    equipped boolean
+);
+
+CREATE INDEX IF NOT EXISTS mirror_items_owner_idx ON mirror_items (owner, type, damage, armor)
+    WHERE equipped IS FALSE;
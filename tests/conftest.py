@@ -0,0 +1,18 @@
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the bot is run from the repository root, so its modules are imported from there
+sys.path.insert(0, ROOT)
+
+try:
+    import config  # noqa: F401
+except ImportError:
+    # cogs read their settings from config.py, the example values are enough for tests
+    spec = importlib.util.spec_from_file_location(
+        "config", os.path.join(ROOT, "config-example.py")
+    )
+    sys.modules["config"] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sys.modules["config"])
@@ -0,0 +1,85 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from discord.ext import commands
+
+from benchmarks.harness import Harness, HarnessMessage, NoDatabase
+from classes.bot import Bot
+from utils.cooldowns import USE
+
+
+class Redis:
+    """Runs the cooldown script on a dict, the buckets never expire."""
+
+    def __init__(self):
+        self.uses = {}
+
+    async def execute(self, command, sha, numkeys, key, rate, per):
+        assert command == "EVALSHA" and sha == USE.sha
+        self.uses[key] = self.uses.get(key, 0) + 1
+        return per if self.uses[key] > int(rate) else 0
+
+
+def checked(test):
+    """Runs `test(bot, context)` with the API cogs loaded and their cooldowns kept."""
+
+    async def run():
+        bot = Bot(command_prefix="< ")
+        bot.config = SimpleNamespace(bans=[])
+        bot.pool = NoDatabase()
+        bot.redis = Redis()
+        harness = Harness(bot, latency=0)
+        harness.install()
+        bot.load_extension("cogs.api")
+        bot.load_extension("cogs.merch")
+        user = harness.user(10)
+
+        async def context(content):
+            return await bot.get_context(
+                HarnessMessage(user.channel, user.user, content=content)
+            )
+
+        return await test(bot, context)
+
+    return asyncio.run(run())
+
+
+def cooled_down(bot) -> list:
+    return [
+        command
+        for command in bot.walk_commands()
+        if any(check.__module__ == "utils.cooldowns" for check in command.checks)
+    ]
+
+
+def test_every_cooldown_applies():
+    async def test(bot, context):
+        names = []
+        for command in cooled_down(bot):
+            ctx = await context(f"< {command.qualified_name}")
+            # subcommands are only looked up once their group is invoked
+            ctx.command = command
+            assert await command.can_run(ctx)
+            with pytest.raises(commands.CommandOnCooldown):
+                await command.can_run(ctx)
+            names.append(command.qualified_name)
+        return names
+
+    names = checked(test)
+    # these are wrapped by utils.scheduler.priority
+    assert {"merch", "xmerch", "mergeall", "mirror on", "mirror sync"} <= set(names)
+    assert "profile" in names
+
+
+def test_checks_of_other_commands_do_not_use_cooldowns():
+    async def test(bot, context):
+        # like the help command, which runs the checks of every command
+        ctx = await context("< help")
+        ctx.command = None
+        for command in cooled_down(bot):
+            for check in command.checks:
+                assert await check(ctx)
+        return bot.redis.uses
+
+    assert checked(test) == {}
@@ -0,0 +1,153 @@
+"""Smoke tests for the fake Travitia API and the offline Discord harness the benchmarks use."""
+
+import asyncio
+from types import SimpleNamespace
+
+from aiohttp import ClientSession
+
+from benchmarks.fake_travitia import Dataset, FakeTravitia, query
+from benchmarks.harness import Harness, NoDatabase
+from classes.bot import Bot
+
+DATASET = Dataset(users=50, seed=1)
+
+
+def serve(test, **kwargs):
+    """Runs `test(session, base_url)` against a fake API serving DATASET."""
+
+    async def run():
+        server = FakeTravitia(DATASET, **kwargs)
+        base_url = await server.start()
+        try:
+            async with ClientSession() as session:
+                return await test(session, base_url)
+        finally:
+            await server.stop()
+
+    return asyncio.run(run())
+
+
+async def fetch(session, url):
+    async with session.get(url) as r:
+        return r.status, await r.json()
+
+
+def test_filters_and_paging():
+    owner = DATASET.allitems[0]["owner"]
+    ids = [item["id"] for item in DATASET.allitems[:30:3]]
+
+    async def test(session, base_url):
+        return [
+            await fetch(
+                session,
+                f"{base_url}allitems?owner=eq.{owner}&order=id.desc&limit=5&offset=2",
+            ),
+            await fetch(
+                session,
+                f"{base_url}allitems?select=id,inventory(equipped)"
+                f"&id=in.({','.join(map(str, ids))})",
+            ),
+        ]
+
+    paged, listed = serve(test)
+    owned = sorted(
+        (i["id"] for i in DATASET.allitems if i["owner"] == owner), reverse=True
+    )
+    assert paged[0] == 200
+    assert [item["id"] for item in paged[1]] == owned[2:7]
+    assert listed[0] == 200
+    assert [item["id"] for item in listed[1]] == ids
+    assert all(set(item) == {"id", "inventory"} for item in listed[1])
+
+
+def test_index_matches_full_scan():
+    item = DATASET.allitems[7]
+    params = [("type", "in.(Sword,Shield)"), ("owner", f"eq.{item['owner']}")]
+    expected = [
+        row
+        for row in DATASET.allitems
+        if row["owner"] == item["owner"] and row["type"] in ("Sword", "Shield")
+    ]
+    assert query(DATASET, "allitems", params) == expected
+    assert query(DATASET, "allitems", [("id", "in.()")]) == []
+
+
+def test_injected_errors():
+    async def test(session, base_url):
+        return [
+            (await fetch(session, f"{base_url}profile?limit=1"))[0],
+            (await fetch(session, f"{base_url}profile?limit=1"))[0],
+            (await fetch(session, f"{base_url}unknown"))[0],
+            (await fetch(session, f"{base_url}allitems?id=gt.abc"))[0],
+        ]
+
+    assert serve(test, ratelimit=(1, 60)) == [200, 429, 404, 429]
+    assert serve(test, error_rate=1) == [503, 503, 404, 503]
+    assert serve(test)[2:] == [404, 400]
+
+
+class Travitia:
+    """Sends queries straight to the fake API, without the cache and ratelimiter."""
+
+    def __init__(self, session, base_url):
+        self.session = session
+        self.base_url = base_url
+
+    async def get(self, query, *, cache=True):
+        status, data = await fetch(self.session, self.base_url + str(query))
+        assert status == 200, data
+        return data
+
+
+def merge(item: dict) -> list:
+    """Runs `merge` on an item as its owner through the harness, returns the replies."""
+
+    async def test(session, base_url):
+        bot = Bot(command_prefix="< ")
+        bot.config = SimpleNamespace(bans=[])
+        bot.pool = NoDatabase()
+        bot.travitia = Travitia(session, base_url)
+        harness = Harness(bot, latency=0)
+        harness.install()
+        bot.load_extension("cogs.api")
+        bot.load_extension("cogs.errors")
+        for command in bot.walk_commands():
+            # cooldowns need Redis
+            command.checks = [
+                c for c in command.checks if c.__module__ != "utils.cooldowns"
+            ]
+
+        user = harness.user(item["owner"])
+        replies = []
+        receive = user.channel.receive
+
+        def record(**kwargs):
+            replies.append(kwargs.get("content"))
+            return receive(**kwargs)
+
+        user.channel.receive = record
+        interaction = await user.send(f"< merge {item['id']}", quiet=0.01)
+        assert not interaction.failed, interaction.error
+        assert interaction.response is not None
+        return replies
+
+    return serve(test)
+
+
+def test_merge_through_harness():
+    item = next(
+        i
+        for i in DATASET.allitems
+        if i["id"] in DATASET.inventory
+        and not DATASET.inventory[i["id"]]["equipped"]
+        and i["damage"] + i["armor"] < 41
+    )
+    assert len(merge(item)) == 1
+
+
+def test_merge_item_on_the_market():
+    listing = DATASET.market[0]
+    item = next(i for i in DATASET.allitems if i["id"] == listing["item"])
+    assert merge(item) == [
+        f"Item `{item['id']}` is not in an inventory; it may be on the market."
+    ]
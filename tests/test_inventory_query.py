@@ -0,0 +1,231 @@
+"""Checks that merch's single `or` query finds the same items as the two queries it replaced.
+
+Both forms are evaluated by the PostgREST filter evaluator of the fake Travitia API."""
+
+import asyncio
+from types import SimpleNamespace
+from urllib.parse import parse_qsl, urlsplit
+
+import pytest
+
+from benchmarks.fake_travitia import Dataset, query
+from cogs.merch import Merch
+from utils.query import endpoint
+
+
+def legacy_urls(
+    *,
+    user,
+    stat_upper=None,
+    stat_lower=None,
+    types=None,
+    hands=None,
+    value_lower=None,
+    value_upper=None,
+    id_upper=None,
+    id_lower=None,
+):
+    """Merch.format_url before the queries were combined: one for weapons, one for shields."""
+    base = f"https://public-api.travitia.xyz/idle/allitems?&select=id,inventory(equipped)&inventory.equipped=is.false&owner=eq.{user}"
+    dmg, dfn = f"{base}&armor=eq.0", f"{base}&damage=eq.0"
+
+    if stat_lower:
+        dmg += f"&damage=gte.{stat_lower}"
+        dfn += f"&armor=gte.{stat_lower}"
+
+    if stat_upper:
+        dmg += f"&damage=lte.{stat_upper}"
+        dfn += f"&armor=lte.{stat_upper}"
+
+    if types:
+        dmg += f"&type=in.({','.join(types)})"
+        dfn += f"&type=in.({','.join(types)})"
+
+    if hands:
+        dmg += f"&hand=in.({','.join(hands)})"
+        dfn += f"&hand=in.({','.join(hands)})"
+
+    if value_lower:
+        dmg += f"&value=gte.{value_lower}"
+        dfn += f"&value=gte.{value_lower}"
+
+    if value_upper:
+        dmg += f"&value=lte.{value_upper}"
+        dfn += f"&value=lte.{value_upper}"
+
+    if id_lower:
+        dmg += f"&id=gte.{id_lower}"
+        dfn += f"&id=gte.{id_lower}"
+
+    if id_upper:
+        dmg += f"&id=lte.{id_upper}"
+        dfn += f"&id=lte.{id_upper}"
+
+    return [dmg, dfn]
+
+
+def legacy_collect_ids(dataset, urls, *, exclude):
+    """Merch.collect_ids before the queries were combined, without a limit."""
+    itemlist = []
+    seen = set(exclude)
+    for url in urls:
+        for item in run(dataset, url):
+            item_id = str(item["id"])
+            if not item["inventory"] or item_id in seen:
+                continue
+            seen.add(item_id)
+            itemlist.append(item_id)
+    return itemlist
+
+
+def run(dataset, url) -> list:
+    url = str(url)
+    params = parse_qsl(urlsplit(url).query, keep_blank_values=True)
+    return query(dataset, endpoint(url), params)
+
+
+class Travitia:
+    """Stands in for TravitiaClient, answering from the dataset in pages."""
+
+    def __init__(self, dataset, page_size=50):
+        self.dataset = dataset
+        self.page_size = page_size
+
+    async def iterate(self, url):
+        rows = sorted(run(self.dataset, url), key=lambda row: row["id"])
+        for row in rows:
+            yield row
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    # the owner picked below has the items 1333 to 1728, the ID bounds in FILTERS cut into them
+    dataset = Dataset(users=40, seed=3)
+    # the user with the most items, so every filter has something to cut
+    owner = max(
+        dataset.user_ids,
+        key=lambda user: sum(item["owner"] == user for item in dataset.allitems),
+    )
+    # items with both stats 0 match both of the old queries
+    for item_id, damage, armor in [(10**6, 0, 0), (10**6 + 1, 0, 0)]:
+        dataset.allitems.append(
+            {
+                "id": item_id,
+                "owner": owner,
+                "name": "Synthetic Blank",
+                "value": 500,
+                "type": "Sword",
+                "damage": damage,
+                "armor": armor,
+                "signature": None,
+                "original_type": None,
+                "original_name": None,
+                "hand": "any",
+            }
+        )
+        dataset.inventory[item_id] = {"item": item_id, "equipped": False}
+    dataset.owner = owner
+    return dataset
+
+
+@pytest.fixture(scope="module")
+def merch(dataset):
+    return Merch(SimpleNamespace(travitia=Travitia(dataset)))
+
+
+def ids_of(dataset, item_ids):
+    return {item["id"] for item in dataset.allitems if str(item["id"]) in item_ids}
+
+
+def collect(merch, url, *, exclude=(), limit=None):
+    return asyncio.run(merch.collect_ids(url, exclude=list(exclude), limit=limit))
+
+
+FILTERS = [
+    {},
+    {"stat_lower": 20},
+    {"stat_upper": 15},
+    {"stat_lower": 10, "stat_upper": 30},
+    {"stat_lower": 41, "stat_upper": 41},
+    {"stat_lower": 50},
+    {"types": ["Sword", "Shield"]},
+    {"types": ["Bow", "Scythe"], "stat_lower": 40},
+    {"types": ["Shield"], "stat_upper": 20},
+    {"hands": ["left"]},
+    {"hands": ["both", "any"], "stat_lower": 5, "stat_upper": 35},
+    {"value_lower": 5000},
+    {"value_upper": 2000},
+    {"value_lower": 1000, "value_upper": 3000, "stat_lower": 10},
+    {"id_lower": 1500},
+    {"id_upper": 1450},
+    {"id_lower": 1400, "id_upper": 1600, "types": ["Axe", "Shield", "Wand"]},
+    {
+        "stat_lower": 5,
+        "stat_upper": 40,
+        "types": ["Sword", "Shield", "Axe"],
+        "hands": ["any", "left"],
+        "value_lower": 100,
+        "value_upper": 9000,
+        "id_lower": 1,
+        "id_upper": 10**7,
+    },
+]
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_same_items(dataset, merch, filters):
+    user = dataset.owner
+    old = legacy_collect_ids(dataset, legacy_urls(user=user, **filters), exclude=[])
+    new = collect(merch, merch.format_url(user=user, **filters))
+    assert len(new) == len(set(new)), "an item was returned twice"
+    assert set(new) == set(old)
+
+
+def test_filters_are_not_trivial(dataset, merch):
+    everything = set(collect(merch, merch.format_url(user=dataset.owner)))
+    counts = [
+        len(collect(merch, merch.format_url(user=dataset.owner, **filters)))
+        for filters in FILTERS[1:]
+    ]
+    assert everything
+    assert all(count < len(everything) for count in counts)
+    assert any(counts)
+
+
+def test_items_with_both_stats_zero(dataset, merch):
+    found = set(collect(merch, merch.format_url(user=dataset.owner)))
+    assert {str(10**6), str(10**6 + 1)} <= found
+
+
+def test_equipped_items_are_left_out(dataset, merch):
+    found = ids_of(dataset, collect(merch, merch.format_url(user=dataset.owner)))
+    assert found
+    assert not any(
+        dataset.inventory.get(item_id, {"equipped": True})["equipped"]
+        for item_id in found
+    )
+
+
+@pytest.mark.parametrize("filters", [{}, {"stat_lower": 10, "types": ["Shield"]}])
+def test_protected_items_are_excluded(dataset, merch, filters):
+    user = dataset.owner
+    everything = collect(merch, merch.format_url(user=user, **filters))
+    # as returned by Merch.protected, plus an ID the user does not own
+    protected = [int(i) for i in everything[::3]] + [1]
+
+    old = legacy_collect_ids(
+        dataset,
+        legacy_urls(user=user, **filters),
+        exclude=[str(i) for i in protected],
+    )
+    new = collect(merch, merch.format_url(user=user, **filters), exclude=protected)
+    assert set(new) == set(old)
+    assert set(new) == set(everything) - {str(i) for i in protected}
+
+
+def test_limit(dataset, merch):
+    user = dataset.owner
+    everything = collect(merch, merch.format_url(user=user))
+    limited = collect(merch, merch.format_url(user=user), limit=10)
+    # one more than the limit, so callers can tell the list was cut off
+    assert limited == everything[:11]
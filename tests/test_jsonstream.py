@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+import pytest
+
+from utils.jsonstream import JsonStream
+
+
+class Content:
+    """Stands in for an aiohttp StreamReader that receives the body in the given chunks."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def iter_chunked(self, size):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def decode(chunks):
+    async def collect():
+        stream = JsonStream(Content(chunks))
+        return [element async for element in stream], stream.array
+
+    return asyncio.run(collect())
+
+
+def every_split(body: bytes):
+    """All ways of receiving a body in two chunks, and one byte at a time."""
+    for index in range(len(body) + 1):
+        yield [body[:index], body[index:]]
+    yield [body[i : i + 1] for i in range(len(body))]
+
+
+@pytest.mark.parametrize(
+    "chunks, expected",
+    [
+        ([b"[12.", b"5, 3]"], [12.5, 3]),
+        ([b"[7e", b"2, 1]"], [700.0, 1]),
+        ([b"[1, 12.", b"5]"], [1, 12.5]),
+        ([b"[1", b"2, 3]"], [12, 3]),
+        ([b"[-", b"4]"], [-4]),
+        ([b"[1.5E", b"-", b"2]"], [0.015]),
+        ([b"[2e+", b"1]"], [20.0]),
+    ],
+)
+def test_numbers_cut_off(chunks, expected):
+    assert decode(chunks) == (expected, True)
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        [12.5, 3, -0.25, 7e2, 1e-3, 0, -17, 3.0e10],
+        [{"id": 1, "damage": 40.5}, {"id": 22, "name": "a, b ]"}, [], None],
+        [True, False, None, "x", 1],
+        [],
+    ],
+)
+def test_every_split(document):
+    body = json.dumps(document).encode()
+    for chunks in every_split(body):
+        assert decode(chunks) == (document, True), chunks
+
+
+def test_not_an_array():
+    document = {"id": 1, "value": 12.5}
+    for chunks in every_split(json.dumps(document).encode()):
+        assert decode(chunks) == ([document], False), chunks
+
+
+def test_multibyte_characters():
+    document = [{"name": "Schwert ⚔"}, 12.5]
+    for chunks in every_split(json.dumps(document, ensure_ascii=False).encode()):
+        assert decode(chunks) == (document, True), chunks
+
+
+def test_invalid():
+    with pytest.raises(ValueError):
+        decode([b"[1, 2", b"x]"])
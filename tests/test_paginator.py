@@ -0,0 +1,77 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+from utils.paginator import ApiPaginator, Paginator
+
+
+class Client:
+    """Stands in for TravitiaClient, serving rows from a list."""
+
+    def __init__(self, bot, rows):
+        self.bot = bot
+        self.rows = rows
+
+    async def page(self, query, index, *, page_size, order):
+        return self.rows[index * page_size : (index + 1) * page_size]
+
+
+def context():
+    sent = []
+
+    async def send(**kwargs):
+        sent.append(kwargs)
+        raise asyncio.CancelledError()  # the menu itself is not tested here
+
+    bot = SimpleNamespace(loop=asyncio.get_running_loop())
+    return SimpleNamespace(bot=bot, author=SimpleNamespace(id=1), send=send), sent
+
+
+def failing_render(records):
+    raise RuntimeError("render failed")
+
+
+def test_lazy_first_page_error_is_raised():
+    async def run():
+        ctx, sent = context()
+        paginator = Paginator(records=[1, 2], render=failing_render)
+        with pytest.raises(RuntimeError):
+            await paginator.paginate(ctx)
+        assert paginator.controller is None
+        assert not sent
+
+    asyncio.run(run())
+
+
+def test_api_first_page_error_is_raised():
+    async def run():
+        ctx, sent = context()
+        paginator = ApiPaginator(
+            Client(ctx.bot, [{"id": 1}]), "allitems", render=failing_render
+        )
+        with pytest.raises(RuntimeError):
+            await paginator.paginate(ctx)
+        assert paginator.controller is None
+        assert not sent
+
+    asyncio.run(run())
+
+
+def test_lazy_first_page_is_built_once():
+    async def run():
+        ctx, sent = context()
+        rendered = []
+
+        def render(record):
+            rendered.append(record)
+            return discord.Embed(title=str(record))
+
+        paginator = Paginator(records=["a", "b"], render=render)
+        await paginator.paginate(ctx)
+        await asyncio.gather(paginator.controller, return_exceptions=True)
+        assert rendered == ["a"]
+        assert sent[0]["embed"].title == "a"
+
+    asyncio.run(run())
@@ -0,0 +1,72 @@
+import asyncio
+from types import SimpleNamespace
+
+from benchmarks.harness import Harness, NoDatabase
+from classes.bot import Bot
+from cogs.merch import Merch
+from utils.scheduler import Priority, current_priority
+
+
+class Mirror:
+    """Stands in for InventoryMirror and records the priority of every call."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def enabled(self, user):
+        return True
+
+    async def enable(self, user):
+        self.calls.append(("enable", current_priority.get()))
+
+    async def disable(self, user):
+        self.calls.append(("disable", current_priority.get()))
+
+    async def sync(self, user, full=False):
+        self.calls.append(("sync", current_priority.get()))
+        return 0
+
+
+def invoke(*messages):
+    async def run():
+        bot = Bot(command_prefix="< ")
+        bot.config = SimpleNamespace(bans=[])
+        bot.pool = NoDatabase()
+        bot.mirror = Mirror()
+        harness = Harness(bot, latency=0)
+        harness.install()
+        bot.load_extension("cogs.merch")
+        for command in bot.walk_commands():
+            # cooldowns need Redis
+            command.checks = [
+                c for c in command.checks if c.__module__ != "utils.cooldowns"
+            ]
+        user = harness.user(10)
+        for message in messages:
+            interaction = await user.send(message, quiet=0.01)
+            assert not interaction.failed, interaction.error
+        return bot.mirror.calls
+
+    return asyncio.run(run())
+
+
+def test_subcommands_run_at_their_priority():
+    assert invoke("< mirror on", "< mirror sync", "< mirror off") == [
+        ("enable", Priority.BULK),
+        ("sync", Priority.BULK),
+        ("disable", Priority.INTERACTIVE),
+    ]
+
+
+def test_priority_does_not_leak_between_commands():
+    # the same task handles both messages here, unlike on Discord
+    assert invoke("< mirror sync", "< mirror off") == [
+        ("sync", Priority.BULK),
+        ("disable", Priority.INTERACTIVE),
+    ]
+
+
+def test_decorated_command_keeps_its_signature():
+    # parameters and help are read from the wrapped callback
+    assert list(Merch.mirror_sync.params) == ["self", "ctx"]
+    assert Merch.mirror_sync.help.startswith("Bring the copy")
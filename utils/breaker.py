@@ -0,0 +1,149 @@
+import math
+import uuid
+
+from utils.checks import ApiIsDead
+from utils.scripts import Script
+
+# times are taken from Redis, so processes with skewed clocks agree on the open interval
+
+# returns {1, 0} if the request may pass, {2, 0} if it is the half-open probe
+# and {0, ms} with the time to wait if the circuit is open
+# with ARGV[2] = '0', the probe is not claimed, a request that could be it may pass
+ALLOW = Script(
+    """
+local state = redis.call('HGET', KEYS[1], 'state') or 'closed'
+if state == 'closed' then
+    return {1, 0}
+end
+redis.replicate_commands()
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local reopen = tonumber(redis.call('HGET', KEYS[1], 'until') or '0')
+if now < reopen then
+    return {0, reopen - now}
+end
+if ARGV[2] == '0' and redis.call('EXISTS', KEYS[2]) == 0 then
+    return {1, 0}
+end
+if ARGV[2] == '1' and redis.call('SET', KEYS[2], '1', 'NX', 'PX', ARGV[1]) then
+    redis.call('HSET', KEYS[1], 'state', 'half_open')
+    return {2, 0}
+end
+return {0, math.max(redis.call('PTTL', KEYS[2]), 0)}
+"""
+)
+
+# returns the time in ms the circuit was opened for, or 0
+RECORD = Script(
+    """
+redis.replicate_commands()
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local success = ARGV[1] == '1'
+local window = tonumber(ARGV[3])
+
+local function trip()
+    local trips = redis.call('HINCRBY', KEYS[1], 'trips', 1)
+    local open_for = math.min(tonumber(ARGV[6]) * 2 ^ (trips - 1), tonumber(ARGV[7]))
+    redis.call('HSET', KEYS[1], 'state', 'open', 'until', now + open_for)
+    redis.call('DEL', KEYS[2], KEYS[3])
+    return open_for
+end
+
+if ARGV[2] == '1' then
+    redis.call('DEL', KEYS[4])
+    if success then
+        redis.call('HSET', KEYS[1], 'state', 'closed', 'trips', 0)
+        return 0
+    end
+    return trip()
+end
+
+local key = success and KEYS[2] or KEYS[3]
+redis.call('ZADD', key, now, ARGV[8])
+redis.call('PEXPIRE', key, window)
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now - window)
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', now - window)
+
+if (redis.call('HGET', KEYS[1], 'state') or 'closed') ~= 'closed' then
+    return 0
+end
+local failures = redis.call('ZCARD', KEYS[3])
+local total = failures + redis.call('ZCARD', KEYS[2])
+if total >= tonumber(ARGV[4]) and failures / total >= tonumber(ARGV[5]) then
+    return trip()
+end
+return 0
+"""
+)
+
+
+class CircuitBreaker:
+    """A circuit breaker for the API, with its state stored in Redis so every process agrees on it.
+
+    The circuit opens once the failure rate over the last `window` seconds reaches `threshold`,
+    with at least `min_requests` requests made. After `open_for` seconds a single probe request
+    is let through; if it succeeds the circuit closes, otherwise it opens again for twice as long,
+    up to `max_open_for` seconds."""
+
+    key = "travapi:breaker"
+
+    def __init__(
+        self,
+        redis,
+        *,
+        window: int = 60,
+        min_requests: int = 3,
+        threshold: float = 0.5,
+        open_for: int = 30,
+        max_open_for: int = 3600,
+        probe_timeout: int = 30,
+    ):
+        self.redis = redis
+        self.window = window
+        self.min_requests = min_requests
+        self.threshold = threshold
+        self.open_for = open_for
+        self.max_open_for = max_open_for
+        self.probe_timeout = probe_timeout
+
+    async def allow(self, claim: bool = True) -> bool:
+        """Raises ApiIsDead if the circuit is open, with the seconds until it is probed again.
+
+        Returns whether the request is the probe of a half-open circuit. With `claim` false,
+        only checks if a request could pass, without becoming the probe."""
+        allowed, retry = await ALLOW(
+            self.redis,
+            keys=[self.key, f"{self.key}:probe"],
+            args=[self.probe_timeout * 1000, int(claim)],
+        )
+        if not allowed:
+            raise ApiIsDead(math.ceil(int(retry) / 1000))
+        return allowed == 2
+
+    async def record(self, success: bool, probe: bool = False) -> int:
+        """Records the outcome of a request and returns the seconds the circuit was opened for, if any."""
+        opened = await RECORD(
+            self.redis,
+            keys=[
+                self.key,
+                f"{self.key}:ok",
+                f"{self.key}:failed",
+                f"{self.key}:probe",
+            ],
+            args=[
+                int(success),
+                int(probe),
+                self.window * 1000,
+                self.min_requests,
+                self.threshold,
+                self.open_for * 1000,
+                self.max_open_for * 1000,
+                uuid.uuid4().hex,
+            ],
+        )
+        return math.ceil(int(opened) / 1000)
+
+    async def state(self) -> str:
+        state = await self.redis.execute("HGET", self.key, "state")
+        return state.decode() if state else "closed"
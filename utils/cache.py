@@ -0,0 +1,55 @@
+import hashlib
+import json
+import time
+from typing import Any, NamedTuple, Optional
+
+from utils.query import endpoint
+
+
+class CacheEntry(NamedTuple):
+    data: Any
+    fresh: bool
+
+
+class ResponseCache:
+    """Caches API responses in Redis, keyed on the canonical query URL.
+
+    Entries stay in Redis for `stale` seconds after their TTL ran out, so they can still be
+    served while the API is not available."""
+
+    def __init__(self, redis, *, ttls: dict, negative_ttl: int = 15, stale: int = 3600):
+        self.redis = redis
+        self.ttls = ttls
+        self.negative_ttl = negative_ttl
+        self.stale = stale
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(url: str) -> str:
+        return f"travapi:cache:{hashlib.sha1(url.encode()).hexdigest()}"
+
+    def ttl(self, url: str) -> int:
+        return self.ttls.get(endpoint(url), 0)
+
+    async def get(self, url: str) -> Optional[CacheEntry]:
+        if not self.ttl(url):
+            return None
+        raw = await self.redis.execute("GET", self.key(url))
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry = json.loads(raw)
+        return CacheEntry(entry["data"], time.time() < entry["expires"])
+
+    async def set(self, url: str, data: Any):
+        ttl = self.ttl(url)
+        if not ttl:
+            return
+        if not data:
+            # negative caching; empty results are likely to change sooner
+            ttl = min(ttl, self.negative_ttl)
+        entry = json.dumps({"expires": time.time() + ttl, "data": data})
+        await self.redis.execute("SET", self.key(url), entry, "EX", ttl + self.stale)
@@ -38,6 +38,19 @@ class ApiIsDead(commands.CommandError):
     pass
 
 
+class ApiUnavailable(commands.CommandError):
+    """Exception raised when a request fails with a 5XX status code or a connection error, but the circuit is still closed."""
+
+    def __init__(self, status):
+        self.status = status
+
+
+class TooManyRequests(commands.CommandError):
+    """Exception raised when the API answers with a 429 status code."""
+
+    pass
+
+
 def only_dm():
     """Checks if a command is used in private messages"""
 
@@ -57,15 +70,10 @@ def has_pro():
     """Checks if a user is in the items table and adds them, if not"""
 
     async def predicate(ctx):
-        if not await ctx.bot.pool.fetchval(
-            'SELECT EXISTS(SELECT 1 FROM items WHERE "user"=$1);',
+        await ctx.bot.pool.execute(
+            'INSERT INTO items ("user") VALUES ($1) ON CONFLICT DO NOTHING;',
             ctx.author.id,
-        ):
-            await ctx.bot.pool.execute(
-                'INSERT INTO items ("user", protected) VALUES ($1, $2);',
-                ctx.author.id,
-                [],
-            )
+        )
         return True
 
     return commands.check(predicate)
@@ -0,0 +1,72 @@
+import inspect
+import math
+
+from discord.ext import commands
+from discord.ext.commands.cooldowns import BucketType
+
+from utils.scripts import Script
+
+# returns 0 if the command may be used, or the time in ms until the bucket resets
+USE = Script(
+    """
+local uses = redis.call('INCR', KEYS[1])
+if uses == 1 then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+if uses > tonumber(ARGV[1]) then
+    return math.max(redis.call('PTTL', KEYS[1]), 1)
+end
+return 0
+"""
+)
+
+
+def bucket_key(ctx, name: str, type: BucketType) -> str:
+    if type is BucketType.user:
+        scope = f"user:{ctx.author.id}"
+    elif type is BucketType.guild:
+        # like discord.py, private messages count as their own guild
+        scope = f"guild:{(ctx.guild or ctx.author).id}"
+    elif type is BucketType.default:
+        scope = "global"
+    else:
+        raise ValueError(f"Unsupported bucket type {type}.")
+    return f"cooldown:{name}:{scope}"
+
+
+def cooldown(rate: int, per: float, type: BucketType = BucketType.user):
+    """Like commands.cooldown, but the buckets are kept in Redis.
+
+    All shards and processes of the bot share the same buckets, and they survive restarts.
+    Supports the user, guild and default (global) bucket types. Raises
+    commands.CommandOnCooldown with the time until the bucket resets."""
+    if type not in (BucketType.user, BucketType.guild, BucketType.default):
+        raise ValueError(f"Unsupported bucket type {type}.")
+
+    def decorator(func):
+        # other decorators, like utils.scheduler.priority, may wrap the callback later
+        callback = inspect.unwrap(
+            func.callback if isinstance(func, commands.Command) else func
+        )
+
+        async def predicate(ctx):
+            # the help command runs checks to filter commands, that must not use them up
+            if (
+                ctx.command is None
+                or inspect.unwrap(ctx.command.callback) is not callback
+            ):
+                return True
+            retry_after = await USE(
+                ctx.bot.redis,
+                keys=[bucket_key(ctx, ctx.command.qualified_name, type)],
+                args=[rate, math.ceil(per * 1000)],
+            )
+            if retry_after:
+                raise commands.CommandOnCooldown(
+                    commands.Cooldown(rate, per, type), retry_after / 1000
+                )
+            return True
+
+        return commands.check(predicate)(func)
+
+    return decorator
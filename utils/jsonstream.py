@@ -0,0 +1,71 @@
+import codecs
+import json
+import re
+from typing import Any, AsyncIterator
+
+SEPARATORS = re.compile(r"[\s,]*")
+# characters that can continue a number, so one followed by them might have been cut off
+NUMBER_TAIL = frozenset("0123456789.eE+-")
+
+
+class JsonStream:
+    """Decodes a JSON document from an aiohttp stream while it is being received.
+
+    If the document is an array, iterating yields its elements one by one as soon as they are
+    complete, so the whole array never has to be held in memory. Any other document is
+    yielded as a whole. `array` tells which of the two it was, once iteration started.
+    """
+
+    def __init__(self, content, chunk_size: int = 65536):
+        self.content = content
+        self.chunk_size = chunk_size
+        self.array = None
+
+    def __aiter__(self) -> AsyncIterator[Any]:
+        return self._decode()
+
+    async def _decode(self) -> AsyncIterator[Any]:
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        raw = json.JSONDecoder()
+        buffer = ""
+        pos = 0
+
+        async for chunk in self.content.iter_chunked(self.chunk_size):
+            buffer += decoder.decode(chunk)
+            if self.array is None:
+                stripped = buffer.lstrip()
+                if not stripped:
+                    continue
+                self.array = stripped[0] == "["
+                if self.array:
+                    pos = buffer.index("[") + 1
+            if not self.array:
+                continue
+
+            while True:
+                pos = SEPARATORS.match(buffer, pos).end()
+                if pos >= len(buffer) or buffer[pos] == "]":
+                    break
+                try:
+                    element, end = raw.raw_decode(buffer, pos)
+                except ValueError:
+                    break  # incomplete, wait for more data
+                if isinstance(element, (int, float)) and (
+                    end >= len(buffer) or buffer[end] in NUMBER_TAIL
+                ):
+                    break  # a number might have been cut off
+                yield element
+                pos = end
+            buffer, pos = buffer[pos:], 0
+
+        buffer += decoder.decode(b"", final=True)
+        if not self.array:
+            if buffer.strip():
+                yield json.loads(buffer)
+            return
+
+        pos = SEPARATORS.match(buffer, pos).end()
+        while pos < len(buffer) and buffer[pos] != "]":
+            element, end = raw.raw_decode(buffer, pos)
+            yield element
+            pos = SEPARATORS.match(buffer, end).end()
@@ -0,0 +1,45 @@
+from itertools import groupby
+from typing import Iterable, List, Tuple
+
+MAX_DIFFERENCE = 5
+
+
+def stat(item: dict) -> int:
+    return item["damage"] + item["armor"]
+
+
+def cap(item: dict) -> int:
+    """The stat an item can be merged up to, 82 for two-handed items and 41 otherwise."""
+    return 82 if item["hand"] == "both" else 41
+
+
+def mergeable(item: dict) -> bool:
+    if item["signature"] or not item["inventory"] or item["inventory"][0]["equipped"]:
+        return False
+    if item["hand"] == "both":
+        return item["damage"] < 82
+    return stat(item) < 41
+
+
+def plan_merges(items: Iterable[dict]) -> List[Tuple[dict, dict]]:
+    """Pairs up items so that as many merges as possible can be done at once.
+
+    Items are grouped by type and cap and sorted by stat. Within a sorted group, pairing each
+    item with its neighbour whenever they are close enough is a maximum matching, so the whole
+    plan takes O(n log n). The stronger item of each pair comes first, as it is the one kept.
+    """
+    items = sorted(
+        filter(mergeable, items), key=lambda i: (i["type"], cap(i), stat(i), i["id"])
+    )
+    pairs = []
+    for _, group in groupby(items, key=lambda i: (i["type"], cap(i))):
+        group = list(group)
+        index = 0
+        while index < len(group) - 1:
+            low, high = group[index], group[index + 1]
+            if stat(high) - stat(low) <= MAX_DIFFERENCE:
+                pairs.append((high, low))
+                index += 2
+            else:
+                index += 1
+    return pairs
@@ -0,0 +1,265 @@
+import asyncio
+import bisect
+import time
+from typing import Callable, Dict, Iterable, Tuple
+
+from aiohttp import web
+
+from utils.query import endpoint
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+    def header(self) -> str:
+        return (
+            f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.type}\n"
+        )
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        return self.header() + "".join(f"{sample}\n" for sample in self.samples())
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.values: Dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self.values.items():
+            yield f"{self.name}{format_labels(self.labels, labels)} {value}"
+
+
+class Gauge(Metric):
+    """A value read when the metrics are scraped, from `function`, which returns either a
+    number or a dict mapping label value tuples to numbers.
+
+    Values that are counted elsewhere, like cache hits, are exposed with `kind="counter"`.
+    """
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        function: Callable,
+        labels: Iterable[str] = (),
+        *,
+        kind: str = "gauge",
+    ):
+        super().__init__(name, documentation, labels)
+        self.function = function
+        self.type = kind
+
+    def samples(self) -> Iterable[str]:
+        try:
+            values = self.function()
+        except Exception:
+            # e.g. a pool that is not connected yet
+            return
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in values.items():
+            yield f"{self.name}{format_labels(self.labels, labels)} {value}"
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = buckets
+        self.values: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        # per label set: a count per bucket (+Inf last), then the sum
+        data = self.values.get(labels)
+        if data is None:
+            data = self.values[labels] = [0] * (len(self.buckets) + 2)
+        data[bisect.bisect_left(self.buckets, value)] += 1
+        data[-1] += value
+
+    def samples(self) -> Iterable[str]:
+        for labels, data in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), data):
+                cumulative += count
+                le = format_labels(self.labels, labels, f'le="{bound}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            yield f"{self.name}_sum{format_labels(self.labels, labels)} {data[-1]}"
+            yield f"{self.name}_count{format_labels(self.labels, labels)} {cumulative}"
+
+
+class Metrics:
+    """The bot's metrics, in the Prometheus text format.
+
+    Updating a metric is a dict lookup and an addition, so they are always collected.
+    `start_server` serves them over HTTP at /metrics."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.metrics = []
+        self.runner = None
+        self.sampler = None
+
+        self.commands = self.add(
+            Counter("idleapi_commands_total", "Commands invoked.", ["command"])
+        )
+        self.command_latency = self.add(
+            Histogram("idleapi_command_seconds", "Time taken by commands.", ["command"])
+        )
+        self.api_requests = self.add(
+            Counter(
+                "idleapi_api_requests_total",
+                "Requests sent to the Travitia API, by status code. Connection errors"
+                ' have the status "error".',
+                ["endpoint", "status"],
+            )
+        )
+        self.api_latency = self.add(
+            Histogram(
+                "idleapi_api_request_seconds",
+                "Time taken by Travitia API requests, without waiting for a permit.",
+                ["endpoint"],
+            )
+        )
+        self.redis_latency = self.add(
+            Histogram(
+                "idleapi_redis_ping_seconds",
+                "Round trip time of Redis PINGs, sampled every few seconds.",
+            )
+        )
+        self.loop_lag = self.add(
+            Histogram(
+                "idleapi_event_loop_lag_seconds",
+                "How late the event loop woke up a sleeping task, sampled every few seconds.",
+            )
+        )
+        self.add(
+            Gauge(
+                "idleapi_api_cache_lookups_total",
+                "Lookups in the API response cache.",
+                lambda: {
+                    ("hit",): bot.travitia.cache.hits,
+                    ("miss",): bot.travitia.cache.misses,
+                },
+                ["result"],
+                kind="counter",
+            )
+        )
+        self.add(
+            Gauge(
+                "idleapi_api_coalesced_total",
+                "API requests that joined an identical request already in flight.",
+                lambda: bot.travitia.coalesced,
+                kind="counter",
+            )
+        )
+        self.add(
+            Gauge(
+                "idleapi_api_queue",
+                "API requests waiting for a permit, by priority.",
+                lambda: {
+                    (p.name.lower(),): s.waiting
+                    for p, s in bot.travitia.scheduler.stats.items()
+                },
+                ["priority"],
+            )
+        )
+        self.add(
+            Gauge(
+                "idleapi_postgres_connections",
+                "Connections in the Postgres pool.",
+                lambda: {
+                    ("idle",): bot.pool.get_idle_size(),
+                    ("used",): bot.pool.get_size() - bot.pool.get_idle_size(),
+                },
+                ["state"],
+            )
+        )
+        self.add(
+            Gauge(
+                "idleapi_open_menus",
+                "Paginators and confirmations waiting for reactions.",
+                lambda: len(bot.reactions),
+            )
+        )
+
+    def add(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "".join(metric.render() for metric in self.metrics)
+
+    async def before_invoke(self, ctx):
+        ctx.started = time.perf_counter()
+        self.commands.inc(ctx.command.qualified_name)
+
+    async def after_invoke(self, ctx):
+        self.command_latency.observe(
+            time.perf_counter() - ctx.started, ctx.command.qualified_name
+        )
+
+    def observe_request(self, url: str, status, seconds: float):
+        name = endpoint(url)
+        self.api_requests.inc(name, "error" if status is None else status)
+        self.api_latency.observe(seconds, name)
+
+    async def sample(self, interval: float = 5):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.loop_lag.observe(max(time.perf_counter() - start - interval, 0))
+            start = time.perf_counter()
+            try:
+                await self.bot.redis.execute("PING")
+            except Exception:
+                continue
+            self.redis_latency.observe(time.perf_counter() - start)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=self.render(), content_type="text/plain", charset="utf-8"
+        )
+
+    async def start_server(self, host: str, port: int):
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        self.sampler = self.bot.loop.create_task(self.sample())
@@ -0,0 +1,59 @@
+import os
+import re
+from typing import List, Tuple
+
+# migrations are named like 0001_what_it_does.sql and applied in order
+MIGRATION = re.compile(r"^(\d+)_(\w+)\.sql$")
+# held while migrating, so clusters starting at the same time do not migrate twice
+LOCK = 0x1D1EA91
+
+CREATE = """CREATE TABLE IF NOT EXISTS schema_migrations (
+    version integer PRIMARY KEY,
+    name text NOT NULL,
+    applied_at timestamp with time zone NOT NULL DEFAULT now()
+);"""
+
+
+def discover(directory: str) -> List[Tuple[int, str, str]]:
+    """Returns the version, name and path of every migration in a directory, in order."""
+    migrations = []
+    for file in os.listdir(directory):
+        match = MIGRATION.match(file)
+        if match:
+            migrations.append((int(match[1]), match[2], os.path.join(directory, file)))
+    migrations.sort()
+    versions = [version for version, _, _ in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError(f"Two migrations in {directory} have the same version.")
+    return migrations
+
+
+async def migrate(pool, directory: str = "migrations") -> List[str]:
+    """Applies the migrations that were not applied yet, each in its own transaction.
+
+    Returns the names of the applied migrations."""
+    applied = []
+    async with pool.acquire() as conn:
+        await conn.execute("SELECT pg_advisory_lock($1);", LOCK)
+        try:
+            await conn.execute(CREATE)
+            done = {
+                r["version"]
+                for r in await conn.fetch("SELECT version FROM schema_migrations;")
+            }
+            for version, name, path in discover(directory):
+                if version in done:
+                    continue
+                with open(path, encoding="utf-8") as f:
+                    sql = f.read()
+                async with conn.transaction():
+                    await conn.execute(sql)
+                    await conn.execute(
+                        "INSERT INTO schema_migrations (version, name) VALUES ($1, $2);",
+                        version,
+                        name,
+                    )
+                applied.append(f"{version:04}_{name}")
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1);", LOCK)
+    return applied
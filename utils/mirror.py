@@ -0,0 +1,215 @@
+import datetime
+from typing import List, Optional
+
+from utils.query import Query
+
+COLUMNS = (
+    "id",
+    "owner",
+    "damage",
+    "armor",
+    "value",
+    "type",
+    "hand",
+    "inventory(equipped)",
+)
+
+
+def row(item: dict) -> tuple:
+    # items without an inventory entry (e.g. on the market) cannot be merched
+    equipped = item["inventory"][0]["equipped"] if item["inventory"] else None
+    return (
+        item["id"],
+        item["owner"],
+        item["damage"],
+        item["armor"],
+        item["value"],
+        item["type"],
+        item["hand"],
+        equipped,
+    )
+
+
+class InventoryMirror:
+    """A local copy of the items users own, for merch filtering without API requests.
+
+    Mirroring is opt-in per user. A sync fetches only items above the highest ID seen so far,
+    then checks the mirrored items batch by batch to drop the ones that are gone."""
+
+    def __init__(self, bot, *, max_age: int = 600, full_age: int = 86400):
+        self.bot = bot
+        self.max_age = datetime.timedelta(seconds=max_age)
+        self.full_age = datetime.timedelta(seconds=full_age)
+
+    async def enabled(self, user: int) -> bool:
+        return await self.bot.pool.fetchval(
+            'SELECT EXISTS(SELECT 1 FROM mirror_users WHERE "user"=$1);', user
+        )
+
+    async def enable(self, user: int):
+        await self.bot.pool.execute(
+            'INSERT INTO mirror_users ("user") VALUES ($1) ON CONFLICT DO NOTHING;',
+            user,
+        )
+        await self.sync(user, full=True)
+
+    async def disable(self, user: int):
+        async with self.bot.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("DELETE FROM mirror_items WHERE owner=$1;", user)
+                await conn.execute('DELETE FROM mirror_users WHERE "user"=$1;', user)
+
+    async def sync(self, user: int, *, full: bool = False) -> int:
+        """Brings a user's mirror up to date and returns the number of mirrored items.
+
+        Items traded to the user keep their old IDs and are only picked up by a full sync,
+        which happens at least every `full_age` seconds."""
+        state = await self.bot.pool.fetchrow(
+            'SELECT last_id, full_synced_at FROM mirror_users WHERE "user"=$1;', user
+        )
+        now = datetime.datetime.now(datetime.timezone.utc)
+        full = (
+            full
+            or state["full_synced_at"] is None
+            or state["full_synced_at"] < now - self.full_age
+        )
+        known_id = 0 if full else state["last_id"]
+        last_id = known_id
+        seen = set()
+        client = self.bot.travitia
+
+        # items we have not seen yet, or all of them
+        async for page in client.pages(
+            Query("allitems").select(*COLUMNS).eq("owner", user).gt("id", known_id),
+            cache=False,
+        ):
+            await self.upsert([row(item) for item in page])
+            seen.update(item["id"] for item in page)
+            last_id = max(last_id, page[-1]["id"])
+
+        if full:
+            await self.bot.pool.execute(
+                "DELETE FROM mirror_items WHERE owner=$1 AND NOT id=ANY($2::bigint[]);",
+                user,
+                list(seen),
+            )
+        else:
+            # items we have seen before, checked for changes and deletions in batches
+            ids = [
+                r["id"]
+                for r in await self.bot.pool.fetch(
+                    "SELECT id FROM mirror_items WHERE owner=$1 AND id<=$2 ORDER BY id;",
+                    user,
+                    known_id,
+                )
+            ]
+            for start in range(0, len(ids), client.page_size):
+                batch = ids[start : start + client.page_size]
+                items = await client.get(
+                    Query("allitems")
+                    .select(*COLUMNS)
+                    .eq("owner", user)
+                    .gte("id", batch[0])
+                    .lte("id", batch[-1]),
+                    cache=False,
+                )
+                await self.upsert([row(item) for item in items])
+                await self.bot.pool.execute(
+                    "DELETE FROM mirror_items WHERE id=ANY($1::bigint[]);",
+                    list(set(batch) - {item["id"] for item in items}),
+                )
+
+        await self.bot.pool.execute(
+            "UPDATE mirror_users SET last_id=$1, synced_at=$2,"
+            ' full_synced_at=CASE WHEN $3 THEN $2 ELSE full_synced_at END WHERE "user"=$4;',
+            last_id,
+            now,
+            full,
+            user,
+        )
+        return await self.bot.pool.fetchval(
+            "SELECT count(*) FROM mirror_items WHERE owner=$1;", user
+        )
+
+    async def upsert(self, rows: List[tuple]):
+        if not rows:
+            return
+        await self.bot.pool.executemany(
+            """INSERT INTO mirror_items (id, owner, damage, armor, value, type, hand, equipped)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+            ON CONFLICT (id) DO UPDATE SET
+            owner=excluded.owner, damage=excluded.damage, armor=excluded.armor,
+            value=excluded.value, type=excluded.type, hand=excluded.hand,
+            equipped=excluded.equipped;""",
+            rows,
+        )
+
+    async def item_ids(
+        self,
+        user: int,
+        *,
+        exclude: list,
+        protected_by: int = None,
+        limit: int = None,
+        stat_upper: int = None,
+        stat_lower: int = None,
+        types: list = None,
+        hands: list = None,
+        value_lower: int = None,
+        value_upper: int = None,
+        id_upper: int = None,
+        id_lower: int = None,
+    ) -> Optional[List[str]]:
+        """Returns the IDs of a user's unequipped items that match the filters, like Merch.format_url.
+
+        Items protected by `protected_by` are left out, like those in `exclude`.
+        The mirror is synced first if it is out of date. Returns None if the user has no mirror.
+        At most `limit` + 1 IDs are returned, so callers can tell if the list is cut off.
+        """
+        mirror = await self.bot.pool.fetchrow(
+            'SELECT synced_at FROM mirror_users WHERE "user"=$1;', user
+        )
+        if mirror is None:
+            return None
+        now = datetime.datetime.now(datetime.timezone.utc)
+        if mirror["synced_at"] is None or mirror["synced_at"] < now - self.max_age:
+            await self.sync(user)
+
+        conditions = ["owner=$1", "equipped IS FALSE", "NOT id=ANY($2::bigint[])"]
+        args = [user, [int(i) for i in exclude]]
+
+        def arg(value) -> str:
+            args.append(value)
+            return f"${len(args)}"
+
+        if protected_by is not None:
+            conditions.append(
+                "NOT EXISTS (SELECT 1 FROM protected_items p"
+                f" WHERE p.user_id={arg(protected_by)} AND p.item_id=mirror_items.id)"
+            )
+        if stat_lower is not None or stat_upper is not None:
+            lower = arg(stat_lower or 0)
+            upper = arg(2**31 - 1 if stat_upper is None else stat_upper)
+            conditions.append(
+                f"((armor=0 AND damage BETWEEN {lower} AND {upper})"
+                f" OR (damage=0 AND armor BETWEEN {lower} AND {upper}))"
+            )
+        if types:
+            conditions.append(f"type=ANY({arg(types)}::text[])")
+        if hands:
+            conditions.append(f"hand=ANY({arg(hands)}::text[])")
+        if value_lower:
+            conditions.append(f"value>={arg(value_lower)}")
+        if value_upper:
+            conditions.append(f"value<={arg(value_upper)}")
+        if id_lower:
+            conditions.append(f"id>={arg(id_lower)}")
+        if id_upper:
+            conditions.append(f"id<={arg(id_upper)}")
+
+        query = (
+            f"SELECT id FROM mirror_items WHERE {' AND '.join(conditions)} ORDER BY id"
+        )
+        if limit is not None:
+            query += f" LIMIT {arg(limit + 1)}"
+        return [str(r["id"]) for r in await self.bot.pool.fetch(query, *args)]
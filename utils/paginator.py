@@ -1,8 +1,15 @@
 import asyncio
+import inspect
+import math
+from collections import OrderedDict
+from typing import Union
 
 import discord
 from discord.ext import commands
 
+from utils.query import Query
+from utils.tracing import span
+
 
 async def pager(entries, chunk: int):
     for x in range(0, len(entries), chunk):
@@ -36,6 +43,12 @@ class Paginator:
         "eof",
         "base",
         "names",
+        "records",
+        "render",
+        "page_factory",
+        "page_count",
+        "cache",
+        "cache_size",
     )
 
     def __init__(self, **kwargs):
@@ -54,6 +67,14 @@ class Paginator:
         self.timeout = kwargs.get("timeout", 90)
         self.ordered = kwargs.get("ordered", False)
 
+        # lazy pages: either records and a render callback, or a page factory and a page count
+        self.records = kwargs.get("records", None)
+        self.render = kwargs.get("render", None)
+        self.page_factory = kwargs.get("page_factory", None)
+        self.page_count = kwargs.get("page_count", None)
+        self.cache = OrderedDict()
+        self.cache_size = kwargs.get("cache_size", 5)
+
         self.controller = None
         self.pages = []
         self.names = []
@@ -80,9 +101,9 @@ class Paginator:
         bot = ctx.bot
         author = ctx.author
 
-        self.base = await ctx.send(embed=self.pages[0])
+        self.base = await ctx.send(embed=await self.get_page(0))
 
-        if len(self.pages) == 1:
+        if self.eof == 0:
             await self.base.add_reaction("⏹")
         else:
             for reaction in self.controls:
@@ -91,27 +112,23 @@ class Paginator:
                 except discord.HTTPException:
                     return
 
-        def check(r, u):
-            if str(r) not in self.controls.keys():
-                return False
-            elif u.id == bot.user.id or r.message.id != self.base.id:
-                return False
-            elif u.id != author.id:
-                return False
-            return True
-
         while True:
             try:
-                react, user = await bot.wait_for(
-                    "reaction_add", check=check, timeout=self.timeout
+                payload = await bot.reactions.wait_for(
+                    self.base.id,
+                    user_id=author.id,
+                    emojis=self.controls.keys(),
+                    timeout=self.timeout,
                 )
             except asyncio.TimeoutError:
                 return ctx.bot.loop.create_task(self.stop_controller(self.base))
 
-            control = self.controls.get(str(react))
+            control = self.controls.get(str(payload.emoji))
 
             try:
-                await self.base.remove_reaction(react, user)
+                await self.base.remove_reaction(
+                    payload.emoji, discord.Object(id=payload.user_id)
+                )
             except discord.HTTPException:
                 pass
 
@@ -122,10 +139,41 @@ class Paginator:
                 continue
 
             try:
-                await self.base.edit(embed=self.pages[self.current])
+                await self.base.edit(embed=await self.get_page(self.current))
             except KeyError:
                 pass
 
+    @property
+    def lazy(self) -> bool:
+        return self.records is not None or self.page_factory is not None
+
+    async def get_page(self, index) -> discord.Embed:
+        """Returns a page, building lazy pages the first time they are shown.
+
+        Built pages are kept in a small LRU cache."""
+        index = int(index)
+        if not self.lazy:
+            return self.pages[index]
+
+        if index in self.cache:
+            self.cache.move_to_end(index)
+            return self.cache[index]
+
+        if self.page_factory is not None:
+            page = self.page_factory(index)
+            if inspect.isawaitable(page):
+                page = await page
+        else:
+            with span("render"):
+                page = self.render(self.records[index])
+                if inspect.isawaitable(page):
+                    page = await page
+
+        self.cache[index] = page
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return page
+
     async def stop_controller(self, message):
         try:
             await message.delete()
@@ -144,6 +192,18 @@ class Paginator:
         )
 
     async def paginate(self, ctx):
+        if self.lazy:
+            count = len(self.records) if self.records is not None else self.page_count
+            if not count:
+                raise ValueError(
+                    "There must be enough data to create at least 1 page for pagination."
+                )
+            self.eof = float(count - 1)
+            # built here, so errors reach the command's error handler
+            await self.get_page(0)
+            self.controller = ctx.bot.loop.create_task(self.reaction_controller(ctx))
+            return
+
         if self.extras:
             self.pages = [p for p in self.extras if isinstance(p, discord.Embed)]
 
@@ -171,6 +231,113 @@ class Paginator:
         self.controller = ctx.bot.loop.create_task(self.reaction_controller(ctx))
 
 
+class ApiPaginator(Paginator):
+    """Paginates the result of an API query without fetching all of it.
+
+    Rows are requested `page_size` at a time, only once the user flips to them, and the next
+    batch is prefetched while the current one is read. Fetched batches are kept. Every page
+    shows `per_page` rows, `render` receives the list of rows and returns the embed."""
+
+    __slots__ = (
+        "client",
+        "query",
+        "order",
+        "page_size",
+        "per_page",
+        "batches",
+        "rows_known",
+        "exhausted",
+    )
+
+    def __init__(
+        self,
+        client,
+        query: Union[str, Query],
+        *,
+        page_size: int = 25,
+        per_page: int = 1,
+        order: str = "id.asc",
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        if page_size % per_page:
+            raise ValueError("page_size must be a multiple of per_page.")
+        self.client = client
+        self.query = query
+        self.order = order
+        self.page_size = page_size
+        self.per_page = per_page
+        self.page_factory = self.build_page
+
+        self.batches = {}
+        self.rows_known = 0
+        self.exhausted = False
+
+    def batch(self, index: int) -> asyncio.Task:
+        """Returns the task fetching a batch of rows, starting it if needed."""
+        task = self.batches.get(index)
+        if task is None:
+            task = self.client.bot.loop.create_task(self._fetch(index))
+            # prefetches may fail without anyone waiting for them
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self.batches[index] = task
+        return task
+
+    async def _fetch(self, index: int) -> list:
+        try:
+            rows = await self.client.page(
+                self.query, index, page_size=self.page_size, order=self.order
+            )
+        except Exception:
+            self.batches.pop(index, None)
+            raise
+
+        self.rows_known = max(self.rows_known, index * self.page_size + len(rows))
+        if len(rows) < self.page_size:
+            self.exhausted = True
+        self.eof = float(max(math.ceil(self.rows_known / self.per_page) - 1, 0))
+        return rows
+
+    async def build_page(self, index: int) -> discord.Embed:
+        start = index * self.per_page
+        batch = start // self.page_size
+        rows = await self.batch(batch)
+        if len(rows) == self.page_size:
+            self.batch(batch + 1)  # prefetch while this page is read
+
+        offset = start - batch * self.page_size
+        with span("render"):
+            page = self.render(rows[offset : offset + self.per_page])
+            if inspect.isawaitable(page):
+                page = await page
+        return page
+
+    async def indexer(self, ctx, ctrl):
+        if (
+            isinstance(ctrl, int)
+            and self.current + ctrl > self.eof
+            and not self.exhausted
+        ):
+            # the next batch has not arrived yet
+            try:
+                await self.batch(self.rows_known // self.page_size)
+            except Exception:
+                pass  # stays on the current page
+        await super().indexer(ctx, ctrl)
+
+    async def first(self) -> list:
+        """Fetches the first batch of rows and returns it."""
+        return await self.batch(0)
+
+    async def paginate(self, ctx):
+        if not await self.first():
+            raise ValueError(
+                "There must be enough data to create at least 1 page for pagination."
+            )
+        await self.get_page(0)
+        self.controller = ctx.bot.loop.create_task(self.reaction_controller(ctx))
+
+
 class MemberGetterPaginator(Paginator):
     __slots__ = (
         "entries",
@@ -193,7 +360,7 @@ class MemberGetterPaginator(Paginator):
         "eof",
         "base",
         "names",
-        "get_usernames"
+        "get_usernames",
     )
 
     async def paginate(self, ctx):
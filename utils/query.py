@@ -0,0 +1,164 @@
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit, urlunsplit
+
+
+def encode(params) -> str:
+    """Percent-encodes query parameters, leaving PostgREST's operator syntax readable."""
+    return urlencode(params, safe="(),.*:", quote_via=quote)
+
+
+def canonical_url(url: str) -> str:
+    """Normalizes a query URL so that logically identical queries compare equal.
+
+    Whitespace and empty parameters are dropped and the parameters are sorted."""
+    parts = urlsplit(url.strip())
+    params = sorted(
+        (key.strip(), value.strip())
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.strip()
+    )
+    return urlunsplit(
+        (
+            parts.scheme,
+            parts.netloc,
+            parts.path,
+            encode(params),
+            "",
+        )
+    )
+
+
+def endpoint(url: str) -> str:
+    """Returns the endpoint a query URL targets, e.g. allitems."""
+    return urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1]
+
+
+def with_params(url: str, **params) -> str:
+    """Returns the URL with the given query parameters set, replacing existing ones."""
+    parts = urlsplit(url)
+    query = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key not in params
+    ]
+    query += [(key, str(value)) for key, value in params.items()]
+    return urlunsplit(
+        (
+            parts.scheme,
+            parts.netloc,
+            parts.path,
+            encode(query),
+            "",
+        )
+    )
+
+
+def has_param(url: str, name: str) -> bool:
+    return any(key == name for key, _ in parse_qsl(urlsplit(url).query))
+
+
+def literal(value) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return str(value).lower()
+    return str(value)
+
+
+def quoted(value) -> str:
+    """Quotes a value for use inside a list or a logical filter, if PostgREST requires it."""
+    value = literal(value)
+    if any(char in value for char in ',.:()"\\ '):
+        value = '"{}"'.format(value.replace("\\", "\\\\").replace('"', '\\"'))
+    return value
+
+
+class Query:
+    """A PostgREST query, built up filter by filter.
+
+    Filters on the same query are combined with AND. `str(query)` returns the canonical
+    relative URL, e.g. `allitems?owner=eq.1&select=id`, so logically identical queries
+    compare equal no matter in which order they were built."""
+
+    __slots__ = ("endpoint", "params")
+
+    def __init__(self, endpoint: str = None):
+        self.endpoint = endpoint
+        self.params = []
+
+    def __str__(self) -> str:
+        return f"{self.endpoint}?{encode(sorted(self.params))}"
+
+    def __repr__(self) -> str:
+        return f"<Query {self}>"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Query) and str(self) == str(other)
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    def param(self, name: str, value) -> "Query":
+        self.params.append((name, literal(value)))
+        return self
+
+    def select(self, *columns: str) -> "Query":
+        return self.param("select", ",".join(columns))
+
+    def filter(self, column: str, operator: str, value) -> "Query":
+        return self.param(column, f"{operator}.{literal(value)}")
+
+    def eq(self, column: str, value) -> "Query":
+        return self.filter(column, "eq", value)
+
+    def neq(self, column: str, value) -> "Query":
+        return self.filter(column, "neq", value)
+
+    def gt(self, column: str, value) -> "Query":
+        return self.filter(column, "gt", value)
+
+    def gte(self, column: str, value) -> "Query":
+        return self.filter(column, "gte", value)
+
+    def lt(self, column: str, value) -> "Query":
+        return self.filter(column, "lt", value)
+
+    def lte(self, column: str, value) -> "Query":
+        return self.filter(column, "lte", value)
+
+    def is_(self, column: str, value) -> "Query":
+        """Filters on null, true or false."""
+        return self.filter(column, "is", value)
+
+    def in_(self, column: str, values) -> "Query":
+        return self.filter(column, "in", f"({','.join(quoted(v) for v in values)})")
+
+    def or_(self, *branches: "Query") -> "Query":
+        """Matches rows that match any of the branches, each of which is a Query without
+        endpoint whose filters are combined with AND."""
+        return self.param(
+            "or", f"({','.join(branch.condition() for branch in branches)})"
+        )
+
+    def condition(self) -> str:
+        """Returns the filters of this query as a logical PostgREST condition."""
+        conditions = []
+        for column, value in sorted(self.params):
+            if column in ("or", "and"):
+                conditions.append(f"{column}{value}")
+            else:
+                operator, _, operand = value.partition(".")
+                if operator != "in":
+                    operand = quoted(operand)
+                conditions.append(f"{column}.{operator}.{operand}")
+        if len(conditions) == 1:
+            return conditions[0]
+        return f"and({','.join(conditions)})"
+
+    def order(self, column: str, direction: str = "asc") -> "Query":
+        return self.param("order", f"{column}.{direction}")
+
+    def limit(self, count: int) -> "Query":
+        return self.param("limit", count)
+
+    def offset(self, count: int) -> "Query":
+        return self.param("offset", count)
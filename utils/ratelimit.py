@@ -0,0 +1,111 @@
+import asyncio
+import time
+
+from utils.scripts import Script
+
+
+class TokenBucket:
+    """An asyncio token bucket, handing out `rate` permits every `per` seconds.
+
+    Callers queue up in order behind a lock, so a burst waits for permits instead of failing.
+    """
+
+    def __init__(self, rate: int, per: float):
+        self.rate = rate
+        self.per = per
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+        self.waiting = 0
+        self.acquired = 0
+        self.last_wait = 0.0
+        self.total_wait = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.rate, self.tokens + (now - self.updated) * self.rate / self.per
+        )
+        self.updated = now
+
+    async def acquire(self) -> float:
+        """Waits for a permit and returns the time spent waiting, in seconds."""
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self.lock:
+                self._refill()
+                if self.tokens < 1:
+                    await asyncio.sleep((1 - self.tokens) * self.per / self.rate)
+                    self._refill()
+                self.tokens -= 1
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - start
+        self.acquired += 1
+        self.last_wait = waited
+        self.total_wait += waited
+        return waited
+
+    @property
+    def average_wait(self) -> float:
+        return self.total_wait / self.acquired if self.acquired else 0.0
+
+
+# reserves a permit and returns the time in ms to wait for it, 0 if it is available now
+RESERVE = Script("""
+redis.replicate_commands()
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local rate = tonumber(ARGV[1])
+local per = tonumber(ARGV[2])
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or rate
+local updated = tonumber(state[2]) or now
+tokens = math.min(rate, tokens + math.max(now - updated, 0) * rate / per) - 1
+
+local wait = 0
+if tokens < 0 then
+    wait = math.ceil(-tokens * per / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', now)
+-- kept until every reservation is due and the bucket is full again
+redis.call('PEXPIRE', KEYS[1], wait + per * 2)
+return wait
+""")
+
+
+class RedisTokenBucket(TokenBucket):
+    """A token bucket kept in Redis, shared by every process using the same key.
+
+    Acquiring reserves the next permit atomically and then sleeps until it is due, so
+    callers from all processes are served in order without polling. Time is taken from
+    the Redis server, so clocks of different hosts do not matter."""
+
+    def __init__(self, redis, key: str, rate: int, per: float):
+        super().__init__(rate, per)
+        self.redis = redis
+        self.key = key
+
+    async def acquire(self) -> float:
+        """Waits for a permit and returns the time spent waiting, in seconds."""
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            wait = await RESERVE(
+                self.redis, keys=[self.key], args=[self.rate, int(self.per * 1000)]
+            )
+            if wait:
+                await asyncio.sleep(wait / 1000)
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - start
+        self.acquired += 1
+        self.last_wait = waited
+        self.total_wait += waited
+        return waited
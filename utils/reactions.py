@@ -0,0 +1,106 @@
+import asyncio
+import math
+from typing import Iterable, Optional
+
+import discord
+
+
+class Waiter:
+    __slots__ = ("message_id", "user_id", "emojis", "deadline", "future")
+
+    def __init__(self, message_id, user_id, emojis, deadline, future):
+        self.message_id = message_id
+        self.user_id = user_id
+        self.emojis = emojis
+        self.deadline = deadline
+        self.future = future
+
+    def matches(self, payload: discord.RawReactionActionEvent) -> bool:
+        if self.user_id is not None and payload.user_id != self.user_id:
+            return False
+        return self.emojis is None or str(payload.emoji) in self.emojis
+
+
+class ReactionDispatcher:
+    """Routes reaction events to the menus waiting for them.
+
+    Instead of every open menu registering its own wait_for check that runs on every
+    reaction, waiters are kept in a dict keyed by message ID, so each event is routed in
+    O(1). Timeouts are handled by a timing wheel that ticks every `resolution` seconds."""
+
+    def __init__(self, loop, *, resolution: float = 1.0, slots: int = 128):
+        self.loop = loop
+        self.resolution = resolution
+        self.waiters = {}
+        self.slots = [set() for _ in range(slots)]
+        self.cursor = 0
+        self.ticker = None
+
+    def __len__(self) -> int:
+        return sum(len(waiters) for waiters in self.waiters.values())
+
+    def wait_for(
+        self,
+        message_id: int,
+        *,
+        timeout: float,
+        user_id: Optional[int] = None,
+        emojis: Optional[Iterable] = None,
+    ) -> asyncio.Future:
+        """Returns a future that resolves with the next matching reaction payload on a message.
+
+        Only reactions by `user_id` with one of `emojis` match, if given. The future raises
+        asyncio.TimeoutError if no reaction matched within `timeout` seconds."""
+        waiter = Waiter(
+            message_id,
+            user_id,
+            None if emojis is None else {str(emoji) for emoji in emojis},
+            self.loop.time() + timeout,
+            self.loop.create_future(),
+        )
+        self.waiters.setdefault(message_id, []).append(waiter)
+        self._schedule(waiter)
+        if self.ticker is None:
+            self.ticker = self.loop.create_task(self._tick())
+        return waiter.future
+
+    def dispatch(self, payload: discord.RawReactionActionEvent):
+        waiters = self.waiters.get(payload.message_id)
+        if not waiters:
+            return
+        for waiter in [w for w in waiters if w.matches(payload)]:
+            self._remove(waiter)
+            if not waiter.future.done():
+                waiter.future.set_result(payload)
+
+    def _remove(self, waiter: Waiter):
+        waiters = self.waiters.get(waiter.message_id, [])
+        if waiter in waiters:
+            waiters.remove(waiter)
+        if not waiters:
+            self.waiters.pop(waiter.message_id, None)
+
+    def _schedule(self, waiter: Waiter):
+        ticks = math.ceil((waiter.deadline - self.loop.time()) / self.resolution)
+        ticks = min(max(ticks, 1), len(self.slots) - 1)
+        self.slots[(self.cursor + ticks) % len(self.slots)].add(waiter)
+
+    async def _tick(self):
+        try:
+            while any(self.slots):
+                await asyncio.sleep(self.resolution)
+                self.cursor = (self.cursor + 1) % len(self.slots)
+                due, self.slots[self.cursor] = self.slots[self.cursor], set()
+                now = self.loop.time()
+                for waiter in due:
+                    if waiter.future.done():
+                        # resolved, or cancelled by whoever waited
+                        self._remove(waiter)
+                    elif waiter.deadline <= now:
+                        self._remove(waiter)
+                        waiter.future.set_exception(asyncio.TimeoutError())
+                    else:
+                        # too far in the future for a single turn of the wheel
+                        self._schedule(waiter)
+        finally:
+            self.ticker = None
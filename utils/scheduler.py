@@ -0,0 +1,128 @@
+import asyncio
+import contextvars
+import enum
+import functools
+import heapq
+import itertools
+import time
+
+
+class Priority(enum.IntEnum):
+    INTERACTIVE = 0
+    BULK = 1
+    BACKGROUND = 2
+
+
+# the priority of API requests made from the current task and the tasks it starts
+current_priority = contextvars.ContextVar(
+    "current_priority", default=Priority.INTERACTIVE
+)
+
+
+def priority(value: Priority):
+    """Sets the priority of the API requests a command makes. Commands are interactive by default.
+
+    The priority is set when the callback runs, so it also applies to subcommands, which are
+    only known once their group is invoked."""
+
+    def decorator(func):
+        callback = func.callback if hasattr(func, "callback") else func
+
+        @functools.wraps(callback)
+        async def wrapped(*args, **kwargs):
+            current_priority.set(value)
+            return await callback(*args, **kwargs)
+
+        wrapped.__api_priority__ = value
+        if hasattr(func, "callback"):
+            func.callback = wrapped
+            return func
+        return wrapped
+
+    return decorator
+
+
+class ClassStats:
+    __slots__ = ("waiting", "acquired", "last_wait", "total_wait")
+
+    def __init__(self):
+        self.waiting = 0
+        self.acquired = 0
+        self.last_wait = 0.0
+        self.total_wait = 0.0
+
+    @property
+    def average_wait(self) -> float:
+        return self.total_wait / self.acquired if self.acquired else 0.0
+
+
+class PriorityScheduler:
+    """Hands out permits from a token bucket by priority.
+
+    Waiters are ordered by the time they arrived plus `aging` seconds per priority level, so
+    a request of a lower priority is served before new higher priority ones once it waited
+    `aging` seconds longer, and no class starves. Permits are acquired one at a time, so the
+    bucket only ever sees the request that is next in line."""
+
+    def __init__(self, bucket, *, aging: float = 30.0):
+        self.bucket = bucket
+        self.aging = aging
+        self.queue = []
+        self.counter = itertools.count()
+        self.dispatcher = None
+        self.stats = {p: ClassStats() for p in Priority}
+
+    def __len__(self) -> int:
+        return len(self.queue)
+
+    async def acquire(self, priority: Priority = None) -> float:
+        """Waits for a permit and returns the time spent waiting, in seconds.
+
+        Defaults to the priority of the current task."""
+        priority = current_priority.get() if priority is None else priority
+        stats = self.stats[priority]
+        start = time.monotonic()
+        future = asyncio.get_event_loop().create_future()
+        heapq.heappush(
+            self.queue,
+            (start + priority * self.aging, next(self.counter), priority, future),
+        )
+        if self.dispatcher is None:
+            self.dispatcher = asyncio.ensure_future(self._dispatch())
+
+        stats.waiting += 1
+        try:
+            await future
+        finally:
+            stats.waiting -= 1
+
+        waited = time.monotonic() - start
+        stats.acquired += 1
+        stats.last_wait = waited
+        stats.total_wait += waited
+        return waited
+
+    async def _dispatch(self):
+        try:
+            while self.queue:
+                *_, future = self.queue[0]
+                if future.done():
+                    # cancelled while waiting
+                    heapq.heappop(self.queue)
+                    continue
+                try:
+                    await self.bucket.acquire()
+                except Exception as e:
+                    # e.g. Redis being unavailable, fail the next request instead of hanging
+                    *_, future = heapq.heappop(self.queue)
+                    if not future.done():
+                        future.set_exception(e)
+                    continue
+                # a more urgent request may have arrived while we waited for the permit
+                while self.queue:
+                    *_, future = heapq.heappop(self.queue)
+                    if not future.done():
+                        future.set_result(None)
+                        break
+        finally:
+            self.dispatcher = None
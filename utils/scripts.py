@@ -0,0 +1,21 @@
+import hashlib
+
+import aioredis
+
+
+class Script:
+    """A Lua script that runs atomically in Redis.
+
+    Calls use EVALSHA and only send the source if Redis does not know the script yet."""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.sha = hashlib.sha1(source.encode()).hexdigest()
+
+    async def __call__(self, redis, keys: list = (), args: list = ()):
+        try:
+            return await redis.execute("EVALSHA", self.sha, len(keys), *keys, *args)
+        except aioredis.ReplyError as e:
+            if not str(e).startswith("NOSCRIPT"):
+                raise
+            return await redis.execute("EVAL", self.source, len(keys), *keys, *args)
@@ -0,0 +1,140 @@
+import bisect
+import mmap
+import os
+import struct
+import time
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+MAGIC = b"IDLESNAP"
+# bump when the layout or the encoding of any section changes
+VERSION = 1
+
+# magic, version, written at, number of sections
+HEADER = struct.Struct("<8sHdI")
+# name, offset of its entries, number of entries
+SECTION = struct.Struct("<16sQI")
+# key, expires at, offset of the payload, length of the payload
+ENTRY = struct.Struct("<qdQI")
+
+Entry = Tuple[int, float, bytes]
+
+
+def write(path: str, sections: Dict[str, Iterable[Entry]]):
+    """Writes a snapshot of cache sections, each a collection of (key, expires, payload).
+
+    Entries are sorted by key, so they can be looked up with a binary search without
+    reading the file. The file is replaced atomically."""
+    now = time.time()
+    prepared = []
+    for name, entries in sections.items():
+        entries = sorted((e for e in entries if e[1] > now), key=lambda e: e[0])
+        prepared.append((name.encode(), entries))
+
+    offset = HEADER.size + SECTION.size * len(prepared)
+    tables, payloads = [], []
+    payload_offset = offset + sum(ENTRY.size * len(e) for _, e in prepared)
+    for name, entries in prepared:
+        tables.append(SECTION.pack(name, offset, len(entries)))
+        offset += ENTRY.size * len(entries)
+        for key, expires, payload in entries:
+            payloads.append(
+                (ENTRY.pack(key, expires, payload_offset, len(payload)), payload)
+            )
+            payload_offset += len(payload)
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, now, len(prepared)))
+        f.writelines(tables)
+        f.writelines(entry for entry, _ in payloads)
+        f.writelines(payload for _, payload in payloads)
+    os.replace(temporary, path)
+
+
+class Section:
+    """The entries of one cache in a snapshot, read from the file on access."""
+
+    def __init__(self, buffer, offset: int, count: int):
+        self.buffer = buffer
+        self.offset = offset
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> int:
+        # the key of an entry, for bisect
+        (key,) = struct.unpack_from("<q", self.buffer, self.offset + index * ENTRY.size)
+        return key
+
+    def _entry(self, index: int) -> Entry:
+        key, expires, offset, length = ENTRY.unpack_from(
+            self.buffer, self.offset + index * ENTRY.size
+        )
+        return key, expires, self.buffer[offset : offset + length]
+
+    def get(self, key: int) -> Optional[Tuple[float, bytes]]:
+        """Returns the expiry and payload of an entry, or None if it is missing or expired."""
+        index = bisect.bisect_left(self, key)
+        if index == self.count or self[index] != key:
+            return None
+        _, expires, payload = self._entry(index)
+        if expires <= time.time():
+            return None
+        return expires, payload
+
+    def __iter__(self) -> Iterator[Entry]:
+        now = time.time()
+        for index in range(self.count):
+            entry = self._entry(index)
+            if entry[1] > now:
+                yield entry
+
+
+class Snapshot:
+    """A snapshot file written by `write`, memory-mapped.
+
+    Opening it only reads the header, entries are read when they are looked up."""
+
+    def __init__(self, file, buffer: mmap.mmap, written_at: float, sections: dict):
+        self.file = file
+        self.buffer = buffer
+        self.written_at = written_at
+        self.sections = sections
+
+    @classmethod
+    def open(cls, path: str) -> Optional["Snapshot"]:
+        """Opens a snapshot. Returns None if there is none, or it is from another version."""
+        try:
+            file = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        buffer = None
+        try:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, written_at, count = HEADER.unpack_from(buffer)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError("Not a snapshot of this version.")
+            sections = {}
+            for index in range(count):
+                name, offset, entries = SECTION.unpack_from(
+                    buffer, HEADER.size + index * SECTION.size
+                )
+                if offset + entries * ENTRY.size > len(buffer):
+                    raise ValueError("Truncated snapshot.")
+                sections[name.rstrip(b"\0").decode()] = Section(buffer, offset, entries)
+        except (ValueError, struct.error):
+            # empty, truncated or from another version
+            if buffer is not None:
+                buffer.close()
+            file.close()
+            return None
+        return cls(file, buffer, written_at, sections)
+
+    def section(self, name: str) -> Optional[Section]:
+        return self.sections.get(name)
+
+    def close(self):
+        self.sections.clear()
+        self.buffer.close()
+        self.file.close()
@@ -0,0 +1,54 @@
+import asyncio
+import contextlib
+import time
+
+
+class StartupError(Exception):
+    """Raised when a resource the bot needs could not be set up in time."""
+
+    pass
+
+
+class Startup:
+    """Times the phases of starting the bot, some of which run concurrently.
+
+    The time spent importing modules before is estimated as the CPU time the process used
+    until this is created, as imports are mostly CPU bound."""
+
+    def __init__(self):
+        self.imports = time.process_time()
+        self.started = time.perf_counter()
+        self.phases = []
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.phases.append(
+                (name, start - self.started, time.perf_counter() - start, ok)
+            )
+
+    async def run(self, name: str, aw, *, timeout: float = None):
+        """Awaits something as a phase. Raises StartupError if it takes over `timeout` seconds."""
+        with self.phase(name):
+            try:
+                return await asyncio.wait_for(aw, timeout)
+            except asyncio.TimeoutError:
+                raise StartupError(
+                    f"{name} did not finish within {timeout} seconds."
+                ) from None
+
+    def report(self) -> str:
+        lines = [f"{'imports':<24} {'':>9}  took {self.imports * 1000:>7.0f} ms"]
+        for name, start, took, ok in sorted(self.phases, key=lambda p: p[1]):
+            lines.append(
+                f"{name:<24} at {start * 1000:>6.0f} ms  took {took * 1000:>7.0f} ms"
+                + ("" if ok else "  FAILED")
+            )
+        total = time.perf_counter() - self.started
+        lines.append(f"{'total':<24} {'':>9}  took {total * 1000:>7.0f} ms")
+        return "Startup times:\n" + "\n".join(lines)
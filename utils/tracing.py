@@ -0,0 +1,147 @@
+import contextvars
+import datetime
+import json
+import random
+import time
+from typing import Optional
+
+# the trace of the command the current task is running, if it is traced
+current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+class Trace:
+    __slots__ = ("command", "started", "spans")
+
+    def __init__(self, command: str):
+        self.command = command
+        self.started = time.perf_counter()
+        self.spans = []
+
+    def add(self, name: str, start: float, duration: float, attrs: dict):
+        self.spans.append((name, start - self.started, duration, attrs))
+
+
+class span:
+    """Times a block as part of the current command's trace, e.g. `with span("api"):`.
+
+    Does nothing but a context variable lookup if the command is not traced. Spans may nest,
+    a rendering span includes the API requests made while rendering."""
+
+    __slots__ = ("name", "attrs", "trace", "start")
+
+    def __init__(self, name: str, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.trace = current_trace.get()
+
+    def __enter__(self):
+        if self.trace is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.trace is not None:
+            self.trace.add(
+                self.name, self.start, time.perf_counter() - self.start, self.attrs
+            )
+
+
+class Tracer:
+    """Writes a breakdown of where the time of commands went, as JSON lines.
+
+    A `sample_rate` share of all commands is written, as well as every command that took
+    longer than `slow` seconds. If `slow` is set, every command has to be traced to find out,
+    otherwise only the sampled ones are."""
+
+    def __init__(self, path: str, *, sample_rate: float = 0.0, slow: float = None):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.slow = slow
+        self.file = open(path, "a", buffering=1, encoding="utf-8")
+
+    def start(self, ctx) -> Optional[Trace]:
+        """Starts tracing a command, if it is sampled or could turn out to be slow."""
+        sampled = random.random() < self.sample_rate
+        if not sampled and self.slow is None:
+            return None
+        trace = Trace(ctx.command.qualified_name)
+        ctx.trace = trace
+        ctx.trace_sampled = sampled
+        current_trace.set(trace)
+        return trace
+
+    def finish(self, ctx, trace: Trace):
+        current_trace.set(None)
+        duration = time.perf_counter() - trace.started
+        if not ctx.trace_sampled and duration < self.slow:
+            return
+
+        breakdown = {}
+        for name, _, took, _ in trace.spans:
+            breakdown[name] = breakdown.get(name, 0) + took
+        record = {
+            "time": datetime.datetime.utcnow().isoformat(),
+            "command": trace.command,
+            "message": ctx.message.id,
+            "user": ctx.author.id,
+            "guild": ctx.guild.id if ctx.guild else None,
+            "failed": ctx.command_failed,
+            "slow": self.slow is not None and duration >= self.slow,
+            "duration_ms": round(duration * 1000, 2),
+            "breakdown_ms": {
+                name: round(took * 1000, 2) for name, took in breakdown.items()
+            },
+            "spans": [
+                dict(
+                    name=name,
+                    start_ms=round(start * 1000, 2),
+                    duration_ms=round(took * 1000, 2),
+                    **attrs,
+                )
+                for name, start, took, attrs in trace.spans
+            ],
+        }
+        self.file.write(json.dumps(record) + "\n")
+
+
+class TracedPool:
+    """Wraps an asyncpg pool so that queries run on it directly are traced.
+
+    Queries on connections taken with acquire() are not traced."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def __getattr__(self, name):
+        return getattr(self.pool, name)
+
+    async def execute(self, query: str, *args, **kwargs):
+        with span("db", query=query.split(None, 1)[0]):
+            return await self.pool.execute(query, *args, **kwargs)
+
+    async def executemany(self, query: str, *args, **kwargs):
+        with span("db", query=query.split(None, 1)[0]):
+            return await self.pool.executemany(query, *args, **kwargs)
+
+    async def fetch(self, query: str, *args, **kwargs):
+        with span("db", query=query.split(None, 1)[0]):
+            return await self.pool.fetch(query, *args, **kwargs)
+
+    async def fetchrow(self, query: str, *args, **kwargs):
+        with span("db", query=query.split(None, 1)[0]):
+            return await self.pool.fetchrow(query, *args, **kwargs)
+
+    async def fetchval(self, query: str, *args, **kwargs):
+        with span("db", query=query.split(None, 1)[0]):
+            return await self.pool.fetchval(query, *args, **kwargs)
+
+
+def trace_http(http):
+    """Traces the Discord REST requests made by a discord.py HTTP client."""
+    request = http.request
+
+    async def traced(route, **kwargs):
+        with span("discord", route=f"{route.method} {route.path}"):
+            return await request(route, **kwargs)
+
+    http.request = traced
@@ -0,0 +1,131 @@
+import asyncio
+import itertools
+import json
+import time
+from collections import OrderedDict
+from typing import Iterator, Optional
+
+import discord
+
+from utils.snapshot import Entry, Section
+
+
+class UserResolver:
+    """Resolves user IDs to users without asking Discord more often than needed.
+
+    Users are looked up in the bot's cache first, then in an in-memory LRU, then in Redis.
+    Only the remaining IDs are fetched from Discord, concurrently but limited by a semaphore.
+
+    After a restart, the LRU of the previous run is read from a snapshot on first use, see
+    `snapshot` and `entries`.
+    """
+
+    def __init__(
+        self, bot, *, size: int = 2048, ttl: int = 86400, concurrency: int = 5
+    ):
+        self.bot = bot
+        self.size = size
+        self.ttl = ttl
+        self.semaphore = asyncio.Semaphore(concurrency)
+        # user ID to (user, expires at)
+        self.lru = OrderedDict()
+        self.snapshot: Optional[Section] = None
+        self._inflight = {}
+
+    @staticmethod
+    def key(user_id: int) -> str:
+        return f"user:{user_id}"
+
+    @staticmethod
+    def data(user: discord.User) -> dict:
+        """The user as returned by the Discord API, to create it again from."""
+        return {
+            "id": str(user.id),
+            "username": user.name,
+            "discriminator": user.discriminator,
+            "avatar": user.avatar,
+            "bot": user.bot,
+        }
+
+    def _remember(self, user: discord.User, expires: float = None):
+        self.lru[user.id] = (user, expires or time.time() + self.ttl)
+        self.lru.move_to_end(user.id)
+        if len(self.lru) > self.size:
+            self.lru.popitem(last=False)
+
+    def _cached(self, user_id: int) -> Optional[discord.User]:
+        user = self.bot.get_user(user_id)
+        if user is not None:
+            return user
+        if user_id in self.lru:
+            user, expires = self.lru[user_id]
+            if expires > time.time():
+                self.lru.move_to_end(user_id)
+                return user
+            del self.lru[user_id]
+        elif self.snapshot is not None:
+            entry = self.snapshot.get(user_id)
+            if entry is not None:
+                expires, payload = entry
+                user = discord.User(
+                    state=self.bot._connection, data=json.loads(payload)
+                )
+                self._remember(user, expires)
+                return user
+        return None
+
+    def entries(self) -> Iterator[Entry]:
+        """The cached users for a new snapshot, most recently used first.
+
+        Users from the current snapshot that were not used since are included, up to `size`
+        users in total."""
+
+        def entries():
+            for user_id, (user, expires) in reversed(self.lru.items()):
+                yield user_id, expires, json.dumps(self.data(user)).encode()
+            if self.snapshot is not None:
+                for entry in self.snapshot:
+                    if entry[0] not in self.lru:
+                        yield entry
+
+        return itertools.islice(entries(), self.size)
+
+    async def resolve(self, user_id: int) -> Optional[discord.User]:
+        """Resolves a user ID. Returns None if the user does not exist.
+
+        Pages are built lazily, so every page resolves the users it shows when it is shown,
+        and the users of pages that are never looked at are not fetched at all."""
+        user_id = int(user_id)
+        user = self._cached(user_id)
+        if user is not None:
+            return user
+
+        data = await self.bot.redis.execute("GET", self.key(user_id))
+        if data is not None:
+            user = discord.User(state=self.bot._connection, data=json.loads(data))
+            self._remember(user)
+            return user
+
+        return await self._fetch(user_id)
+
+    async def _fetch(self, user_id: int) -> Optional[discord.User]:
+        # concurrent lookups of the same ID share one request
+        task = self._inflight.get(user_id)
+        if task is None:
+            task = self.bot.loop.create_task(self._fetch_user(user_id))
+            self._inflight[user_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(user_id, None))
+        return await asyncio.shield(task)
+
+    async def _fetch_user(self, user_id: int) -> Optional[discord.User]:
+        async with self.semaphore:
+            try:
+                user = await self.bot.fetch_user(user_id)
+            except discord.NotFound:
+                return None
+
+        self._remember(user)
+        await self.bot.redis.execute(
+            "SET", self.key(user.id), json.dumps(self.data(user)), "EX", self.ttl
+        )
+        return user